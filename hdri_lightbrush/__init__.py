@@ -24,7 +24,11 @@ from . import world_operators
 from . import hdri_save
 from . import sphere_tools
 from . import continuous_paint_handler
+from . import light_layers
+from . import canvas_layers
+from . import node_graphs
 from . import icons
+from .engine.parallel import shutdown_pool
 
 modules = [
     icons,  # Load icons first
@@ -38,6 +42,9 @@ modules = [
     hdri_save,
     sphere_tools,
     continuous_paint_handler,
+    light_layers,
+    canvas_layers,
+    node_graphs,
 ]
 
 
@@ -62,6 +69,9 @@ def unregister():
     
     for module in reversed(modules):
         module.unregister()
+    
+    # Stop the engine's worker threads so add-on reloads don't pile them up
+    shutdown_pool()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,662 @@
+"""
+Canvas Layers Module
+Non-destructive canvas layers (base, painted and light layers) held in NumPy
+"""
+
+import json
+import os
+from contextlib import contextmanager
+
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from bpy.types import Operator, UIList
+
+from .engine.canvas import Canvas
+from .engine.layers import BASE_LAYER, LayeredCanvas, check_paint_mode
+from .engine.light_layers import LightLayer
+from .engine.parallel import fill
+from .engine.pyramid import MipPyramid
+from .engine.transform import reproject, roll_yaw, rotate_direction, yaw_shift
+from .light_layers import scene_lights
+from .utils import refresh_canvas_texture
+
+
+# Canvas custom property describing what its pixels were flattened from (JSON):
+# {"lights": {key: LightLayer fields}, "layers": True if layer images were saved}
+COMPOSITED_KEY = "hdri_composite"
+
+# Canvas custom property, True when the canvas holds only the upper hemisphere
+# (see engine/projection.py). Set when the canvas is created or loaded; the
+# layout is never guessed from the image size
+DOME_KEY = "hdri_dome"
+
+# Painted layer pixels are saved into these images when the .blend is saved
+LAYER_IMAGE_PREFIX = "HDRI_Layer_"
+
+_canvas = None
+_canvas_image = None  # as_pointer() of the image _canvas belongs to
+_sync_suspended = False
+_pyramid = None
+_pyramid_image = None  # as_pointer() of the image _pyramid belongs to
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CANVAS STATE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _read_pixels(image):
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape((height, width, 4))
+
+
+def _composite_info(canvas_image):
+    data = canvas_image.get(COMPOSITED_KEY)
+    if not data:
+        return {}, False
+    info = json.loads(data)
+    lights = {}
+    for key, fields in info.get("lights", {}).items():
+        layer = LightLayer(*fields)
+        lights[int(key)] = layer._replace(color=tuple(layer.color))
+    return lights, info.get("layers", False)
+
+
+def is_dome_canvas(image):
+    """Whether a canvas image stores only the upper hemisphere"""
+    return bool(image.get(DOME_KEY, False))
+
+
+def _saved_layer_pixels(key, size):
+    image = bpy.data.images.get(f"{LAYER_IMAGE_PREFIX}{key}")
+    if image is None or tuple(image.size) != tuple(size):
+        return None
+    return _read_pixels(image)
+
+
+def _rebuild_canvas(canvas_image, props):
+    """Restore the layered canvas of an image from its pixels and saved layers"""
+    lights, has_layer_images = _composite_info(canvas_image)
+    size = tuple(canvas_image.size)
+    dome = is_dome_canvas(canvas_image)
+
+    base = _saved_layer_pixels(BASE_LAYER, size) if has_layer_images else None
+    if base is None:
+        return LayeredCanvas.from_flattened(_read_pixels(canvas_image), lights, dome=dome)
+
+    canvas = LayeredCanvas(base, dome=dome)
+    for layer in props.paint_layers:
+        if layer.layer_id != BASE_LAYER:
+            canvas.add_layer(layer.layer_id, _saved_layer_pixels(layer.layer_id, size),
+                             layer.opacity, layer.blend_mode, layer.visible)
+    canvas.set_lights(lights)
+    canvas.mark_dirty(everything=True)
+    canvas.flatten()
+    return canvas
+
+
+def get_layered_canvas(canvas_image, props):
+    """Layered canvas of an image, rebuilt when the image changed"""
+    global _canvas, _canvas_image
+
+    if (_canvas is None or _canvas_image != canvas_image.as_pointer()
+            or _canvas.size != tuple(canvas_image.size) or _canvas.dome != is_dome_canvas(canvas_image)):
+        _canvas = _rebuild_canvas(canvas_image, props)
+        _canvas_image = canvas_image.as_pointer()
+    return _canvas
+
+
+def _apply_scene_layers(canvas, props):
+    """Bring the canvas layer stack in line with the scene's paint layers"""
+    scene_layers = [layer for layer in props.paint_layers if layer.layer_id != BASE_LAYER]
+    keys = [layer.layer_id for layer in scene_layers]
+
+    for key in [key for key in canvas.order if key != BASE_LAYER and key not in keys]:
+        canvas.remove_layer(key)
+    for layer in scene_layers:
+        if layer.layer_id not in canvas.layers:
+            canvas.add_layer(layer.layer_id)
+        canvas.set_layer_settings(layer.layer_id, layer.opacity, layer.blend_mode, layer.visible)
+    canvas.set_order(keys)
+
+
+def _store_composite_info(canvas_image, lights, has_layer_images):
+    if lights or has_layer_images:
+        canvas_image[COMPOSITED_KEY] = json.dumps({
+            "lights": {str(key): list(layer) for key, layer in lights.items()},
+            "layers": has_layer_images,
+        })
+    else:
+        canvas_image[COMPOSITED_KEY] = ""
+
+
+def _write_result(canvas_image, canvas, lights, rects=None):
+    """Upload the flattened result and record what it was flattened from
+
+    Args:
+        rects: Rects recomposited since the last upload, None if unknown
+    """
+    canvas_image.pixels.foreach_set(canvas.result.ravel())
+    if rects is None:
+        canvas_changed()
+    else:
+        for rect in rects:
+            canvas_changed(rect, canvas.result)
+    # Saved layer images stay valid only while the canvas still has layers
+    has_layer_images = _composite_info(canvas_image)[1] and len(canvas.order) > 1
+    _store_composite_info(canvas_image, lights, has_layer_images)
+    canvas_image.update()
+    refresh_canvas_texture(canvas_image)
+
+
+@contextmanager
+def suspended_sync():
+    """Skip layer syncs from property updates, e.g. while editing many layers"""
+    global _sync_suspended
+    _sync_suspended = True
+    try:
+        yield
+    finally:
+        _sync_suspended = False
+
+
+def sync_canvas_layers(context):
+    """Recomposite the tiles touched by changed paint or light layers"""
+    canvas_image = bpy.data.images.get("HDRI_Canvas")
+    if canvas_image is None or _sync_suspended:
+        return
+
+    props = context.scene.hdri_studio
+    canvas = get_layered_canvas(canvas_image, props)
+    _apply_scene_layers(canvas, props)
+    lights = scene_lights(props)
+    canvas.set_lights(lights)
+    rects = canvas.flatten()
+    if rects:
+        _write_result(canvas_image, canvas, lights, rects)
+
+
+def set_canvas_base(context, canvas_image, pixels):
+    """Replace the canvas base, clear painted layers and recomposite the lights
+
+    Args:
+        pixels: (height, width, 4) float32 base pixels
+    """
+    global _canvas, _canvas_image
+
+    props = context.scene.hdri_studio
+    _canvas = LayeredCanvas(pixels, dome=is_dome_canvas(canvas_image))
+    _canvas_image = canvas_image.as_pointer()
+    _apply_scene_layers(_canvas, props)
+    lights = scene_lights(props)
+    _canvas.set_lights(lights)
+    _canvas.flatten()
+    _write_result(canvas_image, _canvas, lights)
+
+
+def fill_canvas(context, canvas_image, color=(0.0, 0.0, 0.0, 1.0)):
+    """Fill the canvas with one RGBA color, keeping paint layers (emptied) and lights
+
+    Without layers the image is filled directly; with layers the base is a
+    constant and only the flattened result is written once.
+    """
+    global _canvas, _canvas_image
+
+    props = context.scene.hdri_studio
+    if not props.paint_layers and not props.light_layers and not canvas_image.get(COMPOSITED_KEY):
+        fill_image(canvas_image, color)
+        return
+
+    width, height = canvas_image.size
+    _canvas = LayeredCanvas.filled(width, height, color, dome=is_dome_canvas(canvas_image))
+    _canvas_image = canvas_image.as_pointer()
+    _apply_scene_layers(_canvas, props)
+    lights = scene_lights(props)
+    _canvas.set_lights(lights)
+    _canvas.flatten()
+    _write_result(canvas_image, _canvas, lights)
+
+
+def fill_image(image, color=(0.0, 0.0, 0.0, 1.0)):
+    """Fill an image with one RGBA color
+
+    Generated images are regenerated by Blender with the new color, so no
+    pixel buffer is built or uploaded from Python. Only colors whose channels
+    are 0 or 1 take that path, as Blender treats the generated color as sRGB.
+    """
+    if image.source == 'GENERATED' and all(channel in (0.0, 1.0) for channel in color):
+        image.generated_color = color
+        image.reload()
+    else:
+        width, height = image.size
+        image.pixels.foreach_set(fill(np.empty((height, width, 4), dtype=np.float32), color).ravel())
+        image.update()
+    forget_image(image)
+    refresh_canvas_texture(image)
+
+
+def _drop_canvas(image):
+    """Drop the cached layered canvas of an image"""
+    global _canvas, _canvas_image
+    if _canvas_image == image.as_pointer():
+        _canvas = None
+        _canvas_image = None
+
+
+def forget_image(image):
+    """Drop the layered canvas, composite info and pyramid of an image whose pixels were replaced"""
+    _drop_canvas(image)
+    if COMPOSITED_KEY in image:
+        image[COMPOSITED_KEY] = ""
+    canvas_changed()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CANVAS IMAGE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def canvas_image_at(width, height, color=(0.0, 0.0, 0.0, 1.0), dome=False):
+    """HDRI_Canvas at width x height filled with color, reusing the existing datablock
+
+    Material and world nodes, image editors and paint settings keep pointing
+    at the same image, so a new canvas doesn't make EEVEE recompile shaders.
+
+    Args:
+        dome: The canvas holds only the upper hemisphere (stored as DOME_KEY)
+    """
+    image = bpy.data.images.get("HDRI_Canvas")
+    if image is None:
+        image = bpy.data.images.new("HDRI_Canvas", width, height, alpha=True, float_buffer=True)
+    else:
+        if image.packed_file:
+            image.unpack(method='REMOVE')
+        # Regenerated by Blender in place at the new size
+        image.source = 'GENERATED'
+        image.filepath = ""
+        image.generated_type = 'BLANK'
+        image.use_generated_float = True
+        image.generated_width = width
+        image.generated_height = height
+    image[DOME_KEY] = dome
+    fill_image(image, color)
+    return image
+
+
+def load_canvas_image(filepath, dome=False):
+    """Load an image file as HDRI_Canvas, reusing the existing datablock
+
+    The file is read by Blender into the same image (see canvas_image_at()).
+
+    Args:
+        dome: The file holds only the upper hemisphere (stored as DOME_KEY)
+
+    Raises:
+        RuntimeError: The file could not be read
+    """
+    image = bpy.data.images.get("HDRI_Canvas")
+    if image is None:
+        image = bpy.data.images.load(filepath)
+        image.name = "HDRI_Canvas"
+    else:
+        if not os.path.isfile(bpy.path.abspath(filepath)):
+            raise RuntimeError(f"Cannot read {filepath}")
+        if image.packed_file:
+            image.unpack(method='REMOVE')
+        image.source = 'FILE'
+        image.filepath = filepath
+        image.reload()
+        if not image.size[0]:
+            raise RuntimeError(f"Cannot read {filepath}")
+    image[DOME_KEY] = dome
+    forget_image(image)
+    return image
+
+
+def paint_target(canvas_image, props):
+    """Layered canvas and layer key strokes paint into
+
+    Returns:
+        tuple: (LayeredCanvas, layer key), or (None, None) when the canvas
+        has no layers and strokes can paint the image pixels directly
+    """
+    if not props.paint_layers and not props.light_layers and not canvas_image.get(COMPOSITED_KEY):
+        # The caller writes the image pixels, which a cached canvas would not
+        # see: rebuild it from the image when layers come back
+        _drop_canvas(canvas_image)
+        return None, None
+
+    canvas = get_layered_canvas(canvas_image, props)
+    _apply_scene_layers(canvas, props)
+    key = _active_layer(props)
+    if key not in canvas.layers:
+        key = BASE_LAYER
+    return canvas, key
+
+
+def _active_layer(props):
+    if 0 <= props.paint_layer_index < len(props.paint_layers):
+        return props.paint_layers[props.paint_layer_index].layer_id
+    return BASE_LAYER
+
+
+def paint_mode_error(props):
+    """Why the brush blend mode cannot paint the active layer, None if it can"""
+    try:
+        check_paint_mode(_active_layer(props), props.paint_blend)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def paint_canvas(canvas_image, props):
+    """Engine Canvas for the next stroke: the active layer, or a copy of the image pixels"""
+    canvas, key = paint_target(canvas_image, props)
+    if canvas is not None:
+        return Canvas.from_layered(canvas, key)
+    return Canvas(_read_pixels(canvas_image))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CANVAS PYRAMID
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def canvas_pyramid(canvas_image):
+    """Mip pyramid of the canvas pixels, built on first use and refreshed incrementally"""
+    global _pyramid, _pyramid_image
+
+    if (_pyramid is None or _pyramid_image != canvas_image.as_pointer()
+            or _pyramid.size != tuple(canvas_image.size)):
+        _pyramid = MipPyramid(_read_pixels(canvas_image))
+        _pyramid_image = canvas_image.as_pointer()
+    else:
+        _pyramid.refresh()
+    return _pyramid
+
+
+def canvas_changed(rect=None, pixels=None):
+    """Record a change of the canvas pixels for the pyramid
+
+    Args:
+        rect: Changed rect, None when the whole canvas may have changed
+        pixels: (height, width, 4) array now holding the canvas pixels
+    """
+    global _pyramid
+    if _pyramid is None:
+        return
+    if rect is None or (pixels is not None and pixels.shape != _pyramid.level(0).shape):
+        # Rebuilt from the image on the next request
+        _pyramid = None
+        return
+    if pixels is not None:
+        _pyramid.set_source(pixels)
+    _pyramid.mark_dirty(rect)
+
+
+def rotate_canvas(context, canvas_image, turns, subpixel=False):
+    """Bake a yaw rotation into the canvas, its paint layers and light layers
+
+    Args:
+        turns: Rotation in full turns, content moves toward +U
+        subpixel: Interpolate fractional pixel shifts instead of rounding
+    """
+    props = context.scene.hdri_studio
+    width, height = canvas_image.size
+    whole, fraction = yaw_shift(turns, width, subpixel)
+    if whole == 0 and fraction == 0.0:
+        return
+
+    canvas_changed()
+    canvas, _ = paint_target(canvas_image, props)
+    if canvas is None:
+        pixels = _read_pixels(canvas_image)
+        roll_yaw(pixels, turns, subpixel, out=pixels)
+        canvas_image.pixels.foreach_set(pixels.ravel())
+        canvas_image.update()
+        refresh_canvas_texture(canvas_image)
+        return
+
+    # Disabled lights move too; composite once after all longitudes changed.
+    # The engine gets the lights back as stored (float32), or the next sync
+    # would see every light as moved and rasterize it again
+    degrees = (whole + fraction) / width * 360.0
+    with suspended_sync():
+        for layer in props.light_layers:
+            layer.longitude = (layer.longitude + degrees + 180.0) % 360.0 - 180.0
+    canvas.rotate_yaw(turns, subpixel, lights=scene_lights(props))
+    sync_canvas_layers(context)
+
+
+def reproject_canvas(context, canvas_image, matrix):
+    """Bake an arbitrary rotation into the canvas, its paint layers and light layers
+
+    Args:
+        matrix: 3x3 rotation, see engine.transform.rotation_matrix()
+    """
+    props = context.scene.hdri_studio
+    canvas_changed()
+    canvas, _ = paint_target(canvas_image, props)
+    if canvas is None:
+        pixels = _read_pixels(canvas_image)
+        canvas_image.pixels.foreach_set(reproject(pixels, matrix, dome=is_dome_canvas(canvas_image)).ravel())
+        canvas_image.update()
+        refresh_canvas_texture(canvas_image)
+        return
+
+    with suspended_sync():
+        for layer in props.light_layers:
+            layer.longitude, layer.latitude = rotate_direction(matrix, layer.longitude, layer.latitude)
+    canvas.rotate(matrix, lights=scene_lights(props))
+    sync_canvas_layers(context)
+
+
+@persistent
+def store_layer_images(*args):
+    """Save painted layer pixels into packed images so they survive reloading"""
+    canvas_image = bpy.data.images.get("HDRI_Canvas")
+    if _canvas is None or canvas_image is None or _canvas_image != canvas_image.as_pointer():
+        return
+
+    keys = set(_canvas.order) if len(_canvas.order) > 1 else set()
+    for image in list(bpy.data.images):
+        if image.name.startswith(LAYER_IMAGE_PREFIX):
+            key = image.name[len(LAYER_IMAGE_PREFIX):]
+            if not key.isdigit() or int(key) not in keys:
+                bpy.data.images.remove(image)
+
+    for key in keys:
+        name = f"{LAYER_IMAGE_PREFIX}{key}"
+        image = bpy.data.images.get(name)
+        if image is None or tuple(image.size) != _canvas.size:
+            if image is not None:
+                bpy.data.images.remove(image)
+            image = bpy.data.images.new(name, _canvas.width, _canvas.height, alpha=True, float_buffer=True)
+            image.use_fake_user = True
+        image.pixels.foreach_set(_canvas.layers[key].pixels.ravel())
+        image.file_format = 'OPEN_EXR'
+        image.pack()
+
+    lights, _ = _composite_info(canvas_image)
+    _store_composite_info(canvas_image, lights, bool(keys))
+
+
+@persistent
+def reset_layered_canvas(*args):
+    """Drop the in-memory canvas when another file is loaded"""
+    global _canvas, _canvas_image
+    _canvas = None
+    _canvas_image = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# OPERATORS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class HDRI_OT_paint_layer_add(Operator):
+    """Add a transparent paint layer above the active layer"""
+    bl_idname = "hdri_studio.paint_layer_add"
+    bl_label = "Add Layer"
+    bl_description = "Add a transparent paint layer to the canvas"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        if "HDRI_Canvas" not in bpy.data.images:
+            self.report({'ERROR'}, "No HDRI canvas found")
+            return {'CANCELLED'}
+
+        props = context.scene.hdri_studio
+        layers = props.paint_layers
+        if not layers:
+            base = layers.add()
+            base.layer_id = BASE_LAYER
+            base.name = "Base"
+
+        layer = layers.add()
+        layer.layer_id = max(other.layer_id for other in layers) + 1
+        layer.name = f"Layer {layer.layer_id}"
+
+        # Place it directly above the active layer
+        active = props.paint_layer_index
+        if not 0 <= active < len(layers) - 1:
+            active = len(layers) - 2
+        layers.move(len(layers) - 1, active + 1)
+        props.paint_layer_index = active + 1
+
+        sync_canvas_layers(context)
+        return {'FINISHED'}
+
+
+class HDRI_OT_paint_layer_remove(Operator):
+    """Remove the active paint layer"""
+    bl_idname = "hdri_studio.paint_layer_remove"
+    bl_label = "Remove Layer"
+    bl_description = "Remove the active paint layer"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        props = context.scene.hdri_studio
+        return (0 <= props.paint_layer_index < len(props.paint_layers)
+                and props.paint_layers[props.paint_layer_index].layer_id != BASE_LAYER)
+
+    def execute(self, context):
+        props = context.scene.hdri_studio
+        props.paint_layers.remove(props.paint_layer_index)
+        props.paint_layer_index = min(props.paint_layer_index, len(props.paint_layers) - 1)
+        if len(props.paint_layers) == 1:
+            props.paint_layers.clear()
+            props.paint_layer_index = 0
+        sync_canvas_layers(context)
+        return {'FINISHED'}
+
+
+class HDRI_OT_paint_layer_move(Operator):
+    """Move the active paint layer up or down"""
+    bl_idname = "hdri_studio.paint_layer_move"
+    bl_label = "Move Layer"
+    bl_description = "Move the active paint layer in the stack"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    direction: bpy.props.EnumProperty(items=[('UP', "Up", ""), ('DOWN', "Down", "")])
+
+    @classmethod
+    def poll(cls, context):
+        props = context.scene.hdri_studio
+        return 1 <= props.paint_layer_index < len(props.paint_layers)
+
+    def execute(self, context):
+        props = context.scene.hdri_studio
+        index = props.paint_layer_index
+        target = index + 1 if self.direction == 'UP' else index - 1
+        # The base always stays at the bottom
+        if not 1 <= target < len(props.paint_layers):
+            return {'CANCELLED'}
+        props.paint_layers.move(index, target)
+        props.paint_layer_index = target
+        sync_canvas_layers(context)
+        return {'FINISHED'}
+
+
+class HDRI_OT_layers_flatten(Operator):
+    """Bake every paint and light layer into the canvas"""
+    bl_idname = "hdri_studio.layers_flatten"
+    bl_label = "Flatten Layers"
+    bl_description = "Merge all paint and light layers into the canvas pixels"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        props = context.scene.hdri_studio
+        return len(props.paint_layers) > 0 or len(props.light_layers) > 0
+
+    def execute(self, context):
+        canvas_image = bpy.data.images.get("HDRI_Canvas")
+        if canvas_image is None:
+            self.report({'ERROR'}, "No HDRI canvas found")
+            return {'CANCELLED'}
+
+        from . import hdri_save
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+
+        props = context.scene.hdri_studio
+        flattened = get_layered_canvas(canvas_image, props).result
+        props.paint_layers.clear()
+        props.paint_layer_index = 0
+        props.light_layers.clear()
+        set_canvas_base(context, canvas_image, flattened)
+
+        self.report({'INFO'}, "Layers flattened")
+        return {'FINISHED'}
+
+
+class HDRI_UL_paint_layers(UIList):
+    """Paint layer list, top layer first"""
+    bl_idname = "HDRI_UL_paint_layers"
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        is_base = item.layer_id == BASE_LAYER
+        row.prop(item, "name", text="", emboss=False, icon='IMAGE_DATA' if is_base else 'RENDERLAYERS')
+        if not is_base:
+            row.prop(item, "visible", text="", emboss=False,
+                     icon='HIDE_OFF' if item.visible else 'HIDE_ON')
+
+    def filter_items(self, context, data, propname):
+        layers = getattr(data, propname)
+        # Show the top of the stack first
+        order = list(reversed(range(len(layers))))
+        return [], order
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REGISTRATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+classes = [
+    HDRI_OT_paint_layer_add,
+    HDRI_OT_paint_layer_remove,
+    HDRI_OT_paint_layer_move,
+    HDRI_OT_layers_flatten,
+    HDRI_UL_paint_layers,
+]
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+    bpy.app.handlers.save_pre.append(store_layer_images)
+    bpy.app.handlers.load_post.append(reset_layered_canvas)
+
+
+def unregister():
+    if store_layer_images in bpy.app.handlers.save_pre:
+        bpy.app.handlers.save_pre.remove(store_layer_images)
+    if reset_layered_canvas in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(reset_layered_canvas)
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
+    reset_layered_canvas()
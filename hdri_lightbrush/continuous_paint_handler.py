@@ -4,13 +4,23 @@ Non-blocking continuous painting on 3D sphere surface.
 """
 
 import bpy
+from bpy.props import StringProperty
 from bpy_extras import view3d_utils
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+import blf
 import gpu
 from gpu_extras.batch import batch_for_shader
 import math
 import time
 import numpy as np
 
+from . import canvas_layers, hdri_save
+from .engine import recording, stroke
+from .engine.canvas import Brush
+from .engine.color import TemperatureBrush, srgb_to_linear
+from .engine.profiler import PROFILER
+from .utils import refresh_canvas_texture
+
 
 # =============================================================================
 # GLOBAL STATE
@@ -20,14 +30,12 @@ _paint_handler_active = False
 _draw_handler = None
 _is_painting = False
 _last_mouse_pos = None
-_last_paint_uv = None
 _last_stable_u = 0.5
 _sphere = None
 _canvas_image = None
-_pixel_buffer = None
-_stroke_base_pixels = None
-_stroke_alpha_buffer = None
-_stroke_paint_count = 0
+_paint_stroke = None  # engine Stroke of the current drag, None between strokes
+_brush_color_key = None  # sRGB color _brush_color_linear was converted from
+_brush_color_linear = None
 _last_visual_update = 0
 _visual_update_interval = 0.033
 
@@ -36,6 +44,9 @@ _dirty_region = None  # Track only changed region
 _update_throttle = 0.016  # 60 FPS cap
 _last_update_time = 0
 
+# Stroke recording (None when not recording)
+_stroke_recorder = None
+
 # Cursor cache
 _last_cursor_pos = None
 _last_brush_radius = None
@@ -47,15 +58,16 @@ _cursor_shader = None
 # COLOR CONVERSION
 # =============================================================================
 
-def srgb_to_linear(color):
-    """Convert sRGB color to Linear color space."""
-    linear = []
-    for c in color[:3]:
-        if c <= 0.04045:
-            linear.append(c / 12.92)
-        else:
-            linear.append(((c + 0.055) / 1.055) ** 2.4)
-    return linear
+def brush_linear_color(brush_color):
+    """Linear float32 RGB of an sRGB brush color, converted once per color change."""
+    global _brush_color_key, _brush_color_linear
+    
+    key = tuple(brush_color[:3])
+    if key != _brush_color_key:
+        _brush_color_linear = srgb_to_linear(key)
+        _brush_color_linear.setflags(write=False)
+        _brush_color_key = key
+    return _brush_color_linear
 
 
 # =============================================================================
@@ -92,8 +104,11 @@ def find_interior_surface(sphere, ray_origin, ray_direction):
 # UV MAPPING
 # =============================================================================
 
-def get_uv_from_hit_point(sphere, hit_point_world):
-    """Get UV coordinate from hit point using equirectangular projection."""
+def get_uv_from_hit_point(sphere, hit_point_world, dome=False):
+    """Get UV coordinate from hit point using equirectangular projection.
+    
+    With dome, V spans the upper hemisphere of a dome canvas.
+    """
     global _last_stable_u
     
     sphere_center = sphere.matrix_world.translation
@@ -104,143 +119,80 @@ def get_uv_from_hit_point(sphere, hit_point_world):
     inv_rot = rot_matrix.inverted()
     direction_local = inv_rot @ direction
     
-    length = math.sqrt(direction_local.x**2 + direction_local.y**2 + direction_local.z**2)
-    if length > 0.0001:
-        direction_local = direction_local / length
-    
-    xy_length = math.sqrt(direction_local.x**2 + direction_local.y**2)
-    
-    # Latitude (V)
-    latitude = math.asin(max(-1.0, min(1.0, direction_local.z)))
-    v = 0.5 + (latitude / math.pi)
-    v = max(0.0, min(1.0, v))
-    
-    # Longitude (U)
-    longitude = math.atan2(direction_local.y, direction_local.x)
-    u = 0.5 - (longitude / (2.0 * math.pi))
-    if u < 0.0:
-        u += 1.0
-    elif u > 1.0:
-        u -= 1.0
-    
-    # Pole stabilization
-    if xy_length > 0.2:
-        _last_stable_u = u
-    else:
-        u_diff = abs(u - _last_stable_u)
-        if u_diff > 0.5:
-            u_diff = 1.0 - u_diff
-        if u_diff > 0.1:
-            u = _last_stable_u
-    
-    return (u, v)
+    uv_coord, _last_stable_u = stroke.direction_to_uv(direction_local, _last_stable_u, dome)
+    return uv_coord
 
 
 # =============================================================================
 # PAINTING
 # =============================================================================
 
-def paint_at_uv(canvas_image, uv_coord, brush_size, brush_color, brush_strength, 
-                brush_hardness, brush_curve=None, is_stroke_start=False, write_to_canvas=True,
-                blend_mode='MIX'):
-    """Paint at UV coordinate using Blender's brush curve for falloff."""
-    global _pixel_buffer, _stroke_base_pixels, _stroke_alpha_buffer
+def sample_brush_curve(brush_curve, samples=256):
+    """Sample a Blender brush falloff curve into a LUT for the paint engine."""
+    curve = brush_curve.curves[0]
+    return np.array([brush_curve.evaluate(curve, i / (samples - 1)) for i in range(samples)],
+                    dtype=np.float32)
+
+
+def scene_brush(props, spacing=0.25, falloff_lut=None):
+    """Engine Brush from the add-on paint settings.
+
+    Args:
+        spacing: Dab spacing as a fraction of the diameter (from the Blender brush)
+        falloff_lut: Sampled Blender brush curve, None for the hardness falloff
+    """
+    blend_mode = props.paint_blend
+    blend_value = {'EXPOSURE': props.paint_exposure,
+                   'LUMINANCE': props.paint_luminance}.get(blend_mode)
+    temperature = None
+    if props.paint_temperature_mode != 'OFF':
+        temperature = TemperatureBrush(
+            props.paint_temperature_mode, props.paint_temperature_start,
+            props.paint_temperature_end, props.paint_temperature_length)
+    
+    return Brush(
+        props.paint_size, props.paint_strength, props.paint_hardness, spacing,
+        tuple(float(c) for c in brush_linear_color(props.paint_color[:3])), blend_mode,
+        falloff_lut, props.paint_subpixel, blend_value, temperature)
+
+
+def begin_paint_stroke(canvas_image, brush):
+    """Start an engine stroke on the canvas layer strokes currently paint into."""
+    global _paint_stroke
     
+    canvas = canvas_layers.paint_canvas(canvas_image, bpy.context.scene.hdri_studio)
+    _paint_stroke = canvas.begin_stroke(brush)
+    return _paint_stroke
+
+
+def end_paint_stroke():
+    """Finish the current stroke and release its buffers."""
+    global _paint_stroke
+    
+    if _paint_stroke is not None:
+        _paint_stroke.end()
+        _paint_stroke = None
+
+
+def paint_at_uv(canvas_image, uv_coord, brush=None, write_to_canvas=True):
+    """Feed one mouse sample to the current stroke and upload the result.
+
+    Spacing, stamping and layer compositing all happen in the engine
+    (engine/canvas.py); this only forwards dirty rects and writes the image.
+    """
     try:
-        width, height = canvas_image.size
-        pixel_x = int(uv_coord[0] * width)
-        pixel_y = int(uv_coord[1] * height)
-        
-        # Initialize stroke buffers
-        if is_stroke_start or _pixel_buffer is None or len(_pixel_buffer) != width * height * 4:
-            _pixel_buffer = np.array(canvas_image.pixels[:], dtype=np.float32)
-            _stroke_base_pixels = _pixel_buffer.copy()
-            _stroke_alpha_buffer = np.zeros((height, width), dtype=np.float32)
-        
-        # Brush bounds
-        x_min = max(0, pixel_x - brush_size)
-        x_max = min(width, pixel_x + brush_size + 1)
-        y_min = max(0, pixel_y - brush_size)
-        y_max = min(height, pixel_y + brush_size + 1)
-        
-        if x_max - x_min <= 0 or y_max - y_min <= 0:
-            return True
-        
-        # Distance calculation
-        yy, xx = np.ogrid[y_min-pixel_y:y_max-pixel_y, x_min-pixel_x:x_max-pixel_x]
-        dist_sq = xx*xx + yy*yy
-        mask = dist_sq <= brush_size * brush_size
-        
-        if not np.any(mask):
+        rects = _paint_stroke.add_sample(uv_coord, brush, flatten=write_to_canvas)
+        if not rects:
             return True
         
-        dist = np.sqrt(dist_sq)
-        normalized_dist = dist / brush_size
-        
-        # Calculate falloff using brush curve
-        if brush_curve is not None:
-            flat_dist = normalized_dist.flatten()
-            flat_falloff = np.array([
-                brush_curve.evaluate(brush_curve.curves[0], d) if d <= 1.0 else 0.0
-                for d in flat_dist
-            ])
-            falloff = np.clip(flat_falloff.reshape(normalized_dist.shape), 0, 1)
-        else:
-            # Fallback hardness-based
-            if brush_hardness >= 0.99:
-                falloff = np.ones_like(dist)
-            else:
-                falloff = np.ones_like(dist)
-                outer_mask = normalized_dist > brush_hardness
-                if np.any(outer_mask) and brush_hardness < 1.0:
-                    outer_dist = (normalized_dist[outer_mask] - brush_hardness) / (1.0 - brush_hardness)
-                    falloff[outer_mask] = 1.0 - outer_dist * outer_dist
-                falloff = np.clip(falloff, 0, 1)
-        
-        # Calculate alpha and apply stroke buffer (prevents accumulation)
-        dab_alpha = (falloff * brush_strength) * mask
-        alpha_region = _stroke_alpha_buffer[y_min:y_max, x_min:x_max]
-        np.maximum(alpha_region, dab_alpha, out=alpha_region)
-        
-        # Blend colors based on blend mode
-        base_2d = _stroke_base_pixels.reshape((height, width, 4))
-        pixels_2d = _pixel_buffer.reshape((height, width, 4))
-        
-        base_region = base_2d[y_min:y_max, x_min:x_max, :3]
-        region = pixels_2d[y_min:y_max, x_min:x_max, :3]
-        
-        alpha_3d = alpha_region[:, :, np.newaxis]
-        brush_rgb = np.array(srgb_to_linear(brush_color), dtype=np.float32)
-        
-        # Apply different blend modes
-        if blend_mode == 'MIX':
-            # Normal blend - replaces color
-            blended = brush_rgb
-        elif blend_mode == 'ADD':
-            # Add - brightens
-            blended = base_region + brush_rgb
-        elif blend_mode == 'MULTIPLY':
-            # Multiply - darkens
-            blended = base_region * brush_rgb
-        elif blend_mode == 'LIGHTEN':
-            # Lighten - only lightens pixels
-            blended = np.maximum(base_region, brush_rgb)
-        elif blend_mode == 'DARKEN':
-            # Darken - only darkens pixels
-            blended = np.minimum(base_region, brush_rgb)
-        elif blend_mode == 'ERASE':
-            # Erase to black
-            blended = np.zeros_like(brush_rgb)
-        else:
-            blended = brush_rgb
-        
-        region[:] = base_region * (1.0 - alpha_3d) + blended * alpha_3d
-        
-        # Clamp values
-        np.clip(region, 0.0, None, out=region)  # Allow HDR values > 1.0
+        canvas = _paint_stroke.canvas
+        for rect in rects:
+            canvas_layers.canvas_changed(rect, canvas.result)
         
         if write_to_canvas:
-            canvas_image.pixels.foreach_set(_pixel_buffer)
+            t_start = PROFILER.start()
+            canvas_image.pixels.foreach_set(canvas.result.ravel())
+            PROFILER.stop('foreach_set', t_start)
         
         return True
         
@@ -261,10 +213,13 @@ def update_3d_viewport():
     
     if _canvas_image:
         # Force GPU texture update - critical for Blender 5.0
+        t_start = PROFILER.start()
         _canvas_image.update()
         _canvas_image.gl_free()  # Free old GPU texture
         _canvas_image.gl_load()  # Reload to GPU
+        PROFILER.stop('gpu_upload', t_start)
     
+    t_start = PROFILER.start()
     if _sphere and _sphere.active_material:
         _sphere.active_material.update_tag()
         # Force node tree update for texture refresh
@@ -274,6 +229,7 @@ def update_3d_viewport():
     # Force depsgraph update
     if bpy.context.view_layer:
         bpy.context.view_layer.update()
+    PROFILER.stop('depsgraph', t_start)
     
     # Tag all 3D viewports for redraw
     for window in bpy.context.window_manager.windows:
@@ -316,6 +272,8 @@ def mouse_event_handler(context, event):
         if _is_painting and event.type == 'LEFTMOUSE' and event.value == 'RELEASE':
             _is_painting = False
             _last_mouse_pos = None
+            if _stroke_recorder is not None:
+                _stroke_recorder.end_stroke()
         return
     
     if event.type == 'LEFTMOUSE':
@@ -329,30 +287,38 @@ def mouse_event_handler(context, event):
                 paint_at_mouse(context, event, is_stroke_end=True)
             _is_painting = False
             _last_mouse_pos = None
+            if _stroke_recorder is not None:
+                _stroke_recorder.end_stroke()
     elif event.type == 'MOUSEMOVE' and _is_painting:
         paint_at_mouse(context, event, is_stroke_continue=True)
 
 
 def paint_at_mouse(context, event, is_stroke_start=False, is_stroke_continue=False, is_stroke_end=False):
     """Paint at mouse position with spacing-based interpolation."""
-    global _sphere, _canvas_image, _last_paint_uv, _stroke_paint_count, _last_visual_update
+    global _sphere, _canvas_image, _last_visual_update
     
     _canvas_image = bpy.data.images.get("HDRI_Canvas")
     if not _sphere or not _canvas_image:
         return
     
+    t_event = PROFILER.start()
     try:
         region = context.region
         region_3d = context.space_data.region_3d
         mouse_coord = (event.mouse_region_x, event.mouse_region_y)
         
+        t_start = PROFILER.start()
         ray_origin = view3d_utils.region_2d_to_origin_3d(region, region_3d, mouse_coord)
         ray_direction = view3d_utils.region_2d_to_vector_3d(region, region_3d, mouse_coord)
         
         interior_location, face_index, _ = find_interior_surface(_sphere, ray_origin, ray_direction)
+        PROFILER.stop('raycast', t_start)
         
         if interior_location and face_index is not None:
-            uv_coord = get_uv_from_hit_point(_sphere, interior_location)
+            t_start = PROFILER.start()
+            uv_coord = get_uv_from_hit_point(_sphere, interior_location,
+                                             canvas_layers.is_dome_canvas(_canvas_image))
+            PROFILER.stop('uv', t_start)
             
             if uv_coord:
                 try:
@@ -360,16 +326,6 @@ def paint_at_mouse(context, event, is_stroke_start=False, is_stroke_continue=Fal
                 except Exception:
                     return
                 
-                # Get brush settings from our addon properties (Blender 5.0 compatible)
-                props = bpy.context.scene.hdri_studio
-                
-                # Read our custom brush settings
-                brush_color = tuple(props.paint_color[:3])
-                brush_radius = props.paint_size
-                brush_strength = props.paint_strength
-                brush_hardness = props.paint_hardness
-                blend_mode = props.paint_blend
-                
                 # Get brush reference for curve/spacing (optional)
                 brush = None
                 brush_curve = None
@@ -389,46 +345,21 @@ def paint_at_mouse(context, event, is_stroke_start=False, is_stroke_continue=Fal
                 except:
                     pass
                 
-                width, height = _canvas_image.size
-                spacing_px = max(1, brush_spacing * brush_radius * 2)
+                # Get brush settings from our addon properties (Blender 5.0 compatible)
+                falloff_lut = sample_brush_curve(brush_curve) if brush_curve is not None else None
+                paint_brush = scene_brush(bpy.context.scene.hdri_studio, brush_spacing, falloff_lut)
                 
-                if is_stroke_start or _last_paint_uv is None:
-                    try:
-                        paint_at_uv(_canvas_image, uv_coord, brush_radius, brush_color,
-                                   brush_strength, brush_hardness, brush_curve,
-                                   is_stroke_start=True, write_to_canvas=True, blend_mode=blend_mode)
-                    except Exception:
-                        pass
-                    _stroke_paint_count += 1
-                    _last_paint_uv = uv_coord
-                else:
-                    dx = uv_coord[0] - _last_paint_uv[0]
-                    dy = uv_coord[1] - _last_paint_uv[1]
-                    
-                    # Wrap-around detection
-                    if abs(dx) > 0.5:
-                        paint_at_uv(_canvas_image, uv_coord, brush_radius, brush_color,
-                                   brush_strength, brush_hardness, brush_curve,
-                                   is_stroke_start=False, write_to_canvas=True, blend_mode=blend_mode)
-                        _stroke_paint_count += 1
-                        _last_paint_uv = uv_coord
-                    else:
-                        dx_px = dx * width
-                        dy_px = dy * height
-                        distance_px = (dx_px*dx_px + dy_px*dy_px) ** 0.5
-                        
-                        if distance_px >= spacing_px:
-                            num_dabs = int(distance_px / spacing_px)
-                            for i in range(1, num_dabs + 1):
-                                t = (i * spacing_px) / distance_px
-                                interp_uv = (_last_paint_uv[0] + dx * t, _last_paint_uv[1] + dy * t)
-                                paint_at_uv(_canvas_image, interp_uv, brush_radius, brush_color,
-                                           brush_strength, brush_hardness, brush_curve,
-                                           is_stroke_start=False, write_to_canvas=(i == num_dabs), blend_mode=blend_mode)
-                                _stroke_paint_count += 1
-                            
-                            final_t = (num_dabs * spacing_px) / distance_px
-                            _last_paint_uv = (_last_paint_uv[0] + dx * final_t, _last_paint_uv[1] + dy * final_t)
+                new_stroke = (is_stroke_start or _paint_stroke is None
+                              or _paint_stroke.canvas.size != tuple(_canvas_image.size))
+                if new_stroke:
+                    begin_paint_stroke(_canvas_image, paint_brush)
+                
+                if _stroke_recorder is not None:
+                    if new_stroke:
+                        _stroke_recorder.begin_stroke(tuple(_canvas_image.size), paint_brush)
+                    _stroke_recorder.add_sample(uv_coord, getattr(event, 'pressure', 1.0))
+                
+                paint_at_uv(_canvas_image, uv_coord, paint_brush)
                 
                 # Throttled update
                 current_time = time.time()
@@ -436,10 +367,41 @@ def paint_at_mouse(context, event, is_stroke_start=False, is_stroke_continue=Fal
                     update_3d_viewport()
                     _last_visual_update = current_time
                     if is_stroke_end:
-                        _last_paint_uv = None
+                        end_paint_stroke()
     
     except Exception:
         pass
+    
+    PROFILER.stop('event', t_event)
+
+
+# =============================================================================
+# PROFILER OVERLAY
+# =============================================================================
+
+def draw_profiler_overlay(region):
+    """Draw rolling p50/p95 stage timings in the top-left corner of the viewport."""
+    rows = PROFILER.summary()
+    font_id = 0
+    line_height = 16
+    x = 20
+    y = region.height - 60
+    
+    blf.size(font_id, 12)
+    blf.color(font_id, 1.0, 1.0, 1.0, 0.9)
+    blf.position(font_id, x, y, 0)
+    blf.draw(font_id, "Stage            p50 ms    p95 ms")
+    
+    if not rows:
+        y -= line_height
+        blf.position(font_id, x, y, 0)
+        blf.draw(font_id, "(paint to collect samples)")
+        return
+    
+    for stage, _, p50, p95 in rows:
+        y -= line_height
+        blf.position(font_id, x, y, 0)
+        blf.draw(font_id, f"{stage:<14}{p50:>9.2f}{p95:>10.2f}")
 
 
 # =============================================================================
@@ -458,6 +420,12 @@ def draw_handler_callback():
     if not context.area or context.area.type != 'VIEW_3D':
         return
     
+    if PROFILER.enabled and context.region:
+        try:
+            draw_profiler_overlay(context.region)
+        except Exception:
+            pass
+    
     # Get brush radius
     try:
         ts = bpy.context.scene.tool_settings
@@ -505,6 +473,34 @@ def draw_handler_callback():
 # ENABLE/DISABLE
 # =============================================================================
 
+def start_stroke_recording(filepath):
+    """Start recording 3D paint strokes to a file (see engine/recording.py)."""
+    global _stroke_recorder
+    
+    stop_stroke_recording()
+    _stroke_recorder = recording.StrokeRecorder(filepath)
+
+
+def stop_stroke_recording():
+    """Finish and close the active stroke recording, if any."""
+    global _stroke_recorder
+    
+    if _stroke_recorder is not None:
+        _stroke_recorder.close()
+        _stroke_recorder = None
+
+
+def update_stroke_recording(props):
+    """Start or stop recording to match the scene settings while painting is active."""
+    if props.record_strokes and _paint_handler_active:
+        try:
+            start_stroke_recording(bpy.path.abspath(props.stroke_recording_path))
+        except OSError:
+            pass
+    else:
+        stop_stroke_recording()
+
+
 def enable_continuous_paint(context):
     """Enable continuous painting mode."""
     global _paint_handler_active, _draw_handler, _sphere, _canvas_image
@@ -520,6 +516,7 @@ def enable_continuous_paint(context):
             draw_handler_callback, (), 'WINDOW', 'POST_PIXEL')
     
     _paint_handler_active = True
+    update_stroke_recording(context.scene.hdri_studio)
     bpy.ops.hdri_studio.continuous_paint_modal('INVOKE_DEFAULT')
     return True
 
@@ -529,6 +526,8 @@ def disable_continuous_paint():
     global _paint_handler_active, _draw_handler, _is_painting
     
     _is_painting = False
+    end_paint_stroke()
+    stop_stroke_recording()
     
     if _draw_handler is not None:
         bpy.types.SpaceView3D.draw_handler_remove(_draw_handler, 'WINDOW')
@@ -600,6 +599,8 @@ class HDRI_OT_continuous_paint_modal(bpy.types.Operator):
         if not is_mouse_in_main_region(context, event):
             if _is_painting and event.type == 'LEFTMOUSE' and event.value == 'RELEASE':
                 _is_painting = False
+                if _stroke_recorder is not None:
+                    _stroke_recorder.end_stroke()
             return {'PASS_THROUGH'}
         
         sphere = bpy.data.objects.get("HDRI_Preview_Sphere")
@@ -618,6 +619,11 @@ class HDRI_OT_continuous_paint_modal(bpy.types.Operator):
                 location, _, _ = find_interior_surface(sphere, ray_origin, ray_direction)
                 
                 if location is not None:
+                    error = (hdri_save.streaming_load_error()
+                             or canvas_layers.paint_mode_error(context.scene.hdri_studio))
+                    if error:
+                        self.report({'WARNING'}, error)
+                        return {'RUNNING_MODAL'}
                     mouse_event_handler(context, event)
                     context.area.tag_redraw()
                     return {'RUNNING_MODAL'}
@@ -657,6 +663,73 @@ class HDRI_OT_continuous_paint_modal(bpy.types.Operator):
             context.area.tag_redraw()
 
 
+class HDRI_OT_profiler_export_csv(bpy.types.Operator, ExportHelper):
+    """Write the buffered paint stage timings to a CSV file"""
+    bl_idname = "hdri_studio.profiler_export_csv"
+    bl_label = "Export Profile CSV"
+    
+    filename_ext = ".csv"
+    
+    filter_glob: StringProperty(
+        default="*.csv",
+        options={'HIDDEN'}
+    )
+    
+    def execute(self, context):
+        try:
+            PROFILER.write_csv(self.filepath)
+        except OSError as e:
+            self.report({'ERROR'}, f"Export failed: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Profile saved: {self.filepath}")
+        return {'FINISHED'}
+
+
+class HDRI_OT_replay_strokes(bpy.types.Operator, ImportHelper):
+    """Replay a stroke recording onto the canvas at maximum speed"""
+    bl_idname = "hdri_studio.replay_strokes"
+    bl_label = "Replay Strokes"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    filter_glob: StringProperty(
+        default="*.hlbr",
+        options={'HIDDEN'}
+    )
+    
+    def execute(self, context):
+        canvas_image = bpy.data.images.get("HDRI_Canvas")
+        if not canvas_image:
+            self.report({'ERROR'}, "No HDRI canvas found")
+            return {'CANCELLED'}
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+        
+        try:
+            strokes = recording.read_recording(self.filepath)
+        except (OSError, ValueError) as e:
+            self.report({'ERROR'}, f"Replay failed: {e}")
+            return {'CANCELLED'}
+        
+        # Replay into the active layer, like the paint handler
+        canvas = canvas_layers.paint_canvas(canvas_image, context.scene.hdri_studio)
+        start = time.perf_counter()
+        try:
+            stats = recording.replay_strokes(strokes, canvas)
+        except ValueError as e:
+            self.report({'ERROR'}, f"Replay failed: {e}")
+            return {'CANCELLED'}
+        elapsed = time.perf_counter() - start
+        
+        canvas_image.pixels.foreach_set(canvas.result.ravel())
+        canvas_layers.canvas_changed()
+        refresh_canvas_texture(canvas_image)
+        
+        self.report({'INFO'}, f"Replayed {len(strokes)} strokes, {stats['dabs']} dabs in {elapsed * 1000:.0f} ms")
+        return {'FINISHED'}
+
+
 # =============================================================================
 # REGISTRATION
 # =============================================================================
@@ -665,6 +738,8 @@ classes = [
     HDRI_OT_continuous_paint_enable,
     HDRI_OT_continuous_paint_disable,
     HDRI_OT_continuous_paint_modal,
+    HDRI_OT_profiler_export_csv,
+    HDRI_OT_replay_strokes,
 ]
 
 
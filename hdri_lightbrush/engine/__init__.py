@@ -0,0 +1,88 @@
+"""
+HDRI LightBrush - Paint Engine
+bpy-free rasterization core (dab stamping, blending, stroke spacing, lights, layers,
+color management, tone mapping, canvas transforms, mip pyramid, light extraction,
+preview sphere mesh, full-sphere and dome canvas projections).
+
+Everything in this package works on plain NumPy arrays so it can be
+benchmarked and reused outside Blender. Modules here must only use
+relative imports between themselves and never import bpy. Painting goes
+through the Canvas / Stroke / Brush objects of canvas.py; the add-on's
+operators only translate Blender state into them.
+"""
+
+from .blend import BLEND_KERNELS, SCRATCH, BlendScratch, blend_region
+from .color import (
+    TemperatureBrush, kelvin_to_linear, linear_to_kelvin, linear_to_srgb, retemperature,
+    srgb_to_linear,
+)
+from .projection import DOME_ASPECT, canvas_height
+from .tonemap import TONEMAP_OPERATORS, display_srgb, thumbnail
+from .transform import reproject, roll_yaw, rotation_matrix
+from .pyramid import MipPyramid
+from .extraction import Lobe, find_lobes, remove_lobes
+from .sphere_mesh import cube_sphere, equirect_uvs, sphere_subdivisions
+from .raster import brush_falloff, dab_position, stamp_dab, uv_to_pixel
+from .stamp_cache import STAMP_CACHE, StampCache
+from .stroke import direction_to_uv, stroke_dabs
+from .light_layers import LIGHT_SHAPES, LightLayer, LightStack, rasterize_light
+from .layers import BASE_LAYER, LayeredCanvas, PixelLayer
+from .canvas import Brush, Canvas, Stroke
+from .profiler import PROFILER, STAGES, StageProfiler
+from .recording import (
+    BrushSnapshot, RecordedStroke, StrokeRecorder, read_recording, replay_strokes,
+)
+
+__all__ = [
+    "BLEND_KERNELS",
+    "SCRATCH",
+    "BlendScratch",
+    "blend_region",
+    "TemperatureBrush",
+    "kelvin_to_linear",
+    "linear_to_kelvin",
+    "linear_to_srgb",
+    "retemperature",
+    "srgb_to_linear",
+    "DOME_ASPECT",
+    "canvas_height",
+    "TONEMAP_OPERATORS",
+    "display_srgb",
+    "thumbnail",
+    "reproject",
+    "roll_yaw",
+    "rotation_matrix",
+    "MipPyramid",
+    "Lobe",
+    "find_lobes",
+    "remove_lobes",
+    "cube_sphere",
+    "equirect_uvs",
+    "sphere_subdivisions",
+    "brush_falloff",
+    "dab_position",
+    "stamp_dab",
+    "uv_to_pixel",
+    "STAMP_CACHE",
+    "StampCache",
+    "direction_to_uv",
+    "stroke_dabs",
+    "LIGHT_SHAPES",
+    "LightLayer",
+    "LightStack",
+    "rasterize_light",
+    "BASE_LAYER",
+    "LayeredCanvas",
+    "PixelLayer",
+    "Brush",
+    "Canvas",
+    "Stroke",
+    "PROFILER",
+    "STAGES",
+    "StageProfiler",
+    "BrushSnapshot",
+    "RecordedStroke",
+    "StrokeRecorder",
+    "read_recording",
+    "replay_strokes",
+]
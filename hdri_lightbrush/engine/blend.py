@@ -0,0 +1,211 @@
+"""
+HDRI LightBrush - Blend Kernels
+In-place blend modes for dab compositing.
+
+Every color kernel computes
+
+    out = base + (blended(base, color) - base) * alpha
+
+directly into `out` using preallocated scratch buffers, so compositing a
+dab allocates nothing. `out` and `base` may be strided views into the
+canvas (e.g. pixels[y0:y1, x0:x1, :3]); alpha is (h, w, 1) and broadcasts.
+
+The HDR kernels (EXPOSURE, LUMINANCE) interpolate in log space instead,
+so alpha is a fraction of stops and hue/saturation are preserved.
+"""
+
+import numpy as np
+
+
+# =============================================================================
+# SCRATCH BUFFERS
+# =============================================================================
+
+class BlendScratch:
+    """Named scratch buffers reused across dabs, grown on demand."""
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.float32):
+        """Return a C-contiguous view of at least the given shape (contents undefined)."""
+        size = 1
+        for dim in shape:
+            size *= dim
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = np.empty(max(size, 1), dtype=dtype)
+            self._buffers[name] = buffer
+        return buffer[:size].reshape(shape)
+
+    def clear(self):
+        """Release all scratch memory."""
+        self._buffers.clear()
+
+
+# Shared instance used by stamp_dab()
+SCRATCH = BlendScratch()
+
+
+# =============================================================================
+# KERNELS
+# =============================================================================
+
+def _lerp_to(out, base, tmp, alpha):
+    """out = base + tmp * alpha, where tmp already holds (blended - base)."""
+    tmp *= alpha
+    np.add(base, tmp, out=out)
+
+
+def blend_mix(out, base, alpha, color, scratch, value=None):
+    """Normal blend - replaces color."""
+    tmp = scratch.get('tmp', base.shape)
+    np.subtract(color, base, out=tmp)
+    _lerp_to(out, base, tmp, alpha)
+
+
+def blend_add(out, base, alpha, color, scratch, value=None):
+    """Add - brightens."""
+    tmp = scratch.get('tmp', base.shape)
+    np.multiply(alpha, color, out=tmp)
+    np.add(base, tmp, out=out)
+
+
+def blend_multiply(out, base, alpha, color, scratch, value=None):
+    """Multiply - darkens. out = base * (1 + (color - 1) * alpha)."""
+    tmp = scratch.get('tmp', base.shape)
+    np.multiply(alpha, color - 1.0, out=tmp)
+    tmp += 1.0
+    np.multiply(base, tmp, out=out)
+
+
+def blend_lighten(out, base, alpha, color, scratch, value=None):
+    """Lighten - only lightens pixels."""
+    tmp = scratch.get('tmp', base.shape)
+    np.maximum(base, color, out=tmp)
+    tmp -= base
+    _lerp_to(out, base, tmp, alpha)
+
+
+def blend_darken(out, base, alpha, color, scratch, value=None):
+    """Darken - only darkens pixels."""
+    tmp = scratch.get('tmp', base.shape)
+    np.minimum(base, color, out=tmp)
+    tmp -= base
+    _lerp_to(out, base, tmp, alpha)
+
+
+def blend_erase(out, base, alpha, color, scratch, value=None):
+    """Erase to black. out = base * (1 - alpha)."""
+    tmp = scratch.get('tmp', base.shape)
+    np.multiply(base, alpha, out=tmp)
+    np.subtract(base, tmp, out=out)
+
+
+def blend_screen(out, base, alpha, color, scratch, value=None):
+    """Screen - brightens without exceeding white for LDR values.
+
+    screen(b, c) = 1 - (1 - b)(1 - c), so screen - b = c * (1 - b).
+    """
+    tmp = scratch.get('tmp', base.shape)
+    np.subtract(1.0, base, out=tmp)
+    tmp *= color
+    _lerp_to(out, base, tmp, alpha)
+
+
+def blend_overlay(out, base, alpha, color, scratch, value=None):
+    """Overlay - multiply in the darks, screen in the lights."""
+    tmp = scratch.get('tmp', base.shape)
+    light = scratch.get('tmp2', base.shape)
+    is_light = scratch.get('mask', base.shape, dtype=np.bool_)
+
+    # Dark half: 2 * b * c
+    np.multiply(base, 2.0 * color, out=tmp)
+    # Light half: 1 - 2 * (1 - b) * (1 - c)
+    np.subtract(1.0, base, out=light)
+    light *= 2.0 * (1.0 - color)
+    np.subtract(1.0, light, out=light)
+
+    np.greater_equal(base, 0.5, out=is_light)
+    np.copyto(tmp, light, where=is_light)
+    tmp -= base
+    _lerp_to(out, base, tmp, alpha)
+
+
+# Rec.709 luminance weights for linear RGB
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+
+# Luminance below this is treated as neutral black
+_MIN_LUMINANCE = 1e-6
+
+
+def blend_exposure(out, base, alpha, color, scratch, value=None):
+    """Exposure - push or pull pixels by `value` EV stops. out = base * 2^(value * alpha)."""
+    factor = scratch.get('factor', alpha.shape)
+    np.multiply(alpha, (value or 0.0) * np.log(2.0), out=factor)
+    np.exp(factor, out=factor)
+    np.multiply(base, factor, out=out)
+
+
+def luminance(rgb, out=None):
+    """Rec.709 luminance of linear RGB pixels, shape (..., 1)."""
+    return np.matmul(rgb, LUMINANCE_WEIGHTS[:, np.newaxis], out=out)
+
+
+def blend_luminance(out, base, alpha, color, scratch, value=None):
+    """Set luminance - scale pixels toward luminance `value`, keeping chroma.
+
+    out = base * (value / Y(base)) ^ alpha. Black pixels have no chroma and
+    become neutral gray.
+    """
+    target = max(value if value is not None else 1.0, _MIN_LUMINANCE)
+    work = scratch.get('tmp', base.shape)
+    lum = scratch.get('factor', alpha.shape)
+    is_black = scratch.get('mask', alpha.shape, dtype=np.bool_)
+
+    np.copyto(work, base)
+    luminance(work, out=lum)
+    np.less(lum, _MIN_LUMINANCE, out=is_black)
+    np.copyto(work, _MIN_LUMINANCE, where=is_black)
+    np.maximum(lum, _MIN_LUMINANCE, out=lum)
+
+    # factor = exp(alpha * (ln(target) - ln(Y)))
+    np.log(lum, out=lum)
+    np.subtract(np.log(target), lum, out=lum)
+    lum *= alpha
+    np.exp(lum, out=lum)
+    np.multiply(work, lum, out=out)
+
+
+BLEND_KERNELS = {
+    'MIX': blend_mix,
+    'ADD': blend_add,
+    'MULTIPLY': blend_multiply,
+    'LIGHTEN': blend_lighten,
+    'DARKEN': blend_darken,
+    'ERASE': blend_erase,
+    'SCREEN': blend_screen,
+    'OVERLAY': blend_overlay,
+    'EXPOSURE': blend_exposure,
+    'LUMINANCE': blend_luminance,
+}
+
+
+def blend_region(out, base, alpha, color, blend_mode='MIX', scratch=None, value=None):
+    """Blend color over base into out with the named kernel, then clamp negatives.
+
+    Unknown modes fall back to MIX.
+
+    Args:
+        out: (h, w, 3) float32 destination, may alias a canvas view
+        base: (h, w, 3) float32 source pixels
+        alpha: (h, w, 1) float32 coverage
+        color: (3,) float32 linear RGB
+        blend_mode: Key of BLEND_KERNELS
+        scratch: BlendScratch to use, defaults to the shared SCRATCH
+        value: Mode parameter - EV stops for EXPOSURE, target luminance
+            for LUMINANCE; ignored by the color modes
+    """
+    kernel = BLEND_KERNELS.get(blend_mode, blend_mix)
+    kernel(out, base, alpha, color, scratch if scratch is not None else SCRATCH, value)
+    np.maximum(out, 0.0, out=out)  # Allow HDR values > 1.0
@@ -0,0 +1,159 @@
+"""
+HDRI LightBrush - Canvas Object Model
+Brush, Canvas and Stroke: the paint pipeline as plain NumPy objects.
+
+    canvas = Canvas(pixels)                  # or Canvas.from_layered(layered, key)
+    stroke = canvas.begin_stroke(brush)
+    for uv in mouse_samples:
+        rects = stroke.add_sample(uv)        # dabs stamped, layers recomposited
+        upload(canvas.result, rects)
+    stroke.end()
+
+The Blender paint handler, stroke replay and the benchmarks all paint
+through these classes, so headless runs exercise the exact same path.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .layers import BASE_LAYER, check_paint_mode, union_rects
+from .raster import dab_color, dab_position, stamp_dab
+from .stroke import stroke_dabs
+
+
+# Engine inputs for one stroke (color is linear RGB, spacing a fraction of the diameter,
+# blend_value the EV / target luminance of the HDR blend modes, temperature
+# an optional color.TemperatureBrush that overrides color)
+_BrushFields = namedtuple('Brush', [
+    'radius', 'strength', 'hardness', 'spacing', 'color', 'blend_mode', 'falloff_lut', 'subpixel',
+    'blend_value', 'temperature',
+], defaults=(False, None, None))
+
+
+class Brush(_BrushFields):
+    """Immutable brush settings of one stroke."""
+    __slots__ = ()
+
+    @property
+    def spacing_px(self):
+        """Distance between dabs in pixels."""
+        return max(1, self.spacing * self.radius * 2)
+
+
+class Canvas:
+    """Pixels strokes paint into: a plain buffer or one layer of a LayeredCanvas."""
+
+    def __init__(self, pixels, layered=None, layer=BASE_LAYER):
+        """
+        Args:
+            pixels: (height, width, 4) float32 buffer painted in place
+            layered: LayeredCanvas that owns pixels, recomposited after dabs
+            layer: Key of the layer pixels belong to
+        """
+        self.pixels = pixels
+        self.layered = layered
+        self.layer = layer
+        self.height, self.width = pixels.shape[:2]
+
+    @classmethod
+    def from_layered(cls, layered, layer=BASE_LAYER):
+        """Canvas painting one layer of a LayeredCanvas."""
+        return cls(layered.layers[layer].pixels, layered, layer)
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def result(self):
+        """What the canvas looks like: the flattened stack, or the pixels themselves."""
+        return self.layered.result if self.layered is not None else self.pixels
+
+    def check_brush(self, brush):
+        """Raise ValueError if brush cannot paint this canvas (see layers.check_paint_mode)."""
+        check_paint_mode(self.layer, brush.blend_mode)
+
+    def begin_stroke(self, brush):
+        """Snapshot the canvas and start a stroke."""
+        return Stroke(self, brush)
+
+    def flatten(self):
+        """Recomposite painted rects into result (no-op without layers)."""
+        if self.layered is not None:
+            self.layered.flatten()
+
+
+class Stroke:
+    """One drag of the brush: spacing, stamping and coverage against a snapshot."""
+
+    def __init__(self, canvas, brush):
+        canvas.check_brush(brush)
+        self.canvas = canvas
+        self.brush = brush
+        self.base = canvas.pixels.copy()
+        self.alpha = np.zeros((canvas.height, canvas.width), dtype=np.float32)
+        self.last_uv = None
+        # Stroke length in pixels up to the next dab (drives temperature brushes)
+        self.distance = 0.0
+        self.dab_count = 0
+        # Union of everything this stroke touched
+        self.bounds = None
+
+    def add_sample(self, uv_coord, brush=None, flatten=True):
+        """Stamp the dabs between the previous sample and uv_coord.
+
+        Args:
+            uv_coord: Mouse sample in canvas UV
+            brush: Settings for this and later samples (default: unchanged)
+            flatten: Recomposite a layered canvas once after the dabs
+
+        Returns:
+            list: Dirty rects of the stamped dabs
+
+        Raises:
+            ValueError: brush cannot paint the canvas layer
+        """
+        if brush is not None:
+            self.canvas.check_brush(brush)
+            self.brush = brush
+        dab_uvs, self.last_uv = stroke_dabs(self.last_uv, uv_coord, self.canvas.width,
+                                            self.canvas.height, self.brush.spacing_px)
+        rects = []
+        for dab_uv in dab_uvs:
+            rect = self.stamp(dab_uv)
+            if rect is not None:
+                rects.append(rect)
+        if rects and flatten:
+            self.canvas.flatten()
+        return rects
+
+    def stamp(self, uv_coord):
+        """Stamp a single dab at uv_coord (no spacing), returning its dirty rect or None."""
+        brush = self.brush
+        canvas = self.canvas
+        center, phase = dab_position(uv_coord, canvas.width, canvas.height, brush.subpixel)
+        color = dab_color(brush.color, brush.temperature, brush.radius, phase, self.distance)
+        rect = stamp_dab(canvas.pixels, self.base, self.alpha, center, brush.radius, color,
+                         brush.strength, brush.hardness, falloff_lut=brush.falloff_lut,
+                         blend_mode=brush.blend_mode, phase=phase, blend_value=brush.blend_value)
+        self.distance += brush.spacing_px
+        self.dab_count += 1
+        if rect is None:
+            return None
+
+        if canvas.layered is not None:
+            canvas.layered.paint_coverage(canvas.layer, rect, self.base, self.alpha, brush.blend_mode)
+            canvas.layered.painted(canvas.layer, rect)
+        self.bounds = union_rects(self.bounds, rect)
+        return rect
+
+    def end(self):
+        """Release the stroke buffers.
+
+        Returns:
+            tuple: Rect of everything the stroke touched, or None
+        """
+        self.base = None
+        self.alpha = None
+        return self.bounds
@@ -0,0 +1,246 @@
+"""
+HDRI LightBrush - Color
+Vectorized color management: sRGB transfer functions and blackbody color
+temperature (tone mapping for display lives in tonemap.py).
+
+All conversions work on whole NumPy arrays (a color, a dab or the canvas)
+and accept an `out` buffer where it saves an allocation.
+
+The blackbody table is built once from Planck's law integrated against the
+CIE 1931 observer (the multi-lobe Gaussian fit of Wyman, Sloan and Shirley),
+converted to linear sRGB and normalized so the brightest channel is 1.
+Lookups interpolate the table, so whole pixel arrays convert in one call.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .blend import luminance
+from .parallel import ROW_CHUNK, band_scratch, run_bands
+
+
+# Table range and resolution in Kelvin
+KELVIN_MIN = 1000
+KELVIN_MAX = 40000
+KELVIN_STEP = 10
+
+# Second radiation constant hc/k in m*K
+_C2 = 1.4387769e-2
+
+# XYZ -> linear sRGB (D65)
+_XYZ_TO_LINEAR = np.array([
+    [3.2404542, -1.5371385, -0.4985314],
+    [-0.9692660, 1.8760108, 0.0415560],
+    [0.0556434, -0.2040259, 1.0572252],
+])
+
+# sRGB transfer function breakpoints
+_SRGB_ENCODED_KNEE = 0.04045
+_SRGB_LINEAR_KNEE = 0.0031308
+
+_lut = None
+_lut_coordinate = None
+
+# Temperature brush settings. mode is 'STROKE' (start -> end along the stroke,
+# ping-ponging every `length` pixels) or 'DAB' (start at the dab center, end
+# at its rim); temperatures are Kelvin.
+TemperatureBrush = namedtuple('TemperatureBrush', ['mode', 'start', 'end', 'length'])
+
+TEMPERATURE_MODES = ('STROKE', 'DAB')
+
+
+# =============================================================================
+# TRANSFER FUNCTIONS
+# =============================================================================
+
+def srgb_to_linear(values, out=None):
+    """Decode sRGB-encoded values (any shape) to linear, float32."""
+    values = np.asarray(values, dtype=np.float32)
+    if out is None:
+        out = np.empty_like(values)
+    low = values <= _SRGB_ENCODED_KNEE
+    np.add(values, 0.055, out=out)
+    out /= 1.055
+    np.maximum(out, 0.0, out=out)
+    np.power(out, 2.4, out=out)
+    np.copyto(out, values / 12.92, where=low)
+    return out
+
+
+def linear_to_srgb(values, out=None):
+    """Encode linear values (any shape) with the sRGB transfer function, float32.
+
+    Negative values are encoded linearly; nothing is clamped.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if out is None:
+        out = np.empty_like(values)
+    low = values <= _SRGB_LINEAR_KNEE
+    np.maximum(values, 0.0, out=out)
+    np.power(out, 1.0 / 2.4, out=out)
+    out *= 1.055
+    out -= 0.055
+    np.copyto(out, values * 12.92, where=low)
+    return out
+
+
+# =============================================================================
+# BLACKBODY TABLE
+# =============================================================================
+
+def _lobe(wavelength, mean, sigma_below, sigma_above):
+    """Piecewise Gaussian with a different width on each side of the mean."""
+    sigma = np.where(wavelength < mean, sigma_below, sigma_above)
+    return np.exp(-0.5 * ((wavelength - mean) / sigma) ** 2)
+
+
+def _observer(wavelength):
+    """CIE 1931 2-degree color matching functions, (n, 3) for wavelengths in nm."""
+    x = (1.056 * _lobe(wavelength, 599.8, 37.9, 31.0)
+         + 0.362 * _lobe(wavelength, 442.0, 16.0, 26.7)
+         - 0.065 * _lobe(wavelength, 501.1, 20.4, 26.2))
+    y = (0.821 * _lobe(wavelength, 568.8, 46.9, 40.5)
+         + 0.286 * _lobe(wavelength, 530.9, 16.3, 31.1))
+    z = (1.217 * _lobe(wavelength, 437.0, 11.8, 36.0)
+         + 0.681 * _lobe(wavelength, 459.0, 26.0, 13.8))
+    return np.stack([x, y, z], axis=1)
+
+
+def build_blackbody_lut():
+    """Linear sRGB of a blackbody for every KELVIN_STEP, shape (n, 3) float32."""
+    wavelength = np.arange(380.0, 781.0, 5.0)
+    meters = wavelength[np.newaxis, :] * 1e-9
+    kelvin = np.arange(KELVIN_MIN, KELVIN_MAX + 1, KELVIN_STEP, dtype=np.float64)
+
+    # Planck's law up to a constant factor, which the normalization removes
+    radiance = 1.0 / (meters ** 5 * np.expm1(_C2 / (meters * kelvin[:, np.newaxis])))
+    rgb = radiance @ _observer(wavelength) @ _XYZ_TO_LINEAR.T
+
+    # Low temperatures fall outside the sRGB gamut (negative blue)
+    np.maximum(rgb, 0.0, out=rgb)
+    rgb /= rgb.max(axis=1, keepdims=True)
+    return rgb.astype(np.float32)
+
+
+def blackbody_lut():
+    """The shared blackbody table, built on first use (read-only)."""
+    global _lut, _lut_coordinate
+    if _lut is None:
+        lut = build_blackbody_lut()
+        lut.setflags(write=False)
+        # (b - r) / (r + g + b) rises strictly with temperature, see linear_to_kelvin()
+        _lut_coordinate = (lut[:, 2] - lut[:, 0]) / lut.sum(axis=1)
+        _lut = lut
+    return _lut
+
+
+# =============================================================================
+# LOOKUPS
+# =============================================================================
+
+def kelvin_to_linear(kelvin):
+    """Linear sRGB color of a blackbody, brightest channel 1.
+
+    Args:
+        kelvin: Temperature or array of temperatures, clamped to KELVIN_MIN-KELVIN_MAX
+
+    Returns:
+        ndarray: float32 RGB, shape kelvin.shape + (3,)
+    """
+    lut = blackbody_lut()
+    position = (np.clip(np.asarray(kelvin, dtype=np.float32), KELVIN_MIN, KELVIN_MAX)
+                - KELVIN_MIN) / KELVIN_STEP
+    index = np.minimum(position.astype(np.int32), len(lut) - 2)
+    fraction = (position - index)[..., np.newaxis]
+    return lut[index] + (lut[index + 1] - lut[index]) * fraction
+
+
+def linear_to_kelvin(rgb):
+    """Temperature of the blackbody closest in hue to linear RGB colors.
+
+    Matches the (b - r) / (r + g + b) balance against the table, so colors
+    far from the blackbody locus (greens, magentas) get the temperature with
+    the same warm/cool balance.
+
+    Args:
+        rgb: Linear RGB, shape (..., 3)
+
+    Returns:
+        ndarray: float32 Kelvin, shape rgb.shape[:-1]; black pixels read as 6500
+    """
+    blackbody_lut()
+    rgb = np.maximum(np.asarray(rgb, dtype=np.float32)[..., :3], 0.0)
+    total = rgb.sum(axis=-1)
+    coordinate = (rgb[..., 2] - rgb[..., 0]) / np.maximum(total, 1e-12)
+    kelvins = np.arange(KELVIN_MIN, KELVIN_MAX + 1, KELVIN_STEP, dtype=np.float32)
+    kelvin = np.interp(coordinate, _lut_coordinate, kelvins).astype(np.float32)
+    # np.where, not masked assignment: a single color interpolates to a 0-d scalar
+    return np.where(total > 0.0, kelvin, np.float32(6500.0))
+
+
+def mix_kelvin(start, end, t):
+    """Interpolate temperatures in mired (1e6 / K) so equal steps look even."""
+    start_mired = 1e6 / np.float32(start)
+    end_mired = 1e6 / np.float32(end)
+    return 1e6 / (start_mired + (end_mired - start_mired) * np.asarray(t, dtype=np.float32))
+
+
+def stroke_kelvin(temperature, distance):
+    """Temperature of a STROKE brush after `distance` pixels of stroke."""
+    t = (distance / max(temperature.length, 1.0)) % 2.0
+    return mix_kelvin(temperature.start, temperature.end, t if t <= 1.0 else 2.0 - t)
+
+
+# =============================================================================
+# RETEMPERATURE
+# =============================================================================
+
+def retemperature(pixels, kelvin, strength=1.0, min_luminance=0.0, rect=None, parallel=True):
+    """Shift pixels toward a blackbody color, keeping their luminance.
+
+    Each pixel moves to the blackbody color of the same luminance. Works
+    through ROW_CHUNK row bands on the shared thread pool but is otherwise
+    one vectorized pass.
+
+    Args:
+        pixels: (height, width, 3 or 4) float32 linear pixels, modified in place
+        kelvin: Target temperature
+        strength: 0 keeps the pixels, 1 fully replaces their chroma
+        min_luminance: Only pixels brighter than this are changed
+        rect: Optional (x_min, y_min, x_max, y_max) region, default everything
+        parallel: Use the thread pool
+
+    Returns:
+        int: Number of pixels changed
+    """
+    height, width = pixels.shape[:2]
+    x_min, y_min, x_max, y_max = rect if rect is not None else (0, 0, width, height)
+
+    tint = kelvin_to_linear(kelvin)
+    tint /= luminance(tint)
+
+    def shift(start, stop):
+        scratch = band_scratch()
+        rgb = pixels[y_min + start:y_min + stop, x_min:x_max, :3]
+        lum = scratch.get('lum', rgb.shape[:2] + (1,))
+        weight = scratch.get('weight', lum.shape)
+        delta = scratch.get('delta', rgb.shape)
+
+        luminance(rgb, out=lum)
+        if min_luminance > 0.0:
+            np.greater(lum, min_luminance, out=weight)
+            changed = int(np.count_nonzero(weight))
+            weight *= strength
+        else:
+            weight.fill(strength)
+            changed = lum.size
+
+        # rgb += (Y * tint - rgb) * weight
+        np.multiply(lum, tint, out=delta)
+        delta -= rgb
+        delta *= weight
+        rgb += delta
+        return changed
+
+    return sum(run_bands(shift, y_max - y_min, parallel=parallel))
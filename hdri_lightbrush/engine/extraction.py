@@ -0,0 +1,196 @@
+"""
+HDRI LightBrush - Key Light Extraction
+Find compact high-energy lobes (suns, key lights) in an equirectangular canvas.
+
+Runs on a downsampled canvas: a luminance threshold selects bright pixels,
+connected components (wrapping across the seam) group them into lobes and
+every pixel is weighted by its solid angle, so lobes near the poles are not
+overestimated. Only the energy above the threshold belongs to a lobe; that
+part can be removed from the full-resolution canvas and handed to explicit
+lights instead.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .blend import LUMINANCE_WEIGHTS
+from .parallel import run_bands
+from .projection import latitude_range, row_latitudes
+
+
+# Default threshold, as a multiple of the canvas' mean luminance
+THRESHOLD_CONTRAST = 8.0
+
+# One extracted lobe. longitude/latitude point at its energy centroid and
+# angular_size is the diameter of a cap with the same solid angle (degrees,
+# the light layer convention). energy is the linear RGB irradiance above the
+# threshold, fraction its share of the canvas' total luminous energy and
+# label the component id in the analysis labels.
+Lobe = namedtuple('Lobe', [
+    'longitude', 'latitude', 'angular_size', 'energy', 'solid_angle', 'fraction', 'label',
+])
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+def pixel_solid_angles(height, width, dome=False):
+    """Solid angle (steradians) of one pixel in each row, shape (height,)."""
+    bottom, top = latitude_range(dome)
+    return (2 * np.pi / width) * ((top - bottom) / height) * np.cos(row_latitudes(height, dome=dome))
+
+
+def label_components(mask):
+    """Label 4-connected regions of a boolean mask, wrapping horizontally.
+
+    Min-label propagation with pointer jumping: every pixel starts as its own
+    flat index and repeatedly takes the smallest label among its neighbours.
+
+    Returns:
+        ndarray: int64 labels (flat index of a region pixel), -1 outside the mask
+    """
+    height, width = mask.shape
+    big = height * width
+    labels = np.where(mask, np.arange(big).reshape(height, width), big)
+
+    while True:
+        previous = labels
+        labels = labels.copy()
+        np.minimum(labels, np.roll(previous, 1, axis=1), out=labels)
+        np.minimum(labels, np.roll(previous, -1, axis=1), out=labels)
+        np.minimum(labels[1:], previous[:-1], out=labels[1:])
+        np.minimum(labels[:-1], previous[1:], out=labels[:-1])
+        labels[~mask] = big
+
+        # Jump to the label's own label until stable
+        flat = labels.ravel()
+        inside = flat < big
+        while True:
+            jumped = flat.copy()
+            jumped[inside] = flat[flat[inside]]
+            if np.array_equal(jumped, flat):
+                break
+            flat = jumped
+        labels = flat.reshape(height, width)
+
+        if np.array_equal(labels, previous):
+            break
+
+    labels[~mask] = -1
+    return labels
+
+
+# =============================================================================
+# EXTRACTION
+# =============================================================================
+
+def find_lobes(pixels, threshold=None, contrast=THRESHOLD_CONTRAST, max_lobes=4, min_fraction=0.01,
+               dome=False):
+    """Find the strongest light lobes of a (downsampled) canvas.
+
+    Args:
+        pixels: (height, width, 3 or 4) float32 linear canvas
+        threshold: Luminance above which pixels count as light
+        contrast: Without a threshold, use this multiple of the solid-angle
+            weighted mean luminance
+        max_lobes: Keep at most this many lobes, strongest first
+        min_fraction: Drop lobes with less of the total energy than this
+        dome: The canvas holds only the upper hemisphere (see projection.py)
+
+    Returns:
+        tuple: (list of Lobe, labels, threshold)
+    """
+    height, width = pixels.shape[:2]
+    weights = pixel_solid_angles(height, width, dome)[:, np.newaxis]
+    rgb = pixels[:, :, :3]
+    lum = rgb @ LUMINANCE_WEIGHTS
+
+    total = float(np.sum(lum * weights))
+    if threshold is None:
+        bottom, top = latitude_range(dome)
+        threshold = contrast * total / (2 * np.pi * (np.sin(top) - np.sin(bottom)))
+    mask = lum > threshold
+    if total <= 0.0 or not np.any(mask):
+        return [], np.full((height, width), -1), threshold
+
+    labels = label_components(mask)
+    ys, xs = np.nonzero(mask)
+    ids, inverse = np.unique(labels[ys, xs], return_inverse=True)
+
+    # Radiance above the threshold, keeping each pixel's color
+    excess = rgb[ys, xs] * (1.0 - threshold / lum[ys, xs])[:, np.newaxis]
+    solid = weights[ys, 0]
+    energy = np.zeros((len(ids), 3))
+    np.add.at(energy, inverse, excess * solid[:, np.newaxis])
+    areas = np.bincount(inverse, weights=solid, minlength=len(ids))
+
+    # Energy-weighted mean direction (x = canvas center, z = zenith)
+    lon = ((xs + 0.5) / width - 0.5) * (2 * np.pi)
+    lat = row_latitudes(height, dome=dome)[ys]
+    strength = (excess @ LUMINANCE_WEIGHTS) * solid
+    directions = np.stack([
+        np.bincount(inverse, weights=strength * np.cos(lat) * np.cos(lon), minlength=len(ids)),
+        np.bincount(inverse, weights=strength * np.cos(lat) * np.sin(lon), minlength=len(ids)),
+        np.bincount(inverse, weights=strength * np.sin(lat), minlength=len(ids)),
+    ], axis=1)
+
+    lobes = []
+    for index in np.argsort(-(energy @ LUMINANCE_WEIGHTS)):
+        fraction = float(energy[index] @ LUMINANCE_WEIGHTS) / total
+        if fraction < min_fraction or len(lobes) >= max_lobes:
+            break
+        x, y, z = directions[index] / max(np.linalg.norm(directions[index]), 1e-12)
+        cap = np.clip(1.0 - areas[index] / (2 * np.pi), -1.0, 1.0)
+        lobes.append(Lobe(
+            longitude=float(np.degrees(np.arctan2(y, x))),
+            latitude=float(np.degrees(np.arcsin(np.clip(z, -1.0, 1.0)))),
+            angular_size=float(np.degrees(2.0 * np.arccos(cap))),
+            energy=tuple(float(value) for value in energy[index]),
+            solid_angle=float(areas[index]),
+            fraction=fraction,
+            label=int(ids[index]),
+        ))
+    return lobes, labels, threshold
+
+
+def remove_lobes(pixels, lobes, labels, threshold, grow=1, dome=False):
+    """Clamp the canvas to the threshold luminance inside the given lobes.
+
+    Works on the full-resolution canvas in parallel row bands; the analysis
+    labels are upscaled by nearest neighbour and grown by `grow` analysis
+    pixels so the lobe edges lost by downsampling are included.
+
+    Returns:
+        list: Removed linear RGB irradiance per lobe, in lobe order
+    """
+    height, width = pixels.shape[:2]
+    label_height, label_width = labels.shape
+    selected = np.full(labels.shape, -1)
+    for index, lobe in enumerate(lobes):
+        region = labels == lobe.label
+        for _ in range(grow):
+            region = (region | np.roll(region, 1, axis=1) | np.roll(region, -1, axis=1)
+                      | np.pad(region[1:], ((0, 1), (0, 0))) | np.pad(region[:-1], ((1, 0), (0, 0))))
+        selected[region & (selected < 0)] = index
+
+    columns = np.arange(width) * label_width // width
+    solid = pixel_solid_angles(height, width, dome)
+
+    def clamp(start, stop):
+        removed = np.zeros((len(lobes), 3))
+        owner = selected[np.arange(start, stop) * label_height // height][:, columns]
+        rgb = pixels[start:stop, :, :3]
+        lum = rgb @ LUMINANCE_WEIGHTS
+        ys, xs = np.nonzero((owner >= 0) & (lum > threshold))
+        if len(ys):
+            scale = (threshold / lum[ys, xs])[:, np.newaxis]
+            before = rgb[ys, xs]
+            after = before * scale
+            rgb[ys, xs] = after
+            np.add.at(removed, owner[ys, xs], (before - after) * solid[ys + start, np.newaxis])
+        return removed
+
+    removed = sum(run_bands(clamp, height), np.zeros((len(lobes), 3)))
+    return [tuple(float(value) for value in energy) for energy in removed]
@@ -0,0 +1,464 @@
+"""
+HDRI LightBrush - HDR File Readers and Writers
+Radiance HDR (RGBE) and OpenEXR input and output straight from NumPy canvases.
+
+Both writers stream ROW_CHUNK rows at a time, so writing never holds more
+than one encoded chunk besides the canvas. Canvases are stored bottom row
+first (Blender's pixel order); both formats are written top row first.
+EXR files are uncompressed scanline images with HALF or FLOAT channels,
+which every EXR reader supports.
+
+Readers decode chunks of scanlines from a memory-mapped file. Radiance
+files (flat or run-length encoded) are read natively; EXR files when they
+are scanline images without compression or with ZIP / ZIPS compression.
+Other EXR files raise ValueError so callers can fall back to another
+loader. stream_image() first fills a canvas with a nearest-neighbour
+preview built from every n-th scanline, then overwrites it with full
+resolution chunks, yielding after every step.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from .color import ROW_CHUNK
+
+
+# Values below this are written as RGBE black
+_RGBE_MIN = 1e-32
+
+# OpenEXR pixel types
+_EXR_UINT = 0
+_EXR_HALF = 1
+_EXR_FLOAT = 2
+
+_EXR_DTYPES = {
+    _EXR_UINT: np.dtype('<u4'),
+    _EXR_HALF: np.dtype('<f2'),
+    _EXR_FLOAT: np.dtype('<f4'),
+}
+
+# Scanlines per chunk of the EXR compressions the reader supports
+# (none, ZIPS, ZIP)
+_EXR_BLOCK_LINES = {0: 1, 2: 1, 3: 16}
+
+# Stream previews from about this many scanlines
+PREVIEW_ROWS = 128
+
+
+# =============================================================================
+# RADIANCE HDR
+# =============================================================================
+
+def encode_rgbe(rgb):
+    """Encode (..., 3) float RGB as (..., 4) uint8 shared-exponent RGBE."""
+    peak = np.max(rgb, axis=-1)
+    exponent = np.frexp(peak)[1]
+    black = peak <= _RGBE_MIN
+    # mantissa * 256 / peak is exactly 2 ** (8 - exponent)
+    scale = np.ldexp(np.float32(1.0), 8 - exponent)
+    scale[black] = 0.0
+    out = np.empty(rgb.shape[:-1] + (4,), dtype=np.uint8)
+    np.clip(rgb * scale[..., np.newaxis], 0.0, 255.0, out=out[..., :3], casting='unsafe')
+    exponent += 128
+    exponent[black] = 0
+    out[..., 3] = exponent
+    return out
+
+
+def decode_rgbe(rgbe):
+    """Decode (..., 4) uint8 RGBE as (..., 3) float32 linear RGB."""
+    exponent = rgbe[..., 3].astype(np.int32)
+    scale = np.ldexp(np.float32(1.0), exponent - 136).astype(np.float32)
+    scale[exponent == 0] = 0.0
+    return (rgbe[..., :3] + np.float32(0.5)) * scale[..., np.newaxis]
+
+
+def _read_rle_channel(data, pos, width, out, start):
+    """Decode one run-length encoded channel of a scanline into out[start:start + width]."""
+    x = start
+    end = start + width
+    while x < end:
+        count = data[pos]
+        if count > 128:
+            count -= 128
+            out[x:x + count] = data[pos + 1:pos + 2] * count
+            pos += 2
+        else:
+            out[x:x + count] = data[pos + 1:pos + 1 + count]
+            pos += 1 + count
+        x += count
+    return pos
+
+
+def _skip_rle_channel(data, pos, width):
+    x = 0
+    while x < width:
+        count = data[pos]
+        if count > 128:
+            x += count - 128
+            pos += 2
+        else:
+            x += count
+            pos += 1 + count
+    return pos
+
+
+class HDRReader:
+    """Scanline reader for Radiance HDR files (flat or run-length encoded RGBE)."""
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._data
+        if not (data[:10] == b"#?RADIANCE" or data[:6] == b"#?RGBE"):
+            raise ValueError(f"Not a Radiance HDR file: {filepath}")
+
+        pos = 0
+        while True:
+            end = data.find(b"\n", pos)
+            if end < 0:
+                raise ValueError(f"Truncated HDR header: {filepath}")
+            line = data[pos:end].strip()
+            pos = end + 1
+            if not line:
+                break
+            if line.startswith(b"FORMAT=") and line != b"FORMAT=32-bit_rle_rgbe":
+                raise ValueError(f"Unsupported HDR format: {line.decode('ascii', 'replace')}")
+
+        end = data.find(b"\n", pos)
+        fields = data[pos:end].split()
+        if len(fields) != 4 or fields[0] not in (b"-Y", b"+Y") or fields[2] != b"+X":
+            raise ValueError(f"Unsupported HDR orientation: {filepath}")
+        self.height, self.width = int(fields[1]), int(fields[3])
+        # -Y: file rows run top to bottom, +Y: bottom to top
+        self._top_down = fields[0] == b"-Y"
+        self._start = end + 1
+
+    def close(self):
+        self._data.close()
+
+    def _is_rle(self, pos):
+        data = self._data
+        return (8 <= self.width < 32768 and data[pos] == 2 and data[pos + 1] == 2
+                and (data[pos + 2] << 8 | data[pos + 3]) == self.width)
+
+    def _scanlines(self, keep):
+        """Yield (file row, RGBE bytes or None) for every file row, decoding rows where keep(row)."""
+        data = self._data
+        width = self.width
+        pos = self._start
+        for row in range(self.height):
+            if not self._is_rle(pos):
+                line = data[pos:pos + 4 * width] if keep(row) else None
+                pos += 4 * width
+                yield row, (np.frombuffer(line, dtype=np.uint8).reshape(width, 4) if line else None)
+                continue
+            pos += 4
+            if not keep(row):
+                for _ in range(4):
+                    pos = _skip_rle_channel(data, pos, width)
+                yield row, None
+                continue
+            planes = bytearray(4 * width)
+            for channel in range(4):
+                pos = _read_rle_channel(data, pos, width, planes, channel * width)
+            yield row, np.frombuffer(planes, dtype=np.uint8).reshape(4, width).T
+
+    def _top(self, row):
+        return row if self._top_down else self.height - 1 - row
+
+    def rows(self, step):
+        """Yield (row from the top, (width, 3) float32) for every step-th row."""
+        for row, line in self._scanlines(lambda row: self._top(row) % step == 0):
+            if line is not None:
+                yield self._top(row), decode_rgbe(line)
+
+    def chunks(self, rows=ROW_CHUNK):
+        """Yield (first row from the top, (n, width, 3) float32) covering the image."""
+        block = np.empty((rows, self.width, 4), dtype=np.uint8)
+        count = 0
+        for row, line in self._scanlines(lambda row: True):
+            block[count] = line
+            count += 1
+            if count == rows or row == self.height - 1:
+                first = row - count + 1
+                decoded = decode_rgbe(block[:count])
+                if self._top_down:
+                    yield first, decoded
+                else:
+                    yield self.height - 1 - row, decoded[::-1]
+                count = 0
+
+
+def write_hdr(filepath, pixels):
+    """Write (height, width, 3 or 4) linear float pixels as a flat Radiance HDR file."""
+    height, width = pixels.shape[:2]
+    with open(filepath, 'wb') as f:
+        f.write(b"#?RADIANCE\nFORMAT=32-bit_rle_rgbe\n\n")
+        f.write(f"-Y {height} +X {width}\n".encode('ascii'))
+        for top in range(0, height, ROW_CHUNK):
+            rows = min(ROW_CHUNK, height - top)
+            chunk = pixels[height - top - rows:height - top, :, :3][::-1]
+            f.write(encode_rgbe(chunk).tobytes())
+
+
+# =============================================================================
+# OPENEXR
+# =============================================================================
+
+def _exr_attribute(name, kind, data):
+    return name.encode('ascii') + b'\0' + kind.encode('ascii') + b'\0' + struct.pack('<i', len(data)) + data
+
+
+def _exr_header(width, height, pixel_type):
+    channels = b''.join(name + b'\0' + struct.pack('<iB3xii', pixel_type, 0, 1, 1) for name in (b'B', b'G', b'R'))
+    window = struct.pack('<iiii', 0, 0, width - 1, height - 1)
+    return b''.join([
+        struct.pack('<ii', 20000630, 2),
+        _exr_attribute('channels', 'chlist', channels + b'\0'),
+        _exr_attribute('compression', 'compression', b'\0'),
+        _exr_attribute('dataWindow', 'box2i', window),
+        _exr_attribute('displayWindow', 'box2i', window),
+        _exr_attribute('lineOrder', 'lineOrder', b'\0'),
+        _exr_attribute('pixelAspectRatio', 'float', struct.pack('<f', 1.0)),
+        _exr_attribute('screenWindowCenter', 'v2f', struct.pack('<ff', 0.0, 0.0)),
+        _exr_attribute('screenWindowWidth', 'float', struct.pack('<f', 1.0)),
+        b'\0',
+    ])
+
+
+def write_exr(filepath, pixels, half=True):
+    """Write (height, width, 3 or 4) linear float pixels as an uncompressed RGB OpenEXR file.
+
+    Args:
+        half: Store 16-bit HALF channels (default) instead of 32-bit FLOAT
+    """
+    height, width = pixels.shape[:2]
+    dtype = np.dtype('<f2') if half else np.dtype('<f4')
+    header = _exr_header(width, height, _EXR_HALF if half else _EXR_FLOAT)
+
+    # One block per scanline: y, byte count, then B, G and R rows
+    row_bytes = 3 * width * dtype.itemsize
+    first = len(header) + 8 * height
+    offsets = first + np.arange(height, dtype='<u8') * (8 + row_bytes)
+
+    with open(filepath, 'wb') as f:
+        f.write(header)
+        f.write(offsets.tobytes())
+        for top in range(0, height, ROW_CHUNK):
+            rows = min(ROW_CHUNK, height - top)
+            chunk = pixels[height - top - rows:height - top, :, :3][::-1]
+            block = np.empty((rows, 8 + row_bytes), dtype=np.uint8)
+            prefix = block[:, :8].view('<i4')
+            prefix[:, 0] = np.arange(top, top + rows)
+            prefix[:, 1] = row_bytes
+            planes = block[:, 8:].view(dtype).reshape(rows, 3, width)
+            planes[:] = chunk[:, :, ::-1].transpose(0, 2, 1)
+            f.write(block.tobytes())
+
+
+def _read_exr_header(data):
+    """Parse the attributes of a single-part EXR header.
+
+    Returns:
+        tuple: ({name: (type, bytes)}, offset of the first byte after the header)
+    """
+    magic, version = struct.unpack_from('<ii', data, 0)
+    if magic != 20000630:
+        raise ValueError("Not an OpenEXR file")
+    if version & 0x1A00:
+        raise ValueError("Only single-part scanline EXR files can be streamed")
+    attributes = {}
+    pos = 8
+    while data[pos] != 0:
+        name_end = data.find(b'\0', pos)
+        type_end = data.find(b'\0', name_end + 1)
+        size, = struct.unpack_from('<i', data, type_end + 1)
+        start = type_end + 5
+        attributes[data[pos:name_end].decode('ascii')] = (data[name_end + 1:type_end], data[start:start + size])
+        pos = start + size
+    return attributes, pos + 1
+
+
+def _exr_channels(chlist):
+    """(name, pixel type) of every channel in file order."""
+    channels = []
+    pos = 0
+    while chlist[pos] != 0:
+        end = chlist.find(b'\0', pos)
+        pixel_type, _, x_sampling, y_sampling = struct.unpack_from('<iB3xii', chlist, end + 1)
+        if x_sampling != 1 or y_sampling != 1:
+            raise ValueError("Subsampled EXR channels are not supported")
+        channels.append((chlist[pos:end].decode('ascii'), pixel_type))
+        pos = end + 17
+    return channels
+
+
+def _unzip_exr(packed, size):
+    """Undo EXR ZIP compression: inflate, reverse the byte predictor, re-interleave."""
+    raw = np.frombuffer(zlib.decompress(packed), dtype=np.uint8).astype(np.int64)
+    if len(raw) != size:
+        raise ValueError("Corrupt EXR chunk")
+    raw[1:] -= 128
+    predicted = (np.cumsum(raw) & 0xFF).astype(np.uint8)
+    out = np.empty(size, dtype=np.uint8)
+    half = (size + 1) // 2
+    out[0::2] = predicted[:half]
+    out[1::2] = predicted[half:]
+    return out
+
+
+class EXRReader:
+    """Scanline chunk reader for uncompressed and ZIP / ZIPS compressed OpenEXR files."""
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        attributes, pos = _read_exr_header(self._data)
+
+        compression = attributes['compression'][1][0]
+        if compression not in _EXR_BLOCK_LINES:
+            raise ValueError(f"EXR compression {compression} can't be streamed")
+        self._compression = compression
+        self.block_lines = _EXR_BLOCK_LINES[compression]
+
+        x_min, y_min, x_max, y_max = struct.unpack('<iiii', attributes['dataWindow'][1])
+        self.width, self.height = x_max - x_min + 1, y_max - y_min + 1
+        self._y_min = y_min
+
+        # Channels are stored one after another per scanline, in file order
+        self._channels = []
+        offset = 0
+        names = {}
+        for name, pixel_type in _exr_channels(attributes['channels'][1]):
+            dtype = _EXR_DTYPES[pixel_type]
+            names[name] = len(self._channels)
+            self._channels.append((offset, dtype))
+            offset += self.width * dtype.itemsize
+        self._line_bytes = offset
+        if not all(name in names for name in 'RGB'):
+            raise ValueError("EXR file has no R, G and B channels")
+        self._rgb = [self._channels[names[name]] for name in 'RGB']
+
+        blocks = -(-self.height // self.block_lines)
+        self._offsets = np.frombuffer(self._data, dtype='<u8', count=blocks, offset=pos)
+        self._cached = (None, None)
+
+    def close(self):
+        self._offsets = None
+        self._cached = (None, None)
+        self._data.close()
+
+    def _block(self, index):
+        """Decoded (n, width, 3) float32 rows of one chunk, n = block_lines except at the end."""
+        if self._cached[0] == index:
+            return self._cached[1]
+        offset = int(self._offsets[index])
+        y, size = struct.unpack_from('<ii', self._data, offset)
+        lines = min(self.block_lines, self.height - (y - self._y_min))
+        expected = lines * self._line_bytes
+        packed = self._data[offset + 8:offset + 8 + size]
+        if self._compression == 0 or size == expected:
+            raw = np.frombuffer(packed, dtype=np.uint8)
+        else:
+            raw = _unzip_exr(packed, expected)
+
+        raw = raw.reshape(lines, self._line_bytes)
+        rows = np.empty((lines, self.width, 3), dtype=np.float32)
+        for channel, (start, dtype) in enumerate(self._rgb):
+            rows[:, :, channel] = raw[:, start:start + self.width * dtype.itemsize].view(dtype)
+        self._cached = (index, rows)
+        return rows
+
+    def rows(self, step):
+        """Yield (row from the top, (width, 3) float32) for every step-th row."""
+        for row in range(0, self.height, step):
+            yield row, self._block(row // self.block_lines)[row % self.block_lines]
+
+    def chunks(self, rows=ROW_CHUNK):
+        """Yield (first row from the top, (n, width, 3) float32) covering the image."""
+        per_chunk = max(1, rows // self.block_lines)
+        blocks = len(self._offsets)
+        for first in range(0, blocks, per_chunk):
+            last = min(blocks, first + per_chunk)
+            yield first * self.block_lines, np.concatenate([self._block(index) for index in range(first, last)])
+        self._cached = (None, None)
+
+
+# Writers and readers by lower-case file extension
+WRITERS = {
+    '.hdr': write_hdr,
+    '.exr': write_exr,
+}
+
+READERS = {
+    '.hdr': HDRReader,
+    '.exr': EXRReader,
+}
+
+
+def write_image(filepath, pixels):
+    """Write pixels as HDR or EXR, chosen by the file extension."""
+    extension = os.path.splitext(filepath)[1].lower()
+    writer = WRITERS.get(extension)
+    if writer is None:
+        raise ValueError(f"Unsupported HDR format: {extension or filepath}")
+    writer(filepath, pixels)
+
+
+def open_image(filepath):
+    """Streaming reader for an HDR or EXR file, chosen by the file extension.
+
+    Raises:
+        ValueError: Unsupported extension or a file this module can't stream
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise ValueError(f"Unsupported HDR format: {extension or filepath}")
+    return reader(filepath)
+
+
+def stream_image(reader, pixels, preview_rows=PREVIEW_ROWS, chunk_rows=ROW_CHUNK):
+    """Decode a reader into (height, width, 4) bottom-up float32 pixels step by step.
+
+    Without a preview (small images) the full-resolution chunks are decoded
+    right away. Alpha is set to 1.
+
+    Yields:
+        tuple: (phase, fraction) with phase 'PREVIEW' while the preview rows
+        are decoded and 'FULL' for the full-resolution chunks
+    """
+    height, width = reader.height, reader.width
+    pixels[:, :, 3] = 1.0
+
+    step = height // preview_rows
+    if step > 1:
+        # Every step-th row and column, repeated over the rows and columns they stand for
+        count = -(-height // step)
+        for done, (top, line) in enumerate(reader.rows(step), start=1):
+            wide = np.repeat(line[::step], step, axis=0)[:width]
+            pixels[max(0, height - top - step):height - top, :, :3] = wide
+            yield 'PREVIEW', done / count
+
+    done = 0
+    for top, rows in reader.chunks(chunk_rows):
+        pixels[height - top - len(rows):height - top, :, :3] = rows[::-1]
+        done += len(rows)
+        yield 'FULL', done / height
+
+
+def read_image(filepath):
+    """Read a whole HDR or EXR file as (height, width, 4) bottom-up float32 pixels."""
+    reader = open_image(filepath)
+    try:
+        pixels = np.empty((reader.height, reader.width, 4), dtype=np.float32)
+        for _ in stream_image(reader, pixels, preview_rows=reader.height):
+            pass
+    finally:
+        reader.close()
+    return pixels
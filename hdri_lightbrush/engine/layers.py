@@ -0,0 +1,501 @@
+"""
+HDRI LightBrush - Layered Canvas
+Base, painted and light layers flattened into a cached composite.
+
+Layer stack, bottom to top:
+    base      opaque RGBA, what the canvas was before layers existed
+    painted   premultiplied RGBA with opacity, blend mode and visibility
+    lights    additive parametric lights (see light_layers.py)
+
+The flattened result is cached. Edits mark tiles dirty and flatten() only
+recomposites those tiles; painted dab rects are batched and recomposited
+once per flatten(), so overlapping dabs of one mouse event cost one pass.
+Dirty tiles (and row bands of a large painted union) are disjoint, so they
+are composited concurrently on the shared thread pool.
+
+Painted layers start transparent, so only brush modes that put color down
+(or take it away) can paint them: the other modes read the pixels below,
+which a layer does not hold. Each allowed mode has a coverage rule in
+PAINT_COVERAGE; the base layer takes every mode.
+
+Layers can be filled with a constant in O(tiles): their tiles stay pending
+(the buffer is allocated but never touched) until something reads or paints
+them, and compositing a pending base tile is a plain fill. A cleared or new
+canvas therefore costs one pass over the result instead of several full
+copies.
+"""
+
+import numpy as np
+
+from .blend import blend_region
+from .light_layers import LightStack, intersect_rects
+from .parallel import band_scratch, run_tiles, split_rows
+from .transform import reproject, roll_yaw, rotate_direction, yaw_shift
+
+
+# Pixels per tile edge for dirty tracking
+TILE_SIZE = 256
+
+# Key of the base layer
+BASE_LAYER = 0
+
+# Coverage below this is treated as transparent when un-premultiplying
+_MIN_ALPHA = 1e-6
+
+# How a dab changes a painted layer's alpha, per brush blend mode: 'COVER'
+# lerps it towards 1 like the premultiplied color, 'UNCOVER' towards 0.
+# ADD sums into the layer's own color; an Add layer brightens the canvas
+# below. Modes not listed (MULTIPLY, EXPOSURE, LUMINANCE, ...) blend against
+# the pixels below and only paint the base layer.
+PAINT_COVERAGE = {
+    'MIX': 'COVER',
+    'ADD': 'COVER',
+    'ERASE': 'UNCOVER',
+}
+
+
+def check_paint_mode(key, blend_mode):
+    """Raise ValueError if blend_mode cannot paint layer key."""
+    if key != BASE_LAYER and blend_mode not in PAINT_COVERAGE:
+        raise ValueError(f"{blend_mode.title()} blends with the pixels below and only paints the base layer")
+
+
+def union_rects(a, b):
+    """Bounding rect of two rects, either may be None."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def tile_grid(height, width, tile_size=TILE_SIZE):
+    """Shape (rows, columns) of the tile grid covering a canvas."""
+    return -(-height // tile_size), -(-width // tile_size)
+
+
+def tile_span(rect, tile_size=TILE_SIZE):
+    """Slices of the tile grid touched by a rect."""
+    x_min, y_min, x_max, y_max = rect
+    return (slice(y_min // tile_size, -(-y_max // tile_size)),
+            slice(x_min // tile_size, -(-x_max // tile_size)))
+
+
+class PixelLayer:
+    """One painted layer: premultiplied (height, width, 4) float32 pixels.
+
+    Tiles still holding the constant of the last fill() are pending and only
+    written when pixels or materialize() need them; read() sees through them.
+    """
+
+    def __init__(self, pixels, opacity=1.0, blend_mode='MIX', visible=True, tile_size=TILE_SIZE):
+        self._pixels = pixels
+        self.opacity = opacity
+        self.blend_mode = blend_mode
+        self.visible = visible
+        self.tile_size = tile_size
+        # Rect that holds every painted pixel, None while the layer is empty
+        self.bounds = None
+        # RGBA of pending tiles and the pending tile grid (None: all materialized)
+        self.constant = None
+        self._pending = None
+
+    @classmethod
+    def filled(cls, height, width, value, tile_size=TILE_SIZE, **settings):
+        """Layer whose pixels are all value, without writing them."""
+        layer = cls(np.empty((height, width, 4), dtype=np.float32), tile_size=tile_size, **settings)
+        layer.fill(value)
+        return layer
+
+    @property
+    def settings(self):
+        return (self.opacity, self.blend_mode, self.visible)
+
+    @property
+    def pixels(self):
+        """Dense pixels (materializes any pending tiles)."""
+        self.materialize()
+        return self._pixels
+
+    @pixels.setter
+    def pixels(self, pixels):
+        self._pixels = pixels
+        self.constant = None
+        self._pending = None
+
+    def fill(self, value):
+        """Set every pixel to an RGBA value in O(tiles)."""
+        self.constant = np.asarray(value, dtype=np.float32)
+        self._pending = np.ones(tile_grid(*self._pixels.shape[:2], self.tile_size), dtype=bool)
+
+    def is_constant(self, rect=None):
+        """Whether rect (default everything) still holds only the fill constant."""
+        if self._pending is None:
+            return False
+        if rect is None:
+            return bool(self._pending.all())
+        return bool(self._pending[tile_span(rect, self.tile_size)].all())
+
+    def materialize(self, rect=None):
+        """Write the fill constant into the pending tiles touched by rect (default all)."""
+        if self._pending is None:
+            return
+        pending = self._pending
+        if rect is not None:
+            pending = np.zeros_like(self._pending)
+            span = tile_span(rect, self.tile_size)
+            pending[span] = self._pending[span]
+        if pending.any():
+            height, width = self._pixels.shape[:2]
+            size = self.tile_size
+            tiles = [(tx * size, ty * size, min(width, (tx + 1) * size), min(height, (ty + 1) * size))
+                     for ty, tx in zip(*np.nonzero(pending))]
+            run_tiles(self._fill_tile, tiles, min_pixels=0)
+            self._pending &= ~pending
+        if not self._pending.any():
+            self.constant = None
+            self._pending = None
+
+    def _fill_tile(self, rect):
+        x_min, y_min, x_max, y_max = rect
+        self._pixels[y_min:y_max, x_min:x_max] = self.constant
+
+    def read(self, rect, out):
+        """Pixels inside rect without materializing anything (safe from pool threads).
+
+        Returns:
+            ndarray: A view of the pixels, or out filled from pixels and the
+            constant where rect overlaps pending tiles
+        """
+        x_min, y_min, x_max, y_max = rect
+        pending = self._pending
+        span = tile_span(rect, self.tile_size)
+        if pending is None or not pending[span].any():
+            return self._pixels[y_min:y_max, x_min:x_max]
+
+        np.copyto(out, self._pixels[y_min:y_max, x_min:x_max])
+        size = self.tile_size
+        for ty, tx in zip(*np.nonzero(pending[span])):
+            tile_x, tile_y = (tx + span[1].start) * size, (ty + span[0].start) * size
+            out[max(tile_y, y_min) - y_min:min(tile_y + size, y_max) - y_min,
+                max(tile_x, x_min) - x_min:min(tile_x + size, x_max) - x_min] = self.constant
+        return out
+
+
+class LayeredCanvas:
+    """Layer stack with a cached flattened result and per-tile dirty flags."""
+
+    def __init__(self, base_pixels, tile_size=TILE_SIZE, dome=False):
+        """
+        Args:
+            base_pixels: (height, width, 4) opaque base, or a PixelLayer
+            dome: The canvas holds only the upper hemisphere (see projection.py)
+        """
+        if isinstance(base_pixels, PixelLayer):
+            base = base_pixels
+        else:
+            base = PixelLayer(np.array(base_pixels, dtype=np.float32), tile_size=tile_size)
+        self.height, self.width = base._pixels.shape[:2]
+        self.tile_size = tile_size
+        self.dome = dome
+        self.layers = {BASE_LAYER: base}
+        base.bounds = (0, 0, self.width, self.height)
+        self.order = [BASE_LAYER]
+        self.lights = LightStack()
+        self._dirty = np.zeros(tile_grid(self.height, self.width, tile_size), dtype=bool)
+        self._painted = []
+
+        if base.constant is None:
+            self.result = base.pixels.copy()
+        else:
+            # Written tile by tile by the first flatten()
+            self.result = np.empty_like(base._pixels)
+            self.mark_dirty(everything=True)
+
+    @classmethod
+    def filled(cls, width, height, value=(0.0, 0.0, 0.0, 1.0), tile_size=TILE_SIZE, dome=False):
+        """Canvas with a constant base, e.g. a new or cleared canvas (call flatten() before reading result)."""
+        return cls(PixelLayer.filled(height, width, value, tile_size), tile_size, dome)
+
+    @classmethod
+    def from_flattened(cls, pixels, lights, tile_size=TILE_SIZE, dome=False):
+        """Rebuild a canvas (base + lights only) from flattened pixels.
+
+        Args:
+            pixels: (height, width, 4) flattened canvas
+            lights: Dict of light key -> LightLayer composited into pixels
+        """
+        canvas = cls(pixels, tile_size, dome)
+        base = canvas.base
+        canvas.lights.update(lights, canvas.width, canvas.height, dome)
+        canvas.lights.add_to(base, (0, 0, canvas.width, canvas.height), sign=-1.0)
+        return canvas
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def base(self):
+        return self.layers[BASE_LAYER].pixels
+
+    # -------------------------------------------------------------------------
+    # Stack edits
+    # -------------------------------------------------------------------------
+
+    def add_layer(self, key, pixels=None, opacity=1.0, blend_mode='MIX', visible=True):
+        """Add a painted layer on top (transparent unless pixels are given)."""
+        if pixels is None:
+            layer = PixelLayer.filled(self.height, self.width, 0.0, self.tile_size,
+                                      opacity=opacity, blend_mode=blend_mode, visible=visible)
+        else:
+            layer = PixelLayer(np.asarray(pixels, dtype=np.float32), opacity, blend_mode, visible,
+                               self.tile_size)
+            if np.any(layer.pixels[:, :, 3]):
+                layer.bounds = (0, 0, self.width, self.height)
+        self.layers[key] = layer
+        self.order.append(key)
+        self.mark_dirty(layer.bounds)
+        return layer
+
+    def remove_layer(self, key):
+        """Remove a painted layer."""
+        layer = self.layers.pop(key)
+        self.order.remove(key)
+        self.mark_dirty(layer.bounds)
+
+    def set_order(self, keys):
+        """Reorder painted layers (keys bottom to top, base excluded)."""
+        order = [BASE_LAYER] + [key for key in keys if key != BASE_LAYER]
+        if order == self.order:
+            return
+        moved = None
+        for before, after in zip(self.order, order):
+            if before != after:
+                moved = union_rects(moved, self.layers[before].bounds)
+                moved = union_rects(moved, self.layers[after].bounds)
+        self.order = order
+        self.mark_dirty(moved)
+
+    def set_layer_settings(self, key, opacity, blend_mode, visible):
+        """Change opacity, blend mode or visibility of a painted layer."""
+        layer = self.layers[key]
+        if layer.settings == (opacity, blend_mode, visible):
+            return
+        layer.opacity, layer.blend_mode, layer.visible = opacity, blend_mode, visible
+        self.mark_dirty(layer.bounds)
+
+    def set_lights(self, lights):
+        """Sync light layers; only changed lights are re-rasterized."""
+        for rect in self.lights.update(lights, self.width, self.height, self.dome):
+            self.mark_dirty(rect)
+
+    def rotate_yaw(self, turns, subpixel=True, lights=None):
+        """Bake a yaw rotation into every layer, see transform.roll_yaw().
+
+        Lights keep their shape and move by the same angle, so only their
+        footprints are re-rasterized. Whole-pixel rotations also roll the
+        cached result instead of recompositing it.
+
+        Args:
+            lights: The moved lights as the caller stores them, so a later
+                set_lights() with the same values finds nothing changed
+                (default: moved here in float64)
+
+        Returns:
+            dict: The moved lights {key: LightLayer}
+        """
+        whole, fraction = yaw_shift(turns, self.width, subpixel)
+        if whole == 0 and fraction == 0.0:
+            return self.lights.layers()
+        exact_turns = (whole + fraction) / self.width
+
+        for layer in self.layers.values():
+            if layer.is_constant():
+                continue
+            roll_yaw(layer.pixels, exact_turns, out=layer.pixels)
+            if layer.bounds is not None:
+                layer.bounds = (0, layer.bounds[1], self.width, layer.bounds[3])
+        if fraction:
+            self.mark_dirty(everything=True)
+        else:
+            roll_yaw(self.result, exact_turns, out=self.result)
+        # Painted rects waiting for flatten() are in unrotated coordinates
+        if self._painted:
+            self.mark_dirty(everything=True)
+            self._painted = []
+
+        if lights is None:
+            lights = {key: layer._replace(longitude=(layer.longitude + exact_turns * 360.0 + 180.0) % 360.0 - 180.0)
+                      for key, layer in self.lights.layers().items()}
+        self.set_lights(lights)
+        return lights
+
+    def rotate(self, matrix, lights=None):
+        """Bake an arbitrary rotation into every layer, see transform.reproject().
+
+        Light directions are rotated with the pixels and everything is
+        recomposited by the next flatten().
+
+        Args:
+            lights: The moved lights as the caller stores them, see rotate_yaw()
+
+        Returns:
+            dict: The moved lights {key: LightLayer}
+        """
+        spare = np.empty_like(self.result)
+        for layer in self.layers.values():
+            if layer.is_constant():
+                continue
+            reproject(layer.pixels, matrix, out=spare, dome=self.dome)
+            layer.pixels, spare = spare, layer.pixels
+            if layer.bounds is not None:
+                layer.bounds = (0, 0, self.width, self.height)
+        self._painted = []
+        self.mark_dirty(everything=True)
+
+        if lights is None:
+            lights = {}
+            for key, layer in self.lights.layers().items():
+                longitude, latitude = rotate_direction(matrix, layer.longitude, layer.latitude)
+                lights[key] = layer._replace(longitude=longitude, latitude=latitude)
+        self.set_lights(lights)
+        return lights
+
+    def fill(self, value=(0.0, 0.0, 0.0, 1.0)):
+        """Clear the canvas: constant base, empty painted layers (lights stay).
+
+        O(tiles); the next flatten() writes the result tile by tile.
+        """
+        for key, layer in self.layers.items():
+            if key == BASE_LAYER:
+                layer.fill(value)
+            else:
+                layer.fill(0.0)
+                layer.bounds = None
+        self._painted = []
+        self.mark_dirty(everything=True)
+
+    def layer_changed(self, key, rect):
+        """Record that a layer's pixels changed inside rect."""
+        layer = self.layers[key]
+        layer.bounds = union_rects(layer.bounds, rect)
+        self.mark_dirty(rect)
+
+    def painted(self, key, rect):
+        """Like layer_changed(), for small dab rects recomposited by the next flatten()."""
+        layer = self.layers[key]
+        layer.bounds = union_rects(layer.bounds, rect)
+        self._painted.append(rect)
+
+    # -------------------------------------------------------------------------
+    # Compositing
+    # -------------------------------------------------------------------------
+
+    def mark_dirty(self, rect=None, everything=False):
+        """Flag the tiles touched by rect (or all tiles) for recompositing."""
+        if everything:
+            self._dirty[:] = True
+            return
+        if rect is None:
+            return
+        size = self.tile_size
+        x_min, y_min, x_max, y_max = rect
+        self._dirty[y_min // size:-(-y_max // size), x_min // size:-(-x_max // size)] = True
+
+    def dirty_tiles(self):
+        """Rects of the tiles waiting for flatten()."""
+        size = self.tile_size
+        return [(tx * size, ty * size, min(self.width, (tx + 1) * size), min(self.height, (ty + 1) * size))
+                for ty, tx in zip(*np.nonzero(self._dirty))]
+
+    def flatten(self):
+        """Recomposite dirty tiles into the cached result.
+
+        Returns:
+            list: Rects that were recomposited
+        """
+        tiles = self.dirty_tiles()
+        run_tiles(self.composite, tiles)
+        self._dirty[:] = False
+
+        if self._painted:
+            # One pass over the union unless it is mostly empty (long diagonal moves)
+            union = None
+            area = 0
+            for x_min, y_min, x_max, y_max in self._painted:
+                union = union_rects(union, (x_min, y_min, x_max, y_max))
+                area += (x_max - x_min) * (y_max - y_min)
+            if (union[2] - union[0]) * (union[3] - union[1]) <= area:
+                painted = [union]
+                run_tiles(self.composite, split_rows(union, self.tile_size // 4))
+            else:
+                # Separate dab rects may overlap, composite them one after another
+                painted = self._painted
+                for rect in painted:
+                    self.composite(rect)
+            tiles.extend(painted)
+            self._painted = []
+        return tiles
+
+    def composite(self, rect):
+        """Recompute the flattened result inside one rect (safe to run per disjoint rect in parallel)."""
+        scratch = band_scratch()
+        x_min, y_min, x_max, y_max = rect
+        region = self.result[y_min:y_max, x_min:x_max]
+        base = self.layers[BASE_LAYER]
+        if base.is_constant(rect):
+            region[...] = base.constant
+        else:
+            source = base.read(rect, out=region)
+            if source is not region:
+                region[...] = source
+        rgb = region[:, :, :3]
+
+        for key in self.order[1:]:
+            layer = self.layers[key]
+            if not layer.visible or layer.opacity <= 0.0 or layer.bounds is None:
+                continue
+            overlap = intersect_rects(rect, layer.bounds)
+            if overlap is None:
+                continue
+            ox_min, oy_min, ox_max, oy_max = overlap
+            source = layer.read(overlap, out=scratch.get('source', (oy_max - oy_min, ox_max - ox_min, 4)))
+            target = rgb[oy_min-y_min:oy_max-y_min, ox_min-x_min:ox_max-x_min]
+
+            # Un-premultiply so every blend kernel sees straight color
+            alpha = scratch.get('alpha', (oy_max - oy_min, ox_max - ox_min, 1))
+            color = scratch.get('color', target.shape)
+            np.maximum(source[:, :, 3:4], _MIN_ALPHA, out=alpha)
+            np.divide(source[:, :, :3], alpha, out=color)
+            np.multiply(source[:, :, 3:4], layer.opacity, out=alpha)
+            blend_region(target, target, alpha, color, layer.blend_mode, scratch=scratch)
+
+        self.lights.add_to(region, rect)
+
+    def paint_coverage(self, key, rect, base_pixels, stroke_alpha, blend_mode='MIX'):
+        """Update a painted layer's coverage after a dab was stamped into it.
+
+        Painted layers are premultiplied, so the stamped RGB is already
+        correct and only alpha needs the matching lerp from PAINT_COVERAGE.
+
+        Args:
+            key: Painted layer key (the base layer stays opaque)
+            rect: Dirty rect returned by stamp_dab()
+            base_pixels: (height, width, 4) layer snapshot from stroke start
+            stroke_alpha: (height, width) per-stroke coverage buffer
+            blend_mode: Brush blend mode, see check_paint_mode()
+        """
+        if key == BASE_LAYER:
+            return
+        check_paint_mode(key, blend_mode)
+        x_min, y_min, x_max, y_max = rect
+        target = self.layers[key].pixels[y_min:y_max, x_min:x_max, 3]
+        before = base_pixels[y_min:y_max, x_min:x_max, 3]
+        coverage = stroke_alpha[y_min:y_max, x_min:x_max]
+        if PAINT_COVERAGE[blend_mode] == 'UNCOVER':
+            np.multiply(before, 1.0 - coverage, out=target)
+        else:
+            np.subtract(1.0, before, out=target)
+            target *= coverage
+            target += before
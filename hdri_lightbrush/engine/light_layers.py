@@ -0,0 +1,227 @@
+"""
+HDRI LightBrush - Light Layers
+Parametric lights composited lazily over the painted canvas.
+
+Each light is described by its parameters (shape, direction, angular size,
+intensity, color, softness) instead of being baked into pixels. LightStack
+keeps one cached footprint per light; when a light changes only the pixels
+it covered before and after the change need recompositing (see layers.py).
+
+Lights are additive and unclamped, so the layers below them can always be
+recovered from a flattened canvas by subtracting the lights again.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from .parallel import run_bands
+from .projection import latitude_range, latitude_to_row, row_latitudes
+
+
+LIGHT_SHAPES = ('CIRCLE', 'SQUARE', 'RECTANGLE')
+
+# Engine inputs for one light. longitude/latitude/angular_size are degrees,
+# longitude 0 / latitude 0 is the canvas center, color is linear RGB and
+# softness the fraction of the light's extent used for the edge falloff.
+LightLayer = namedtuple('LightLayer', [
+    'shape', 'longitude', 'latitude', 'angular_size', 'intensity', 'color', 'softness',
+])
+
+# A rasterized light: list of (x_min, y_min, x_max, y_max) rects and the
+# matching (h, w, 3) float32 RGB contributions
+Footprint = namedtuple('Footprint', ['rects', 'patches'])
+
+# Rows per rasterization band; light weights are trig-heavy, so small bands pay off
+LIGHT_BAND_ROWS = 64
+
+
+# =============================================================================
+# RASTERIZATION
+# =============================================================================
+
+def _direction(longitude, latitude):
+    """Unit vector for equirectangular angles in radians (broadcasts)."""
+    cos_lat = np.cos(latitude)
+    return cos_lat * np.cos(longitude), cos_lat * np.sin(longitude), np.sin(latitude)
+
+
+def _half_extents(layer):
+    """Angular half width and half height of a light in radians."""
+    half = np.radians(layer.angular_size) * 0.5
+    if layer.shape == 'RECTANGLE':
+        return half, half * 0.5
+    return half, half
+
+
+def light_bounds(layer, width, height, dome=False):
+    """Pixel rects covering a light, split at the U seam.
+
+    Args:
+        dome: The canvas holds only the upper hemisphere (see projection.py)
+
+    Returns:
+        list: (x_min, y_min, x_max, y_max) rects, empty if the light is off-canvas
+    """
+    half_x, half_y = _half_extents(layer)
+    # Bounding cap radius (corner of square shapes), kept below a hemisphere
+    reach = min(np.hypot(half_x, half_y) if layer.shape != 'CIRCLE' else half_x,
+                np.radians(89.0))
+    lon = np.radians(layer.longitude)
+    lat = np.radians(layer.latitude)
+
+    # Dome canvases end at the horizon, which clips lights below it
+    bottom, top = latitude_range(dome)
+    lat_min = max(bottom, lat - reach)
+    lat_max = min(top, lat + reach)
+    y_min = max(0, int(np.floor(latitude_to_row(lat_min, height, dome))))
+    y_max = min(height, int(np.ceil(latitude_to_row(lat_max, height, dome))) + 1)
+    if y_max <= y_min:
+        return []
+
+    # Caps that touch a pole span every longitude
+    if abs(lat) + reach >= np.pi / 2:
+        return [(0, y_min, width, y_max)]
+
+    spread = np.arcsin(min(1.0, np.sin(reach) / np.cos(lat)))
+    x_min = int(np.floor(((lon - spread) / (2 * np.pi) + 0.5) * width))
+    x_max = int(np.ceil(((lon + spread) / (2 * np.pi) + 0.5) * width)) + 1
+    if x_max - x_min >= width:
+        return [(0, y_min, width, y_max)]
+
+    # Wrap into [0, width) and split at the seam
+    x_min, x_max = x_min % width, (x_max - 1) % width + 1
+    if x_min < x_max:
+        return [(x_min, y_min, x_max, y_max)]
+    return [(x_min, y_min, width, y_max), (0, y_min, x_max, y_max)]
+
+
+def light_weights(layer, rect, width, height, dome=False):
+    """Per-pixel (h, w) float32 light weights inside one rect."""
+    x_min, y_min, x_max, y_max = rect
+    xs = ((np.arange(x_min, x_max) + 0.5) / width - 0.5) * (2 * np.pi)
+    ys = row_latitudes(height, y_min, y_max, dome)
+    px, py, pz = _direction(xs[np.newaxis, :], ys[:, np.newaxis])
+
+    lon = np.radians(layer.longitude)
+    lat = np.radians(layer.latitude)
+    # Light frame: c points at the light, e east and n north of it
+    cx, cy, cz = _direction(lon, lat)
+    ex, ey = -np.sin(lon), np.cos(lon)
+    nx, ny, nz = -np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)
+
+    along = px * cx + py * cy + pz * cz
+    half_x, half_y = _half_extents(layer)
+
+    if layer.shape == 'CIRCLE':
+        extent = np.arccos(np.clip(along, -1.0, 1.0)) / half_x
+    else:
+        east = np.abs(np.arctan2(px * ex + py * ey, along)) / half_x
+        north = np.abs(np.arctan2(px * nx + py * ny + pz * nz, along)) / half_y
+        extent = np.maximum(east, north)
+        extent[along <= 0.0] = np.inf
+
+    softness = float(layer.softness)
+    if softness <= 0.0:
+        weights = (extent <= 1.0).astype(np.float32)
+    else:
+        # Smoothstep from full intensity at (1 - softness) to zero at the edge
+        t = np.clip((1.0 - extent) / softness, 0.0, 1.0)
+        weights = (t * t * (3.0 - 2.0 * t)).astype(np.float32)
+    return weights
+
+
+def rasterize_light(layer, width, height, parallel=True, dome=False):
+    """Rasterize a light into a Footprint, in row bands on the shared thread pool."""
+    energy = np.asarray(layer.color[:3], dtype=np.float32) * np.float32(layer.intensity)
+    rects = light_bounds(layer, width, height, dome)
+    patches = []
+    for x_min, y_min, x_max, y_max in rects:
+        patch = np.empty((y_max - y_min, x_max - x_min, 3), dtype=np.float32)
+
+        def band(start, stop, patch=patch, x_min=x_min, y_min=y_min, x_max=x_max):
+            weights = light_weights(layer, (x_min, y_min + start, x_max, y_min + stop), width, height, dome)
+            np.multiply(weights[:, :, np.newaxis], energy, out=patch[start:stop])
+
+        run_bands(band, y_max - y_min, LIGHT_BAND_ROWS, parallel, min_rows=2 * LIGHT_BAND_ROWS)
+        patches.append(patch)
+    return Footprint(rects, patches)
+
+
+# =============================================================================
+# COMPOSITING
+# =============================================================================
+
+def intersect_rects(a, b):
+    """Overlap of two (x_min, y_min, x_max, y_max) rects, or None."""
+    x_min, y_min = max(a[0], b[0]), max(a[1], b[1])
+    x_max, y_max = min(a[2], b[2]), min(a[3], b[3])
+    if x_max <= x_min or y_max <= y_min:
+        return None
+    return (x_min, y_min, x_max, y_max)
+
+
+class LightStack:
+    """Cached light footprints, re-rasterized only when a light changes."""
+
+    def __init__(self):
+        self._lights = {}
+
+    def update(self, lights, width, height, dome=False):
+        """Sync with the current lights.
+
+        Only lights whose parameters changed are re-rasterized.
+
+        Args:
+            lights: Dict of light key -> LightLayer
+            width, height: Canvas size in pixels
+            dome: The canvas holds only the upper hemisphere
+
+        Returns:
+            list: Rects covered by changed lights before or after the change
+        """
+        dirty = []
+
+        for key in list(self._lights):
+            if key not in lights:
+                dirty.extend(self._lights.pop(key)[1].rects)
+
+        for key, layer in lights.items():
+            cached = self._lights.get(key)
+            if cached is not None and cached[0] == layer:
+                continue
+            if cached is not None:
+                dirty.extend(cached[1].rects)
+            footprint = rasterize_light(layer, width, height, dome=dome)
+            self._lights[key] = (layer, footprint)
+            dirty.extend(footprint.rects)
+
+        return dirty
+
+    def add_to(self, region, rect, sign=1.0):
+        """Add (or with sign=-1 subtract) the lights to an RGB(A) region at rect."""
+        x_min, y_min = rect[:2]
+        for _, footprint in self._lights.values():
+            for light_rect, patch in zip(*footprint):
+                overlap = intersect_rects(rect, light_rect)
+                if overlap is None:
+                    continue
+                ox_min, oy_min, ox_max, oy_max = overlap
+                target = region[oy_min-y_min:oy_max-y_min, ox_min-x_min:ox_max-x_min, :3]
+                source = patch[oy_min-light_rect[1]:oy_max-light_rect[1],
+                               ox_min-light_rect[0]:ox_max-light_rect[0]]
+                if sign < 0:
+                    target -= source
+                else:
+                    target += source
+
+    def layers(self):
+        """Current lights as {key: LightLayer}."""
+        return {key: layer for key, (layer, _) in self._lights.items()}
+
+    def clear(self):
+        """Drop every light."""
+        self._lights = {}
+
+    def __len__(self):
+        return len(self._lights)
@@ -0,0 +1,141 @@
+"""
+HDRI LightBrush - Parallel Bands
+Persistent thread pool for splitting canvas-wide work into row bands or tiles.
+
+NumPy releases the GIL inside its loops, so independent bands of one
+array run on separate cores. Workers must only write their own band (or
+tile) and use band_scratch() instead of a shared BlendScratch.
+
+run_bands() splits a row range, run_tiles() takes disjoint rects (dirty
+tiles, row bands of one rect from split_rows()). Both fall back to a plain
+loop when the work is too small to pay for the pool round trip.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .blend import BlendScratch
+
+
+# Rows per band, bounds the per-thread scratch memory on 8K canvases
+ROW_CHUNK = 256
+
+# Bands smaller than this are not worth a pool round trip
+MIN_PARALLEL_ROWS = 2 * ROW_CHUNK
+
+# Tile sets with less area than this run on the calling thread
+MIN_PARALLEL_PIXELS = 512 * 512
+
+# Environment variable overriding the worker count (e.g. to leave cores free)
+THREADS_ENV = "HDRI_LIGHTBRUSH_THREADS"
+
+_THREAD_PREFIX = "hdri_band"
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+_workers = None
+
+
+def worker_count():
+    """Number of pool threads: set_worker_count(), $HDRI_LIGHTBRUSH_THREADS or one per core."""
+    if _workers:
+        return _workers
+    try:
+        requested = int(os.environ.get(THREADS_ENV, 0))
+    except ValueError:
+        requested = 0
+    return requested if requested > 0 else os.cpu_count() or 1
+
+
+def set_worker_count(count=None):
+    """Use count pool threads from now on (None: back to the default); 1 runs everything serially."""
+    global _workers
+    shutdown_pool()
+    _workers = count
+
+
+def thread_pool():
+    """The shared ThreadPoolExecutor, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=worker_count(),
+                                           thread_name_prefix=_THREAD_PREFIX)
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the shared pool (it is recreated on the next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def _serial(parallel):
+    """Whether to run on the calling thread (pool workers never wait on the pool)."""
+    return (not parallel or worker_count() < 2
+            or threading.current_thread().name.startswith(_THREAD_PREFIX))
+
+
+def band_scratch():
+    """BlendScratch private to the calling thread."""
+    scratch = getattr(_local, 'scratch', None)
+    if scratch is None:
+        scratch = _local.scratch = BlendScratch()
+    return scratch
+
+
+def row_bands(height, band=ROW_CHUNK):
+    """(start, stop) row ranges of at most `band` rows covering 0..height."""
+    return [(row, min(row + band, height)) for row in range(0, height, band)]
+
+
+def split_rows(rect, band=ROW_CHUNK):
+    """Disjoint row bands of at most `band` rows covering a rect."""
+    x_min, y_min, x_max, y_max = rect
+    return [(x_min, start + y_min, x_max, stop + y_min) for start, stop in row_bands(y_max - y_min, band)]
+
+
+def run_bands(function, height, band=ROW_CHUNK, parallel=True, min_rows=MIN_PARALLEL_ROWS):
+    """Call function(start, stop) for every row band, on the pool if worthwhile.
+
+    Args:
+        min_rows: Run serially below this many rows
+
+    Returns:
+        list: The per-band results in row order
+    """
+    bands = row_bands(height, band)
+    if len(bands) < 2 or height < min_rows or _serial(parallel):
+        return [function(start, stop) for start, stop in bands]
+    futures = [thread_pool().submit(function, start, stop) for start, stop in bands]
+    return [future.result() for future in futures]
+
+
+def run_tiles(function, rects, parallel=True, min_pixels=MIN_PARALLEL_PIXELS):
+    """Call function(rect) for every rect, on the pool if worthwhile.
+
+    Rects must not overlap: tiles run concurrently in any order.
+
+    Returns:
+        list: The per-rect results in input order
+    """
+    area = sum((x_max - x_min) * (y_max - y_min) for x_min, y_min, x_max, y_max in rects)
+    if len(rects) < 2 or area < min_pixels or _serial(parallel):
+        return [function(rect) for rect in rects]
+    futures = [thread_pool().submit(function, rect) for rect in rects]
+    return [future.result() for future in futures]
+
+
+def fill(pixels, value, parallel=True):
+    """Set every pixel of a (height, width, channels) array to value, in parallel bands."""
+    def fill_band(start, stop):
+        pixels[start:stop] = value
+
+    run_bands(fill_band, pixels.shape[0], parallel=parallel)
+    return pixels
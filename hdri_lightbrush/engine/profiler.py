@@ -0,0 +1,106 @@
+"""
+HDRI LightBrush - Stage Profiler
+Opt-in per-stage timing of the paint hot path in fixed-size ring buffers.
+
+Usage:
+    t = PROFILER.start()
+    ...work...
+    PROFILER.stop('raycast', t)
+
+When the profiler is disabled start()/stop() return immediately, so the
+calls can stay in the hot path permanently.
+"""
+
+import csv
+import time
+
+import numpy as np
+
+
+# Stages of one mouse event, in pipeline order
+STAGES = (
+    'raycast',
+    'uv',
+    'rasterize',
+    'blend',
+    'foreach_set',
+    'gpu_upload',
+    'depsgraph',
+    'event',
+)
+
+
+class StageProfiler:
+    """Rolling per-stage timings (seconds) in preallocated ring buffers."""
+
+    def __init__(self, stages=STAGES, capacity=256):
+        self.enabled = False
+        self.capacity = capacity
+        self._buffers = {}
+        self._counts = {}
+        for stage in stages:
+            self._add_stage(stage)
+
+    def _add_stage(self, stage):
+        self._buffers[stage] = np.zeros(self.capacity, dtype=np.float64)
+        self._counts[stage] = 0
+
+    @property
+    def stages(self):
+        return tuple(self._buffers)
+
+    def start(self):
+        """Timestamp for a later stop(), or 0.0 when disabled."""
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, stage, start):
+        """Record the time elapsed since start() for a stage."""
+        if self.enabled:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage, seconds):
+        """Store one timing sample, overwriting the oldest once the buffer is full."""
+        if stage not in self._buffers:
+            self._add_stage(stage)
+        count = self._counts[stage]
+        self._buffers[stage][count % self.capacity] = seconds
+        self._counts[stage] = count + 1
+
+    def samples(self, stage):
+        """Recorded samples of a stage in chronological order (seconds)."""
+        count = self._counts.get(stage, 0)
+        if count == 0:
+            return np.empty(0, dtype=np.float64)
+        buffer = self._buffers[stage]
+        if count <= self.capacity:
+            return buffer[:count].copy()
+        head = count % self.capacity
+        return np.concatenate((buffer[head:], buffer[:head]))
+
+    def summary(self):
+        """List of (stage, sample_count, p50_ms, p95_ms) for stages with samples."""
+        rows = []
+        for stage in self._buffers:
+            samples = self.samples(stage)
+            if len(samples):
+                p50, p95 = np.percentile(samples, (50, 95)) * 1000.0
+                rows.append((stage, self._counts[stage], float(p50), float(p95)))
+        return rows
+
+    def reset(self):
+        """Drop all recorded samples."""
+        for stage in self._counts:
+            self._counts[stage] = 0
+
+    def write_csv(self, filepath):
+        """Write all buffered samples as (stage, sample, ms) rows."""
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'sample', 'ms'])
+            for stage in self._buffers:
+                for i, seconds in enumerate(self.samples(stage)):
+                    writer.writerow([stage, i, f"{seconds * 1000.0:.4f}"])
+
+
+# Shared instance used by the engine and the paint handler
+PROFILER = StageProfiler()
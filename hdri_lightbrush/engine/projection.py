@@ -0,0 +1,46 @@
+"""
+HDRI LightBrush - Canvas Projection
+Row latitudes of full-sphere and dome canvases.
+
+A full canvas is equirectangular over the whole sphere: 2:1, rows from
+latitude -90 (bottom) to 90 degrees. A dome canvas stores only the upper
+hemisphere, rows from the horizon to the zenith, at the same angular
+resolution, so it is 4:1 and takes half the memory.
+
+The layout is an explicit dome flag passed alongside the pixels (the add-on
+keeps it on the canvas image), never read from the size: a 4:1 image can
+just as well be a cropped full panorama.
+"""
+
+import math
+
+import numpy as np
+
+
+# Width to height of a dome canvas (a full canvas is 2:1)
+DOME_ASPECT = 4
+
+
+def canvas_height(width, dome=False):
+    """Canvas height for a width: 2:1 for the full sphere, 4:1 for a dome."""
+    return max(1, width // (DOME_ASPECT if dome else 2))
+
+
+def latitude_range(dome=False):
+    """(bottom, top) latitude in radians covered by the canvas rows."""
+    if dome:
+        return 0.0, math.pi / 2
+    return -math.pi / 2, math.pi / 2
+
+
+def row_latitudes(height, start=0, stop=None, dome=False):
+    """Latitude in radians of the pixel row centers start..stop, shape (rows,)."""
+    bottom, top = latitude_range(dome)
+    rows = np.arange(start, height if stop is None else stop)
+    return bottom + (rows + 0.5) * ((top - bottom) / height)
+
+
+def latitude_to_row(latitude, height, dome=False):
+    """Row coordinate of a latitude in radians, in pixels from the bottom edge."""
+    bottom, top = latitude_range(dome)
+    return (latitude - bottom) / (top - bottom) * height
@@ -0,0 +1,120 @@
+"""
+HDRI LightBrush - Mip Pyramid
+2x box-filtered levels of a canvas, kept current tile by tile.
+
+Level 0 is the canvas itself (by reference), level k is (h >> k, w >> k).
+Paint marks tiles dirty and refresh() re-averages only the parent texels
+of those tiles, level by level, so keeping the pyramid current costs about
+a third of the painted area. level() hands out the stored arrays directly.
+
+Dirty flags use the same tile grid on every level: one parent tile covers
+2x2 child tiles, so deep levels touch only a handful of tiles.
+"""
+
+import numpy as np
+
+from .color import ROW_CHUNK
+from .layers import TILE_SIZE
+from .parallel import run_bands
+
+
+def _halve(child, parent, rect):
+    """Average 2x2 child blocks into parent[rect] (rect in parent texels)."""
+    x_min, y_min, x_max, y_max = rect
+    block = child[2 * y_min:2 * y_max, 2 * x_min:2 * x_max]
+    target = parent[y_min:y_max, x_min:x_max]
+    np.add(block[0::2, 0::2], block[1::2, 0::2], out=target)
+    target += block[0::2, 1::2]
+    target += block[1::2, 1::2]
+    target *= 0.25
+
+
+class MipPyramid:
+    """Box-filtered levels of an (height, width, channels) canvas."""
+
+    def __init__(self, pixels, min_size=1, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.min_size = min_size
+        self.rebuild(pixels)
+
+    def rebuild(self, pixels):
+        """Recompute every level from pixels."""
+        height, width, channels = pixels.shape
+        self._levels = [pixels]
+        while min(height, width) // 2 >= self.min_size:
+            height, width = height // 2, width // 2
+            self._levels.append(np.empty((height, width, channels), dtype=np.float32))
+
+        for child, parent in zip(self._levels, self._levels[1:]):
+            parent_width = parent.shape[1]
+            run_bands(lambda start, stop: _halve(child, parent, (0, start, parent_width, stop)),
+                      parent.shape[0], ROW_CHUNK // 2)
+
+        size = self.tile_size
+        self._dirty = np.zeros((-(-pixels.shape[0] // size), -(-pixels.shape[1] // size)), dtype=bool)
+
+    def __len__(self):
+        return len(self._levels)
+
+    @property
+    def size(self):
+        return self._levels[0].shape[1], self._levels[0].shape[0]
+
+    def level(self, index):
+        """Pixels of one level (0 = full resolution); valid until the next paint."""
+        return self._levels[index]
+
+    def level_for(self, max_size):
+        """Smallest level whose longer side is still at least max_size.
+
+        Returns:
+            tuple: (level index, pixels)
+        """
+        index = 0
+        while index + 1 < len(self._levels) and max(self._levels[index + 1].shape[:2]) >= max_size:
+            index += 1
+        return index, self._levels[index]
+
+    def mark_dirty(self, rect=None, everything=False):
+        """Flag level 0 tiles touched by rect (or all tiles) for the next refresh()."""
+        if everything:
+            self._dirty[:] = True
+            return
+        if rect is None:
+            return
+        size = self.tile_size
+        x_min, y_min, x_max, y_max = rect
+        self._dirty[y_min // size:-(-y_max // size), x_min // size:-(-x_max // size)] = True
+
+    def set_source(self, pixels):
+        """Point level 0 at another array of the same shape (e.g. a new paint buffer)."""
+        if pixels.shape != self._levels[0].shape:
+            raise ValueError("Pyramid source must keep its shape, use rebuild()")
+        self._levels[0] = pixels
+
+    def refresh(self):
+        """Propagate dirty tiles up the pyramid.
+
+        Returns:
+            int: Number of dirty level 0 tiles that were propagated
+        """
+        dirty = self._dirty
+        count = int(np.count_nonzero(dirty))
+        if not count:
+            return 0
+        self._dirty = np.zeros_like(dirty)
+
+        size = self.tile_size
+        half = size // 2
+        for child, parent in zip(self._levels, self._levels[1:]):
+            # Each dirty child tile refreshes its half-size footprint in the parent
+            height, width = parent.shape[:2]
+            for ty, tx in zip(*np.nonzero(dirty)):
+                rect = (tx * half, ty * half, min(width, (tx + 1) * half), min(height, (ty + 1) * half))
+                if rect[0] < rect[2] and rect[1] < rect[3]:
+                    _halve(child, parent, rect)
+            # Parent tiles cover 2x2 child tiles
+            if dirty.shape[0] % 2 or dirty.shape[1] % 2:
+                dirty = np.pad(dirty, ((0, dirty.shape[0] % 2), (0, dirty.shape[1] % 2)))
+            dirty = dirty.reshape(dirty.shape[0] // 2, 2, dirty.shape[1] // 2, 2).any(axis=(1, 3))
+        return count
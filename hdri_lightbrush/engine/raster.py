@@ -0,0 +1,160 @@
+"""
+HDRI LightBrush - Dab Rasterization
+Single-dab stamping on NumPy pixel buffers.
+
+Large dabs blend in row bands on the shared thread pool; small ones stay
+on the calling thread, where a pool round trip would cost more than it saves.
+"""
+
+import numpy as np
+
+from .blend import SCRATCH, blend_region
+from .color import kelvin_to_linear, stroke_kelvin
+from .parallel import band_scratch, run_bands
+from .profiler import PROFILER
+from .stamp_cache import STAMP_CACHE, brush_falloff, quantize_phase  # noqa: F401 (re-exported)
+
+
+# Dabs covering at least this many pixels blend in parallel row bands
+PARALLEL_DAB_PIXELS = 256 * 256
+
+# Rows per band of a parallel dab blend
+DAB_BAND_ROWS = 64
+
+
+# =============================================================================
+# DAB STAMPING
+# =============================================================================
+
+def uv_to_pixel(uv_coord, width, height):
+    """Convert a UV coordinate to the integer pixel that contains it."""
+    return int(uv_coord[0] * width), int(uv_coord[1] * height)
+
+
+def dab_position(uv_coord, width, height, subpixel=False):
+    """Pixel center and sub-pixel phase of a dab at a UV coordinate.
+    
+    Returns:
+        tuple: ((x, y), phase) where phase is None for whole-pixel placement,
+        or the (x, y) phase indices to pass to stamp_dab() for sub-pixel
+        placement
+    """
+    if not subpixel:
+        return uv_to_pixel(uv_coord, width, height), None
+    
+    # Pixel centers sit at half-pixel UV offsets
+    pixel_x, phase_x = quantize_phase(uv_coord[0] * width - 0.5)
+    pixel_y, phase_y = quantize_phase(uv_coord[1] * height - 0.5)
+    return (pixel_x, pixel_y), (phase_x, phase_y)
+
+
+def dab_color(color, temperature, radius, phase, distance):
+    """Linear color of one dab, following a temperature brush if one is set.
+
+    Args:
+        color: Linear RGB brush color, used when temperature is None
+        temperature: color.TemperatureBrush or None
+        radius: Brush radius in pixels
+        phase: Sub-pixel phase from dab_position()
+        distance: Stroke length in pixels up to this dab
+
+    Returns:
+        ndarray: (3,) RGB, or for DAB gradients an (h, w, 3) per-pixel color
+        stamp matching the dab stamp
+    """
+    if temperature is None:
+        return np.asarray(color, dtype=np.float32)
+    if temperature.mode == 'DAB':
+        return STAMP_CACHE.get_temperature(radius, temperature.start, temperature.end, phase)
+    return kelvin_to_linear(stroke_kelvin(temperature, distance))
+
+
+def stamp_dab(pixels, base_pixels, stroke_alpha, center, radius, color, strength,
+              hardness, falloff_lut=None, blend_mode='MIX', phase=None, blend_value=None):
+    """Stamp one brush dab into a pixel buffer.
+    
+    The dab alpha is max-accumulated into stroke_alpha so overlapping dabs of
+    one stroke don't build up, and the result is always blended from
+    base_pixels (the canvas as it was when the stroke started).
+    
+    Args:
+        pixels: (height, width, 4) float32 buffer that receives the result
+        base_pixels: (height, width, 4) float32 snapshot taken at stroke start
+        stroke_alpha: (height, width) float32 per-stroke coverage buffer
+        center: (x, y) pixel center of the dab
+        radius: Brush radius in pixels
+        color: Linear RGB brush color, or an (h, w, 3) per-pixel color stamp
+            from dab_color(); per-pixel colors only land where this dab is
+            the strongest of the stroke so far, so soft brushes grade evenly
+            across the stroke instead of showing each dab's rim
+        strength: Brush strength (0-1)
+        hardness: Brush hardness (0-1), used when no falloff_lut is given
+        falloff_lut: Optional sampled falloff curve, see brush_falloff()
+        blend_mode: Any key of blend.BLEND_KERNELS
+        phase: Sub-pixel phase from dab_position(); None stamps a hard-rimmed
+            dab centered on the pixel
+        blend_value: EV stops for EXPOSURE, target luminance for LUMINANCE
+    
+    Returns:
+        tuple: Dirty rectangle (x_min, y_min, x_max, y_max), or None if the
+        dab fell outside the canvas
+    """
+    t_start = PROFILER.start()
+    height, width = stroke_alpha.shape
+    pixel_x, pixel_y = center
+    
+    stamp = STAMP_CACHE.get(radius, hardness, strength, falloff_lut, phase)
+    stamp_x = pixel_x - radius
+    stamp_y = pixel_y - radius
+    
+    # Brush bounds
+    x_min = max(0, stamp_x)
+    x_max = min(width, stamp_x + stamp.shape[1])
+    y_min = max(0, stamp_y)
+    y_max = min(height, stamp_y + stamp.shape[0])
+    
+    if x_max - x_min <= 0 or y_max - y_min <= 0:
+        return None
+    
+    dab_alpha = stamp[y_min-stamp_y:y_max-stamp_y, x_min-stamp_x:x_max-stamp_x]
+    color = np.asarray(color, dtype=np.float32)
+    alpha_region = stroke_alpha[y_min:y_max, x_min:x_max]
+    wins = None
+    if color.ndim == 3:
+        color = color[y_min-stamp_y:y_max-stamp_y, x_min-stamp_x:x_max-stamp_x]
+        # Per-pixel colors only replace pixels this dab covers most strongly so far
+        wins = SCRATCH.get('wins', dab_alpha.shape + (1,), dtype=np.bool_)
+        np.greater_equal(dab_alpha, alpha_region, out=wins[:, :, 0])
+    
+    # Max-accumulate into the stroke buffer (prevents accumulation)
+    np.maximum(alpha_region, dab_alpha, out=alpha_region)
+    PROFILER.stop('rasterize', t_start)
+    
+    t_start = PROFILER.start()
+    base_region = base_pixels[y_min:y_max, x_min:x_max, :3]
+    region = pixels[y_min:y_max, x_min:x_max, :3]
+    
+    if region.shape[0] * region.shape[1] < PARALLEL_DAB_PIXELS:
+        _blend_dab(region, base_region, alpha_region, color, wins, blend_mode, blend_value, SCRATCH)
+    else:
+        def blend_band(start, stop):
+            _blend_dab(region[start:stop], base_region[start:stop], alpha_region[start:stop],
+                       color[start:stop] if color.ndim == 3 else color,
+                       wins[start:stop] if wins is not None else None,
+                       blend_mode, blend_value, band_scratch())
+        run_bands(blend_band, region.shape[0], DAB_BAND_ROWS, min_rows=2 * DAB_BAND_ROWS)
+    PROFILER.stop('blend', t_start)
+    
+    return (x_min, y_min, x_max, y_max)
+
+
+def _blend_dab(region, base_region, alpha_region, color, wins, blend_mode, blend_value, scratch):
+    """Blend one dab (or a row band of it) from the stroke snapshot into region."""
+    if wins is None:
+        blend_region(region, base_region, alpha_region[:, :, np.newaxis], color, blend_mode,
+                     scratch=scratch, value=blend_value)
+    else:
+        blended = scratch.get('dab', region.shape)
+        blend_region(blended, base_region, alpha_region[:, :, np.newaxis], color, blend_mode,
+                     scratch=scratch, value=blend_value)
+        np.copyto(region, blended, where=wins)
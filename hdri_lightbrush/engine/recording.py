@@ -0,0 +1,247 @@
+"""
+HDRI LightBrush - Stroke Recording
+Compact binary stroke recordings and deterministic replay.
+
+File layout (little endian):
+    header   4s magic 'HLBR', H version
+    stroke   I canvas width, I canvas height, brush snapshot (v2 adds a
+             flags byte, v3 a blend value, v4 the temperature brush),
+             I sample count,
+             samples as packed (t: f8, u: f8, v: f8, pressure: f4) records
+
+A stroke is buffered in memory while it is painted and written in one go
+when it ends, so recording adds no file I/O to mouse events.
+"""
+
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .canvas import Brush, Canvas
+from .color import TEMPERATURE_MODES, TemperatureBrush
+
+
+MAGIC = b'HLBR'
+VERSION = 4
+
+# UVs are stored at full precision so replay hits exactly the same pixels
+SAMPLE_DTYPE = np.dtype([('t', '<f8'), ('u', '<f8'), ('v', '<f8'), ('pressure', '<f4')])
+
+_HEADER = struct.Struct('<4sH')
+_STROKE = struct.Struct('<II')
+_BRUSH = struct.Struct('<IffffffH16sBfBfff')
+_BRUSH_V3 = struct.Struct('<IffffffH16sBf')
+_BRUSH_V2 = struct.Struct('<IffffffH16sB')
+_BRUSH_V1 = struct.Struct('<IffffffH16s')
+
+# Brush flag bits
+FLAG_SUBPIXEL = 1
+_COUNT = struct.Struct('<I')
+
+
+# Recorded brushes are plain canvas.Brush settings
+BrushSnapshot = Brush
+
+# One recorded stroke: canvas (width, height), BrushSnapshot and SAMPLE_DTYPE samples
+RecordedStroke = namedtuple('RecordedStroke', ['canvas_size', 'brush', 'samples'])
+
+
+# =============================================================================
+# WRITING
+# =============================================================================
+
+class StrokeRecorder:
+    """Append strokes to a recording file."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._file = open(filepath, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION))
+        self._stroke = None
+        self._samples = []
+        self.stroke_count = 0
+
+    def begin_stroke(self, canvas_size, brush):
+        """Start a new stroke; an unfinished previous stroke is written first."""
+        if self._stroke is not None:
+            self.end_stroke()
+        self._stroke = (canvas_size, brush)
+        self._samples = []
+
+    def add_sample(self, uv_coord, pressure=1.0, timestamp=None):
+        """Record one mouse sample of the current stroke."""
+        if self._stroke is None:
+            return
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self._samples.append((timestamp, uv_coord[0], uv_coord[1], pressure))
+
+    def end_stroke(self):
+        """Write the current stroke to disk."""
+        if self._stroke is None:
+            return
+        (width, height), brush = self._stroke
+        samples = np.array(self._samples, dtype=SAMPLE_DTYPE)
+        lut = np.asarray(brush.falloff_lut if brush.falloff_lut is not None else [], dtype='<f4')
+        temperature = brush.temperature
+        if temperature is None:
+            temperature_fields = (0, 0.0, 0.0, 0.0)
+        else:
+            temperature_fields = (TEMPERATURE_MODES.index(temperature.mode) + 1,
+                                  temperature.start, temperature.end, temperature.length)
+
+        self._file.write(_STROKE.pack(width, height))
+        self._file.write(_BRUSH.pack(
+            int(brush.radius), brush.strength, brush.hardness, brush.spacing,
+            *[float(c) for c in brush.color[:3]],
+            len(lut), brush.blend_mode.encode('ascii')[:16],
+            FLAG_SUBPIXEL if brush.subpixel else 0,
+            float('nan') if brush.blend_value is None else float(brush.blend_value),
+            *temperature_fields))
+        self._file.write(lut.tobytes())
+        self._file.write(_COUNT.pack(len(samples)))
+        self._file.write(samples.tobytes())
+        self._file.flush()
+
+        self._stroke = None
+        self._samples = []
+        self.stroke_count += 1
+
+    def close(self):
+        """Finish the last stroke and close the file."""
+        self.end_stroke()
+        self._file.close()
+
+
+# =============================================================================
+# READING
+# =============================================================================
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated stroke recording")
+    return data
+
+
+def read_recording(filepath):
+    """Read every stroke of a recording file.
+
+    Returns:
+        list: RecordedStroke entries in recording order
+    """
+    strokes = []
+    with open(filepath, 'rb') as f:
+        magic, version = _HEADER.unpack(_read_exact(f, _HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a stroke recording: {filepath}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported stroke recording version {version}")
+
+        while True:
+            chunk = f.read(_STROKE.size)
+            if not chunk:
+                break
+            if len(chunk) != _STROKE.size:
+                raise ValueError("Truncated stroke recording")
+            width, height = _STROKE.unpack(chunk)
+
+            blend_value = None
+            temperature = None
+            if version >= 4:
+                (radius, strength, hardness, spacing, r, g, b, lut_len, blend, flags, blend_value,
+                 temperature_mode, kelvin_start, kelvin_end, length) = _BRUSH.unpack(
+                    _read_exact(f, _BRUSH.size))
+                if temperature_mode:
+                    temperature = TemperatureBrush(TEMPERATURE_MODES[temperature_mode - 1],
+                                                   kelvin_start, kelvin_end, length)
+            elif version == 3:
+                (radius, strength, hardness, spacing, r, g, b,
+                 lut_len, blend, flags, blend_value) = _BRUSH_V3.unpack(_read_exact(f, _BRUSH_V3.size))
+            elif version == 2:
+                (radius, strength, hardness, spacing, r, g, b,
+                 lut_len, blend, flags) = _BRUSH_V2.unpack(_read_exact(f, _BRUSH_V2.size))
+            else:
+                (radius, strength, hardness, spacing, r, g, b,
+                 lut_len, blend) = _BRUSH_V1.unpack(_read_exact(f, _BRUSH_V1.size))
+                flags = 0
+            if blend_value is not None and np.isnan(blend_value):
+                blend_value = None
+            lut = None
+            if lut_len:
+                lut = np.frombuffer(_read_exact(f, lut_len * 4), dtype='<f4').astype(np.float32)
+            (count,) = _COUNT.unpack(_read_exact(f, _COUNT.size))
+            samples = np.frombuffer(_read_exact(f, count * SAMPLE_DTYPE.itemsize), dtype=SAMPLE_DTYPE)
+
+            brush = BrushSnapshot(radius, strength, hardness, spacing, (r, g, b),
+                                  blend.rstrip(b'\0').decode('ascii'), lut,
+                                  bool(flags & FLAG_SUBPIXEL), blend_value, temperature)
+            strokes.append(RecordedStroke((width, height), brush, samples))
+    return strokes
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+def replay_strokes(strokes, canvas, realtime=False, on_event=None):
+    """Re-run recorded strokes against a Canvas or a (height, width, 4) pixel buffer.
+
+    Uses the same spacing and stamping path as the paint handler, so the
+    result is identical for identical input. UVs only map to the same pixels
+    on a canvas of the recorded size (a 4:1 dome and a 2:1 full canvas of
+    one width differ), so any other size is refused.
+
+    Args:
+        strokes: RecordedStroke list from read_recording()
+        canvas: Canvas (e.g. one layer of a LayeredCanvas) or a buffer,
+            modified in place
+        realtime: Sleep between samples to reproduce the original timing
+        on_event: Optional callback(stroke_index, dab_count, seconds) per sample
+
+    Returns:
+        dict: 'dabs', 'events' and 'event_seconds' (list of per-sample times)
+
+    Raises:
+        ValueError: A stroke was recorded on a canvas of another size, or
+            uses a blend mode the canvas layer does not take
+    """
+    if not isinstance(canvas, Canvas):
+        canvas = Canvas(canvas)
+    for recorded in strokes:
+        if tuple(recorded.canvas_size) != canvas.size:
+            width, height = recorded.canvas_size
+            raise ValueError(f"Strokes were recorded on a {width}x{height} canvas, "
+                             f"not {canvas.width}x{canvas.height}")
+        canvas.check_brush(recorded.brush)
+
+    event_seconds = []
+    total_dabs = 0
+
+    for stroke_index, recorded in enumerate(strokes):
+        stroke = canvas.begin_stroke(recorded.brush)
+
+        wall_start = time.perf_counter()
+        t0 = recorded.samples['t'][0] if len(recorded.samples) else 0.0
+
+        for sample in recorded.samples:
+            if realtime:
+                delay = (sample['t'] - t0) - (time.perf_counter() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            event_start = time.perf_counter()
+            dabs_before = stroke.dab_count
+            stroke.add_sample((float(sample['u']), float(sample['v'])))
+            elapsed = time.perf_counter() - event_start
+
+            dabs = stroke.dab_count - dabs_before
+            event_seconds.append(elapsed)
+            total_dabs += dabs
+            if on_event is not None:
+                on_event(stroke_index, dabs, elapsed)
+        stroke.end()
+
+    return {'dabs': total_dabs, 'events': len(event_seconds), 'event_seconds': event_seconds}
@@ -0,0 +1,111 @@
+"""
+HDRI LightBrush - Preview Sphere Mesh
+Cube-sphere vertices, quads and equirectangular UVs as NumPy arrays.
+
+The six cube faces are split into an n x n grid with equal-angle spacing
+and projected onto the sphere, so quads stay close to square everywhere
+(no pole pinching as with a UV sphere). n is chosen from the canvas width:
+a facet bulges inward by about theta^2 / 8 of the radius for an edge
+spanning theta radians, and that is kept below the angle of one canvas
+pixel. Ray casts against the mesh then land within about a pixel of the
+true sphere for viewpoints up to one radius away from the center.
+
+n is always even, so a row of vertices lies on the equator and the dome
+(upper hemisphere) is the quads above it, with a clean edge at the horizon.
+"""
+
+import math
+
+import numpy as np
+
+
+# Allowed facet depth, in canvas pixels (of the angular pixel size)
+FACET_TOLERANCE_PX = 1.0
+
+MIN_SUBDIVISIONS = 4
+MAX_SUBDIVISIONS = 64
+
+# (normal axis, sign) of the cube faces, with the two in-face axes
+_CUBE_FACES = [
+    (0, 1.0, 1, 2), (0, -1.0, 2, 1),
+    (1, 1.0, 2, 0), (1, -1.0, 0, 2),
+    (2, 1.0, 0, 1), (2, -1.0, 1, 0),
+]
+
+
+def sphere_subdivisions(canvas_width, tolerance_px=FACET_TOLERANCE_PX):
+    """Grid cuts per cube face for a canvas width (even, clamped)."""
+    pixel_angle = 2.0 * math.pi / max(1, canvas_width)
+    edge_angle = math.sqrt(8.0 * tolerance_px * pixel_angle)
+    cuts = math.ceil((math.pi / 2.0) / edge_angle)
+    cuts += cuts % 2
+    return max(MIN_SUBDIVISIONS, min(MAX_SUBDIVISIONS, cuts))
+
+
+def cube_sphere(subdivisions, radius=1.0, dome=False):
+    """Closed cube-sphere mesh, or its upper half open at the horizon for a dome.
+
+    Returns:
+        tuple: (vertices (n, 3) float32, quads (m, 4) int32 with outward
+        counter-clockwise winding)
+    """
+    cuts = subdivisions
+    angles = np.tan(np.linspace(-math.pi / 4.0, math.pi / 4.0, cuts + 1))
+    a, b = np.meshgrid(angles, angles, indexing='ij')
+
+    points = []
+    quads = []
+    i, j = np.meshgrid(np.arange(cuts), np.arange(cuts), indexing='ij')
+    for index, (normal, sign, axis_a, axis_b) in enumerate(_CUBE_FACES):
+        face = np.empty((cuts + 1, cuts + 1, 3))
+        face[:, :, normal] = sign
+        face[:, :, axis_a] = a
+        face[:, :, axis_b] = b
+        points.append(face.reshape(-1, 3))
+
+        corner = index * (cuts + 1) ** 2 + i * (cuts + 1) + j
+        quads.append(np.stack([corner, corner + cuts + 1, corner + cuts + 2, corner + 1], axis=-1).reshape(-1, 4))
+
+    points = np.concatenate(points)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+
+    # Weld the vertices shared by neighbouring cube faces
+    welded, inverse = np.unique(np.round(points, 6), axis=0, return_inverse=True)
+    quads = inverse.reshape(-1)[np.concatenate(quads)]
+
+    if dome:
+        quads = quads[np.all(welded[quads, 2] >= -1e-6, axis=1)]
+        used, quads = np.unique(quads, return_inverse=True)
+        welded, quads = welded[used], quads.reshape(-1, 4)
+
+    vertices = (welded / np.linalg.norm(welded, axis=1, keepdims=True) * radius).astype(np.float32)
+    return vertices, quads.astype(np.int32)
+
+
+def equirect_uvs(vertices, quads, dome=False):
+    """Per-corner equirectangular UVs matching stroke.direction_to_uv().
+
+    Quads crossing the U seam get U > 1 on their far corners, and corners
+    on a pole take the mean U of their quad. With dome, V spans the upper
+    hemisphere only (a dome canvas, see projection.py).
+
+    Returns:
+        ndarray: (m * 4, 2) float32 UVs in corner order
+    """
+    x, y, z = (vertices / np.linalg.norm(vertices, axis=1, keepdims=True)).T
+    u = (0.5 - np.arctan2(y, x) / (2.0 * np.pi)) % 1.0
+    if dome:
+        v = np.arcsin(np.clip(z, 0.0, 1.0)) / (np.pi / 2.0)
+    else:
+        v = 0.5 + np.arcsin(np.clip(z, -1.0, 1.0)) / np.pi
+
+    corner_u = u[quads]
+    seam = corner_u.max(axis=1) - corner_u.min(axis=1) > 0.5
+    corner_u[seam] = np.where(corner_u[seam] < 0.5, corner_u[seam] + 1.0, corner_u[seam])
+
+    pole = np.hypot(x, y)[quads] < 1e-6
+    if np.any(pole):
+        others = np.where(pole, 0.0, corner_u).sum(axis=1) / np.maximum(1, (~pole).sum(axis=1))
+        corner_u = np.where(pole, others[:, np.newaxis], corner_u)
+
+    return np.stack([corner_u, v[quads]], axis=-1).reshape(-1, 2).astype(np.float32)
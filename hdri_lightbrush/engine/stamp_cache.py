@@ -0,0 +1,176 @@
+"""
+HDRI LightBrush - Stamp Cache
+Precomputed dab alpha masks, reused for every dab of a stroke.
+
+A stamp is the full (falloff * strength * circle mask) window of one dab.
+It only depends on the brush settings and the sub-pixel phase of the dab
+center, so stamping becomes a slice plus np.maximum instead of rebuilding
+distance grids, square roots and the falloff for every dab.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from .color import kelvin_to_linear, mix_kelvin
+
+
+# Sub-pixel positions per axis (quarter pixel)
+PHASES = 4
+
+
+# =============================================================================
+# FALLOFF
+# =============================================================================
+
+def brush_falloff(normalized_dist, hardness, falloff_lut=None):
+    """Falloff weight for distances normalized to the brush radius (0=center, 1=rim).
+
+    Args:
+        normalized_dist: Array of distances divided by the brush radius
+        hardness: Fraction of the radius painted at full strength (0-1)
+        falloff_lut: Optional 1D array sampling the falloff curve over [0, 1]
+
+    Returns:
+        ndarray: Falloff values clipped to 0-1, same shape as normalized_dist
+    """
+    if falloff_lut is not None:
+        lut = np.asarray(falloff_lut, dtype=np.float32)
+        positions = np.linspace(0.0, 1.0, len(lut), dtype=np.float32)
+        falloff = np.interp(normalized_dist, positions, lut, right=0.0)
+        return np.clip(falloff, 0, 1)
+    
+    falloff = np.ones_like(normalized_dist)
+    if hardness >= 0.99:
+        return falloff
+    
+    outer_mask = normalized_dist > hardness
+    if np.any(outer_mask):
+        outer_dist = (normalized_dist[outer_mask] - hardness) / (1.0 - hardness)
+        falloff[outer_mask] = 1.0 - outer_dist * outer_dist
+    return np.clip(falloff, 0, 1)
+
+
+def quantize_phase(position):
+    """Split a continuous pixel coordinate into (pixel, phase index).
+
+    The fractional part is rounded to the nearest 1/PHASES pixel; rounding
+    up to a whole pixel carries into the pixel index.
+    """
+    pixel = int(position // 1)
+    step = int((position - pixel) * PHASES + 0.5)
+    if step >= PHASES:
+        return pixel + 1, 0
+    return pixel, step
+
+
+# =============================================================================
+# STAMPS
+# =============================================================================
+
+class StampCache:
+    """LRU cache of dab stamps keyed by radius, hardness, strength, curve and phase.
+
+    Also holds the per-pixel color stamps of temperature gradient brushes.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._stamps = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, radius, hardness, strength, falloff_lut=None, phase=None):
+        """Return the (read-only) float32 stamp for these brush settings.
+
+        The stamp's top-left pixel sits at (center - radius) and it spans
+        2 * radius + 1 pixels, plus one when that axis has a sub-pixel phase.
+
+        Args:
+            radius: Brush radius in pixels
+            hardness: Brush hardness (ignored when falloff_lut is given)
+            strength: Brush strength (0-1), baked into the stamp
+            falloff_lut: Optional sampled falloff curve
+            phase: None for a pixel-centered stamp with a hard rim, or the
+                (x, y) sub-pixel phase indices in 0..PHASES-1 for an
+                anti-aliased stamp centered between pixels
+        """
+        lut_key = None
+        if falloff_lut is not None:
+            lut_key = np.asarray(falloff_lut, dtype=np.float32).tobytes()
+        key = (int(radius), float(hardness), float(strength), lut_key,
+               None if phase is None else tuple(phase))
+        return self._lookup(key, build_stamp, radius, hardness, strength, falloff_lut, phase)
+
+    def get_temperature(self, radius, kelvin_center, kelvin_rim, phase=None):
+        """Return the (read-only) (h, w, 3) linear color stamp of a temperature gradient.
+
+        Matches the footprint of get() for the same radius and phase.
+        """
+        key = ('temperature', int(radius), float(kelvin_center), float(kelvin_rim),
+               None if phase is None else tuple(phase))
+        return self._lookup(key, build_temperature_stamp, radius, kelvin_center, kelvin_rim, phase)
+
+    def _lookup(self, key, build, *args):
+        stamp = self._stamps.get(key)
+        if stamp is not None:
+            self._stamps.move_to_end(key)
+            self.hits += 1
+            return stamp
+
+        self.misses += 1
+        stamp = build(*args)
+        self._stamps[key] = stamp
+        if len(self._stamps) > self.max_entries:
+            self._stamps.popitem(last=False)
+        return stamp
+
+    def clear(self):
+        """Drop every cached stamp."""
+        self._stamps.clear()
+
+    def __len__(self):
+        return len(self._stamps)
+
+
+def _stamp_distances(radius, phase):
+    """Squared distances of a stamp's pixels to the (sub-pixel) dab center."""
+    phase_x, phase_y = phase if phase is not None else (0, 0)
+    size_x = 2 * radius + 1 + (1 if phase_x else 0)
+    size_y = 2 * radius + 1 + (1 if phase_y else 0)
+
+    yy, xx = np.ogrid[0:size_y, 0:size_x]
+    dx = xx - radius - phase_x / PHASES
+    dy = yy - radius - phase_y / PHASES
+    return dx*dx + dy*dy
+
+
+def build_stamp(radius, hardness, strength, falloff_lut=None, phase=None):
+    """Build one dab stamp, see StampCache.get()."""
+    dist_sq = _stamp_distances(radius, phase)
+    dist = np.sqrt(dist_sq)
+
+    if phase is None:
+        coverage = dist_sq <= radius * radius
+    else:
+        # Anti-aliased rim: pixel coverage ramps over one pixel around the radius
+        coverage = np.clip(radius + 0.5 - dist, 0.0, 1.0)
+
+    # Hard brushes keep full strength up to the rim, soft ones reach zero there
+    falloff = brush_falloff(np.minimum(dist / radius, 1.0), hardness, falloff_lut)
+    stamp = ((falloff * strength) * coverage).astype(np.float32)
+    stamp.setflags(write=False)
+    return stamp
+
+
+def build_temperature_stamp(radius, kelvin_center, kelvin_rim, phase=None):
+    """Build one temperature color stamp, see StampCache.get_temperature()."""
+    dist = np.sqrt(_stamp_distances(radius, phase))
+    kelvin = mix_kelvin(kelvin_center, kelvin_rim, np.minimum(dist / max(radius, 1), 1.0))
+    stamp = kelvin_to_linear(kelvin)
+    stamp.setflags(write=False)
+    return stamp
+
+
+# Shared instance used by stamp_dab()
+STAMP_CACHE = StampCache()
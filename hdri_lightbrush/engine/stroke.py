@@ -0,0 +1,97 @@
+"""
+HDRI LightBrush - Stroke Interpolation
+Spacing-based dab placement between mouse samples.
+"""
+
+import math
+
+
+# Directions closer to the pole axis than this (in xy length) have an unreliable longitude
+POLE_RADIUS = 0.2
+
+# Largest U jump accepted near a pole before the last stable U is kept
+POLE_MAX_JUMP = 0.1
+
+
+def direction_to_uv(direction, stable_u=0.5, dome=False):
+    """Equirectangular UV of a sphere-local direction, as the preview sphere maps it.
+    
+    Near the poles small movements swing the longitude wildly, so there U
+    holds at the last stable value instead of jumping across the canvas.
+    
+    Args:
+        direction: (x, y, z) direction in sphere space (need not be normalized)
+        stable_u: U of the last sample away from the poles
+        dome: V spans the upper hemisphere only (see projection.py);
+            directions below the horizon clamp to it
+    
+    Returns:
+        tuple: ((u, v), new stable_u)
+    """
+    x, y, z = direction
+    length = math.sqrt(x*x + y*y + z*z)
+    if length > 0.0001:
+        x, y, z = x / length, y / length, z / length
+    
+    latitude = math.asin(max(-1.0, min(1.0, z)))
+    if dome:
+        v = max(0.0, min(1.0, latitude / (math.pi / 2.0)))
+    else:
+        v = max(0.0, min(1.0, 0.5 + latitude / math.pi))
+    
+    u = 0.5 - math.atan2(y, x) / (2.0 * math.pi)
+    if u < 0.0:
+        u += 1.0
+    elif u > 1.0:
+        u -= 1.0
+    
+    if math.sqrt(x*x + y*y) > POLE_RADIUS:
+        stable_u = u
+    else:
+        u_diff = abs(u - stable_u)
+        if u_diff > 0.5:
+            u_diff = 1.0 - u_diff
+        if u_diff > POLE_MAX_JUMP:
+            u = stable_u
+    
+    return (u, v), stable_u
+
+
+def stroke_dabs(last_uv, uv_coord, width, height, spacing_px):
+    """Place dabs between the last painted UV and a new mouse sample.
+    
+    Args:
+        last_uv: UV of the last dab in the stroke, or None at stroke start
+        uv_coord: UV of the new mouse sample
+        width, height: Canvas size in pixels
+        spacing_px: Distance between dabs in pixels
+    
+    Returns:
+        tuple: (dab_uvs, new_last_uv) - dabs to stamp in order and the UV the
+        next interpolation should continue from
+    """
+    if last_uv is None:
+        return [uv_coord], uv_coord
+    
+    dx = uv_coord[0] - last_uv[0]
+    dy = uv_coord[1] - last_uv[1]
+    
+    # Wrap-around detection (stroke crossed the U seam)
+    if abs(dx) > 0.5:
+        return [uv_coord], uv_coord
+    
+    dx_px = dx * width
+    dy_px = dy * height
+    distance_px = (dx_px*dx_px + dy_px*dy_px) ** 0.5
+    
+    if distance_px < spacing_px:
+        return [], last_uv
+    
+    num_dabs = int(distance_px / spacing_px)
+    dabs = []
+    for i in range(1, num_dabs + 1):
+        t = (i * spacing_px) / distance_px
+        dabs.append((last_uv[0] + dx * t, last_uv[1] + dy * t))
+    
+    final_t = (num_dabs * spacing_px) / distance_px
+    return dabs, (last_uv[0] + dx * final_t, last_uv[1] + dy * final_t)
@@ -0,0 +1,195 @@
+"""
+HDRI LightBrush - Tone Mapping
+Vectorized HDR -> 8-bit sRGB conversion for LDR exports and thumbnails.
+
+display_srgb() runs ROW_CHUNK row bands on the shared thread pool:
+exposure, a tone curve into 0-1, then one lookup in a per-curve table that
+also applies the output transfer function. Peak memory is a few row chunks
+per worker regardless of canvas size. thumbnail() box-filters first, so small previews only tone-map the
+reduced image.
+"""
+
+import numpy as np
+
+from .color import ROW_CHUNK, linear_to_srgb
+from .parallel import MIN_PARALLEL_ROWS, band_scratch, run_bands
+
+
+# Entries of the 0-1 encoding tables (~0.2 LSB steps for 8-bit output)
+DISPLAY_LUT_SIZE = 16384
+
+# AgX log2 exposure range mapped onto 0-1
+_AGX_MIN_EV = -12.47393
+_AGX_MAX_EV = 4.026069
+
+# AgX inset / outset matrices for row vectors (rgb @ matrix)
+_AGX_INSET = np.array([
+    [0.842479062253094, 0.0423282422610123, 0.0423756549057051],
+    [0.0784335999999992, 0.878468636469772, 0.0784336],
+    [0.0792237451477643, 0.0791661274605434, 0.879142973793104],
+], dtype=np.float32)
+_AGX_OUTSET = np.array([
+    [1.19687900512017, -0.0528968517574562, -0.0529716355144438],
+    [-0.0980208811401368, 1.15190312990417, -0.0980434501171241],
+    [-0.0990297440797205, -0.0989611768448433, 1.15107367264116],
+], dtype=np.float32)
+
+# Sigmoid fit of the AgX base contrast, highest power first
+_AGX_CURVE = (15.5, -40.14, 31.96, -6.868, 0.4298, 0.1191, -0.00232)
+
+_encode_luts = {}
+
+
+# =============================================================================
+# TONE CURVES
+# =============================================================================
+# Each curve maps non-negative linear RGB in place to 0-1 (a few may
+# overshoot slightly and are clipped by the caller).
+
+def _clip(rgb, scratch):
+    """No tone mapping - values above 1 are clipped."""
+
+
+def _reinhard(rgb, scratch):
+    """Reinhard x / (1 + x) per channel."""
+    denominator = scratch.get('denominator', rgb.shape)
+    np.add(rgb, 1.0, out=denominator)
+    rgb /= denominator
+
+
+def _aces(rgb, scratch):
+    """Narkowicz ACES filmic fit: x(2.51x + 0.03) / (x(2.43x + 0.59) + 0.14)."""
+    numerator = scratch.get('numerator', rgb.shape)
+    denominator = scratch.get('denominator', rgb.shape)
+    rgb *= 0.6
+    np.multiply(rgb, 2.51, out=numerator)
+    numerator += 0.03
+    numerator *= rgb
+    np.multiply(rgb, 2.43, out=denominator)
+    denominator += 0.59
+    denominator *= rgb
+    denominator += 0.14
+    np.divide(numerator, denominator, out=rgb)
+
+
+def _agx(rgb, scratch):
+    """AgX-like: inset, log2 encode, sigmoid contrast, outset (display-encoded)."""
+    flat = rgb.reshape(-1, 3)
+    encoded = scratch.get('numerator', flat.shape)
+    np.matmul(flat, _AGX_INSET, out=encoded)
+    np.maximum(encoded, 1e-10, out=encoded)
+    np.log2(encoded, out=encoded)
+    np.clip(encoded, _AGX_MIN_EV, _AGX_MAX_EV, out=encoded)
+    encoded -= _AGX_MIN_EV
+    encoded *= 1.0 / (_AGX_MAX_EV - _AGX_MIN_EV)
+
+    # Horner evaluation of the contrast polynomial
+    np.multiply(encoded, _AGX_CURVE[0], out=flat)
+    for coefficient in _AGX_CURVE[1:-1]:
+        flat += coefficient
+        flat *= encoded
+    flat += _AGX_CURVE[-1]
+    np.matmul(flat, _AGX_OUTSET, out=encoded)
+    np.copyto(flat, encoded)
+
+
+# name -> (curve, exponent that linearizes its output)
+TONEMAP_OPERATORS = {
+    'CLIP': (_clip, 1.0),
+    'REINHARD': (_reinhard, 1.0),
+    'ACES': (_aces, 1.0),
+    'AGX': (_agx, 2.2),
+}
+
+
+def _encode_lut(operator):
+    """0-1 table from a curve's output to sRGB-encoded display values."""
+    lut = _encode_luts.get(operator)
+    if lut is None:
+        values = np.linspace(0.0, 1.0, DISPLAY_LUT_SIZE + 1, dtype=np.float32)
+        exponent = TONEMAP_OPERATORS[operator][1]
+        if exponent != 1.0:
+            values **= exponent
+        lut = linear_to_srgb(values)
+        lut.setflags(write=False)
+        _encode_luts[operator] = lut
+    return lut
+
+
+# =============================================================================
+# DISPLAY CONVERSION
+# =============================================================================
+
+def display_srgb(pixels, exposure=0.0, operator='AGX', out=None, parallel=True):
+    """Tone-map linear HDR pixels and encode them for 8-bit sRGB files.
+
+    Args:
+        pixels: (height, width, 3 or 4) float32 linear pixels
+        exposure: Exposure adjustment in EV stops
+        operator: Key of TONEMAP_OPERATORS, unknown names fall back to CLIP
+        out: Optional (height, width, 4) float32 destination
+        parallel: Use the thread pool
+
+    Returns:
+        ndarray: (height, width, 4) float32 display values in 0-1, alpha 1
+    """
+    if operator not in TONEMAP_OPERATORS:
+        operator = 'CLIP'
+    curve = TONEMAP_OPERATORS[operator][0]
+    lut = _encode_lut(operator)
+
+    height, width = pixels.shape[:2]
+    if out is None:
+        out = np.empty((height, width, 4), dtype=np.float32)
+    scale = np.float32(2.0 ** exposure)
+
+    def encode(start, stop):
+        scratch = band_scratch()
+        source = pixels[start:stop, :, :3]
+        work = scratch.get('work', source.shape)
+        index = scratch.get('index', source.shape, dtype=np.int32)
+
+        np.multiply(source, scale, out=work)
+        np.maximum(work, 0.0, out=work)
+        curve(work, scratch)
+
+        # Round to the nearest table entry
+        np.clip(work, 0.0, 1.0, out=work)
+        work *= DISPLAY_LUT_SIZE
+        np.add(work, 0.5, out=index, casting='unsafe')
+        np.take(lut, index, out=out[start:stop, :, :3])
+        out[start:stop, :, 3] = 1.0
+
+    run_bands(encode, height, parallel=parallel)
+    return out
+
+
+def downsample(pixels, factor, scratch=None):
+    """Box-filter RGB by an integer factor (trailing partial blocks are dropped).
+
+    Returns:
+        ndarray: (height // factor, width // factor, 3) float32
+    """
+    height, width = pixels.shape[:2]
+    out_height, out_width = height // factor, width // factor
+    out = np.empty((out_height, out_width, 3), dtype=np.float32)
+    rows_per_chunk = max(1, ROW_CHUNK // factor)
+
+    def reduce(start, stop):
+        block = pixels[start * factor:stop * factor, :out_width * factor, :3]
+        block.reshape(stop - start, factor, out_width, factor, 3).mean(axis=(1, 3), out=out[start:stop])
+
+    run_bands(reduce, out_height, rows_per_chunk, min_rows=max(1, MIN_PARALLEL_ROWS // factor))
+    return out
+
+
+def thumbnail(pixels, max_size=512, exposure=0.0, operator='AGX'):
+    """Tone-mapped sRGB preview whose longer side is at most max_size.
+
+    Returns:
+        ndarray: (h, w, 4) float32 display values in 0-1
+    """
+    height, width = pixels.shape[:2]
+    factor = max(1, -(-max(width, height) // max_size))
+    small = downsample(pixels, factor) if factor > 1 else pixels
+    return display_srgb(small, exposure, operator)
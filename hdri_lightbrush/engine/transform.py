@@ -0,0 +1,267 @@
+"""
+HDRI LightBrush - Canvas Transforms
+Whole-canvas geometric operations on equirectangular pixel buffers.
+
+A yaw rotation of an equirectangular image is a horizontal wrap-around
+shift, so baking it is a copy of two slices per row chunk (exact for whole
+pixels) plus one linear blend between neighbours for a sub-pixel remainder.
+
+Any other orientation is a full reprojection: every output pixel looks up
+its source position through the rotation and samples it bilinearly. The
+source positions only depend on (resolution, rotation), so they are cached
+and shared by every layer rotated with the same matrix; the sampling runs
+in row bands on the shared thread pool.
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from .parallel import band_scratch, run_bands
+from .projection import latitude_range, row_latitudes
+
+
+# Sampling grids kept in memory (8 bytes per pixel each, 256 MB at 8K)
+GRID_CACHE_SIZE = 2
+
+_grids = OrderedDict()
+
+
+# =============================================================================
+# YAW ROTATION
+# =============================================================================
+
+def yaw_shift(turns, width, subpixel=True):
+    """Pixel shift for a yaw of `turns` full rotations, wrapped into [0, width).
+
+    Returns:
+        tuple: (whole pixels, fraction in [0, 1)); fraction is 0 unless subpixel
+    """
+    shift = (turns % 1.0) * width
+    if not subpixel:
+        return int(round(shift)) % width, 0.0
+    whole = math.floor(shift)
+    return int(whole) % width, shift - whole
+
+
+def roll_yaw(pixels, turns, subpixel=True, out=None, parallel=True):
+    """Rotate an equirectangular canvas around the vertical axis.
+
+    Content moves toward +U: out[:, x] = pixels[:, x - turns * width].
+    Works in ROW_CHUNK bands on the shared thread pool; out may be pixels itself.
+
+    Args:
+        pixels: (height, width, channels) float32 canvas
+        turns: Rotation in full turns (1.0 = 360 degrees)
+        subpixel: Interpolate fractional shifts linearly; otherwise the shift
+            is rounded to whole pixels and the result is an exact permutation
+        out: Optional destination of the same shape (default: new array)
+        parallel: Use the thread pool
+
+    Returns:
+        ndarray: The rotated canvas
+    """
+    height, width = pixels.shape[:2]
+    if out is None:
+        out = np.empty_like(pixels)
+    whole, fraction = yaw_shift(turns, width, subpixel)
+
+    if whole == 0 and fraction == 0.0:
+        if out is not pixels:
+            np.copyto(out, pixels)
+        return out
+
+    def roll(start, stop):
+        rows = slice(start, stop)
+        # Copy first so out may alias pixels
+        source = band_scratch().get('rows', pixels[rows].shape)
+        np.copyto(source, pixels[rows])
+        target = out[rows]
+
+        # out[x] = source[x - whole]
+        target[:, whole:] = source[:, :width - whole]
+        target[:, :whole] = source[:, width - whole:]
+
+        if fraction:
+            # Blend toward the pixel one further left: out[x] = lerp(s[x - w], s[x - w - 1], f)
+            np.copyto(source[:, 1:], target[:, :-1])
+            source[:, 0] = target[:, -1]
+            source -= target
+            source *= fraction
+            target += source
+
+    run_bands(roll, height, parallel=parallel)
+    return out
+
+
+# =============================================================================
+# ARBITRARY ROTATION
+# =============================================================================
+# Directions use the light layer convention: longitude 0 / latitude 0 is the
+# canvas center (+X), longitude 90 is +Y and latitude 90 the zenith (+Z).
+
+def rotation_matrix(yaw=0.0, pitch=0.0, roll=0.0):
+    """3x3 rotation from angles in degrees, applied roll, then pitch, then yaw.
+
+    yaw turns around the zenith (+longitude), pitch tilts the canvas center
+    up toward the zenith and roll turns around the canvas center.
+    """
+    yaw, pitch, roll = (math.radians(angle) for angle in (yaw, pitch, roll))
+    cy, sy = math.cos(yaw), math.sin(yaw)
+    cp, sp = math.cos(pitch), math.sin(pitch)
+    cr, sr = math.cos(roll), math.sin(roll)
+    rz = np.array([[cy, -sy, 0.0], [sy, cy, 0.0], [0.0, 0.0, 1.0]])
+    ry = np.array([[cp, 0.0, -sp], [0.0, 1.0, 0.0], [sp, 0.0, cp]])
+    rx = np.array([[1.0, 0.0, 0.0], [0.0, cr, -sr], [0.0, sr, cr]])
+    return rz @ ry @ rx
+
+
+def rotate_direction(matrix, longitude, latitude):
+    """Rotate one direction given in degrees.
+
+    Returns:
+        tuple: (longitude in [-180, 180), latitude) in degrees
+    """
+    lon, lat = math.radians(longitude), math.radians(latitude)
+    direction = np.asarray(matrix, dtype=np.float64) @ (
+        math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+    longitude = math.degrees(math.atan2(direction[1], direction[0]))
+    latitude = math.degrees(math.asin(max(-1.0, min(1.0, direction[2]))))
+    return (longitude + 180.0) % 360.0 - 180.0, latitude
+
+
+def _grid_key(width, height, matrix, dome):
+    # Rounded so matrices rebuilt from the same angles share one grid
+    return (width, height, dome, tuple(np.round(np.asarray(matrix, dtype=np.float64), 9).ravel()))
+
+
+def sampling_grid(width, height, matrix, dome=False):
+    """Source pixel coordinates for every output pixel of a rotation.
+
+    Output direction d samples the source at matrix^-1 d, so content moves
+    by matrix. Grids are cached per (resolution, layout, rotation).
+
+    Returns:
+        tuple: (columns, rows) float32 (height, width) arrays, read-only
+    """
+    key = _grid_key(width, height, matrix, dome)
+    grid = _grids.get(key)
+    if grid is not None:
+        _grids.move_to_end(key)
+        return grid
+
+    # source[axis] = sum_k matrix[k, axis] * output[k], i.e. matrix^T == matrix^-1
+    rotation = np.asarray(matrix, dtype=np.float64)
+    lon = ((np.arange(width) + 0.5) / width - 0.5) * (2 * np.pi)
+    lat = row_latitudes(height, dome=dome)
+    bottom, top = latitude_range(dome)
+    cos_lon, sin_lon = np.cos(lon).astype(np.float32), np.sin(lon).astype(np.float32)
+    cos_lat, sin_lat = np.cos(lat).astype(np.float32), np.sin(lat).astype(np.float32)
+
+    columns = np.empty((height, width), dtype=np.float32)
+    rows = np.empty((height, width), dtype=np.float32)
+
+    def build(start, stop):
+        c = cos_lat[start:stop, np.newaxis]
+        s = sin_lat[start:stop, np.newaxis]
+        # Source direction components, separable in longitude and latitude
+        x, y, z = ((c * np.float32(rotation[0, axis]) * cos_lon
+                    + c * np.float32(rotation[1, axis]) * sin_lon
+                    + s * np.float32(rotation[2, axis])) for axis in range(3))
+        np.arctan2(y, x, out=columns[start:stop])
+        columns[start:stop] *= width / (2 * np.pi)
+        columns[start:stop] += 0.5 * width - 0.5
+        np.clip(z, -1.0, 1.0, out=z)
+        np.arcsin(z, out=rows[start:stop])
+        rows[start:stop] *= height / (top - bottom)
+        rows[start:stop] += -bottom / (top - bottom) * height - 0.5
+
+    run_bands(build, height)
+    columns.setflags(write=False)
+    rows.setflags(write=False)
+    grid = (columns, rows)
+
+    _grids[key] = grid
+    while len(_grids) > GRID_CACHE_SIZE:
+        _grids.popitem(last=False)
+    return grid
+
+
+def clear_grid_cache():
+    """Release all cached sampling grids."""
+    _grids.clear()
+
+
+def reproject(pixels, matrix, out=None, parallel=True, dome=False):
+    """Rotate an equirectangular canvas by a 3x3 rotation matrix.
+
+    Bilinear sampling, wrapping horizontally and clamping at the poles
+    (at the horizon for dome canvases, see projection.py).
+    Runs in ROW_CHUNK bands on the shared thread pool.
+
+    Args:
+        pixels: (height, width, channels) float32 canvas
+        matrix: 3x3 rotation, see rotation_matrix()
+        out: Optional destination of the same shape; must not be pixels
+        parallel: Use the thread pool
+        dome: The canvas holds only the upper hemisphere
+
+    Returns:
+        ndarray: The rotated canvas
+    """
+    height, width, channels = pixels.shape
+    if out is None:
+        out = np.empty_like(pixels)
+    if out is pixels:
+        raise ValueError("reproject() cannot work in place")
+    columns, rows = sampling_grid(width, height, matrix, dome)
+    flat = pixels.reshape(-1, channels)
+
+    def sample(start, stop):
+        scratch = band_scratch()
+        shape = (stop - start, width)
+        x0 = scratch.get('x0', shape, dtype=np.int32)
+        y0 = scratch.get('y0', shape, dtype=np.int32)
+        x1 = scratch.get('x1', shape, dtype=np.int32)
+        index = scratch.get('index', shape, dtype=np.int32)
+        fx = scratch.get('fx', shape + (1,))
+        fy = scratch.get('fy', shape + (1,))
+        top = scratch.get('top', shape + (channels,))
+        bottom = scratch.get('bottom', shape + (channels,))
+        tap = scratch.get('tap', shape + (channels,))
+
+        # Integer corner and fractional weight per axis
+        for coordinate, corner, weight in ((columns, x0, fx), (rows, y0, fy)):
+            np.floor(coordinate[start:stop], out=weight[..., 0])
+            np.copyto(corner, weight[..., 0], casting='unsafe')
+            np.subtract(coordinate[start:stop], weight[..., 0], out=weight[..., 0])
+
+        # Columns wrap around the seam
+        x0 %= width
+        np.add(x0, 1, out=x1)
+        x1[x1 == width] = 0
+
+        # Rows clamp at the poles
+        y1 = scratch.get('y1', shape, dtype=np.int32)
+        np.add(y0, 1, out=y1)
+        np.clip(y0, 0, height - 1, out=y0)
+        np.clip(y1, 0, height - 1, out=y1)
+
+        for y, row_out in ((y0, top), (y1, bottom)):
+            np.multiply(y, width, out=index)
+            index += x0
+            np.take(flat, index, axis=0, out=row_out)
+            np.multiply(y, width, out=index)
+            index += x1
+            np.take(flat, index, axis=0, out=tap)
+            tap -= row_out
+            tap *= fx
+            row_out += tap
+
+        bottom -= top
+        bottom *= fy
+        np.add(top, bottom, out=out[start:stop])
+
+    run_bands(sample, height, parallel=parallel)
+    return out
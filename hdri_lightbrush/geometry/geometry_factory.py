@@ -1,115 +1,83 @@
 import bpy
-import bmesh
-import math
+import numpy as np
 from mathutils import Vector
 
+from ..engine.sphere_mesh import cube_sphere, equirect_uvs, sphere_subdivisions
 
 
-def create_half_sphere(name="Closed_Sphere", radius=10.0, location=(0, 0, 0)):
-    """Create a closed sphere with rounded bottom edge"""
-    
-    # Create mesh and object
-    mesh = bpy.data.meshes.new(name + "_mesh")
-    obj = bpy.data.objects.new(name, mesh)
-    
-    # Create bmesh instance
-    bm = bmesh.new()
-    
-    # Create UV sphere and select upper sphere
-    bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=radius)
-    
-    # NOTE: We don't create UV mapping here - sphere_project() will do it properly
-    # The bmesh UV is cylindrical, but we'll use bpy.ops.uv.sphere_project() later
-    
-    # Remove lower sphere vertices but keep some for rounded edge
-    round_radius = radius * 0.1  # 1/10th of main radius for rounding
-    verts_to_remove = [v for v in bm.verts if v.co.z < -round_radius]
-    bmesh.ops.delete(bm, geom=verts_to_remove, context='VERTS')
-    
-    # Create rounded transition between sphere and bottom
-    # Move vertices near the bottom to create rounded edge
-    for vert in bm.verts:
-        if -round_radius <= vert.co.z <= 0:
-            # Calculate distance from edge
-            distance_from_center = (vert.co.x**2 + vert.co.y**2)**0.5
-            
-            # Create rounded profile
-            if distance_from_center > radius - round_radius:
-                # Vertices on the outer edge - create rounded corner
-                angle_factor = (distance_from_center - (radius - round_radius)) / round_radius
-                angle_factor = min(angle_factor, 1.0)
-                
-                # Calculate rounded position
-                angle = angle_factor * 1.5708  # 90 degrees in radians
-                new_z = -round_radius + round_radius * (1 - math.cos(angle))
-                scale_factor = (radius - round_radius + round_radius * math.sin(angle)) / distance_from_center
-                
-                vert.co.x *= scale_factor
-                vert.co.y *= scale_factor
-                vert.co.z = new_z
-    
-    # Fill the bottom hole to create a closed sphere
-    bottom_edges = [e for e in bm.edges if e.is_boundary]
-    if bottom_edges:
-        bmesh.ops.holes_fill(bm, edges=bottom_edges)
-    
-    # Add subdivision and smoothing for better rounded edge
-    bmesh.ops.subdivide_edges(bm, edges=bm.edges, cuts=1, use_grid_fill=True)
-    
-    # DON'T flip normals - the material's Geometry Backfacing node
-    # handles showing interior vs exterior
-    
-    # Apply smooth shading
-    for face in bm.faces:
-        face.smooth = True
+# Canvas width the sphere resolution is chosen for when none is given
+DEFAULT_CANVAS_WIDTH = 2048
+
+
+def mesh_from_arrays(name, vertices, faces, uvs=None):
+    """Build a mesh datablock from NumPy arrays with foreach_set
     
-    # Update mesh
-    bm.to_mesh(mesh)
-    bm.free()
+    Args:
+        vertices: (n, 3) float32 positions
+        faces: (m, k) int32 vertex indices, k corners per face
+        uvs: Optional (m * k, 2) float32 per-corner UVs
+    """
+    corners = faces.shape[1]
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+    mesh.loops.add(faces.size)
+    mesh.loops.foreach_set("vertex_index", faces.ravel())
+    mesh.polygons.add(len(faces))
+    mesh.polygons.foreach_set("loop_start", np.arange(0, faces.size, corners, dtype=np.int32))
+    mesh.polygons.foreach_set("use_smooth", np.ones(len(faces), dtype=bool))
+    mesh.update(calc_edges=True)
+    
+    if uvs is not None:
+        uv_layer = mesh.uv_layers.new(name="UVMap")
+        uv_layer.data.foreach_set("uv", uvs.ravel())
+    
+    mesh.validate()
+    return mesh
+
+
+def sphere_mesh(radius=10.0, canvas_width=DEFAULT_CANVAS_WIDTH, dome=False):
+    """Cube-sphere mesh with equirectangular UVs, tessellated for the canvas width
     
-    # Set object location
+    Meshes are cached as datablocks per resolution and radius, so adding the
+    sphere again (or for another canvas of similar size) reuses them. A dome
+    is the upper half, UV mapped for a dome canvas.
+    """
+    subdivisions = sphere_subdivisions(canvas_width)
+    mesh_name = f"HDRI_{'Dome' if dome else 'Sphere'}_Mesh_{subdivisions}_{radius:g}"
+    mesh = bpy.data.meshes.get(mesh_name)
+    if mesh is None:
+        vertices, quads = cube_sphere(subdivisions, radius, dome)
+        mesh = mesh_from_arrays(mesh_name, vertices, quads, equirect_uvs(vertices, quads, dome))
+    return mesh
+
+
+def create_half_sphere(name="Dome", radius=10.0, location=(0, 0, 0), canvas_width=DEFAULT_CANVAS_WIDTH):
+    """Create the upper hemisphere for ground-projected domes, open at the horizon.
+    Its UVs map a dome canvas, which stores only the upper hemisphere
+    (see engine/projection.py).
+    """
+    obj = bpy.data.objects.new(name, sphere_mesh(radius, canvas_width, dome=True))
     obj.location = location
-    
     return obj
 
 
-def create_sphere(name="Sphere", radius=10.0, location=(0, 0, 0)):
+def create_sphere(name="Sphere", radius=10.0, location=(0, 0, 0), canvas_width=DEFAULT_CANVAS_WIDTH):
     """Create a full sphere for HDRI viewing.
     The material's Backfacing node determines which side is visible.
+    The mesh is fine enough that ray casts stay within about a canvas pixel
+    of the true sphere, and shared with earlier spheres of the same size.
     """
-    
-    # Create mesh and object
-    mesh = bpy.data.meshes.new(name + "_mesh")
-    obj = bpy.data.objects.new(name, mesh)
-    
-    # Create bmesh instance
-    bm = bmesh.new()
-    
-    # Create UV sphere
-    bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=radius)
-    
-    # DON'T flip normals - the material's Geometry Backfacing node
-    # handles showing interior vs exterior
-    
-    # Apply smooth shading
-    for face in bm.faces:
-        face.smooth = True
-    
-    # Update mesh
-    bm.to_mesh(mesh)
-    bm.free()
-    
-    # Set object location
+    obj = bpy.data.objects.new(name, sphere_mesh(radius, canvas_width))
     obj.location = location
-    
     return obj
 
 
 # Geometry type registry
 GEOMETRY_TYPES = {
     'HALF_SPHERE': {
-        'name': 'Half Sphere (180°)', 
-        'description': 'Half sphere for 180° HDRI',
+        'name': 'Dome',
+        'description': 'Upper hemisphere for ground-projected studio domes',
         'create_func': create_half_sphere
     },
     'SPHERE': {
@@ -120,12 +88,12 @@ GEOMETRY_TYPES = {
 }
 
 
-def create_geometry(sphere_type, name, radius=10.0, location=(0, 0, 0)):
+def create_geometry(sphere_type, name, radius=10.0, location=(0, 0, 0), canvas_width=DEFAULT_CANVAS_WIDTH):
     """Factory function to create geometry based on type"""
     
     if sphere_type in GEOMETRY_TYPES:
         create_func = GEOMETRY_TYPES[sphere_type]['create_func']
-        return create_func(name, radius, location)
+        return create_func(name, radius, location, canvas_width)
     else:
-        # Default to closed sphere
-        return create_half_sphere(name, radius, location)
\ No newline at end of file
+        # Default to the full sphere
+        return create_sphere(name, radius, location, canvas_width)
\ No newline at end of file
@@ -4,10 +4,135 @@ Functions for saving and loading HDRI canvas files
 """
 
 import bpy
+import logging
 import os
+import time
+import numpy as np
 from bpy.types import Operator
-from bpy.props import StringProperty, EnumProperty
+from bpy.props import StringProperty, EnumProperty, FloatProperty, BoolProperty, IntProperty
 from bpy_extras.io_utils import ExportHelper, ImportHelper
+from . import canvas_layers, node_graphs
+from .engine.hdr_io import READERS, open_image, stream_image
+from .engine.tonemap import display_srgb, thumbnail
+from .utils import refresh_canvas_texture
+
+
+# Formats written as tone-mapped 8-bit sRGB
+DISPLAY_FORMATS = {'PNG', 'JPEG'}
+
+TONEMAP_ITEMS = [
+    ('AGX', "AgX", "Filmic AgX-like curve, keeps saturated highlights from skewing in hue"),
+    ('ACES', "ACES", "ACES filmic fit, punchy contrast"),
+    ('REINHARD', "Reinhard", "Simple x / (1 + x) roll-off"),
+    ('CLIP', "Clip", "No tone mapping, values above 1 are clipped"),
+]
+
+log = logging.getLogger(__name__)
+
+# Seconds of decoding per timer tick, and between uploads of a streaming canvas
+STREAM_TICK = 0.05
+STREAM_UPLOAD_INTERVAL = 0.5
+
+_stream = None  # _StreamingLoad of the HDRI being loaded
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# STREAMING LOAD
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class _StreamingLoad:
+    """Decode an HDR / EXR file into the canvas from a timer, preview first"""
+    
+    def __init__(self, image, reader):
+        self.image_name = image.name
+        self.reader = reader
+        # Zeros until decoded (lazily allocated, so no extra pass)
+        self.pixels = np.zeros((reader.height, reader.width, 4), dtype=np.float32)
+        self.steps = stream_image(reader, self.pixels)
+        self.phase = None
+        self.uploaded = time.perf_counter()
+        bpy.context.window_manager.progress_begin(0, 100)
+    
+    def tick(self):
+        """Decode for about STREAM_TICK seconds; returns the next timer interval, None when done"""
+        image = bpy.data.images.get(self.image_name)
+        if image is None or tuple(image.size) != (self.reader.width, self.reader.height):
+            self.close()
+            return None
+        
+        start = time.perf_counter()
+        try:
+            for phase, fraction in self.steps:
+                # The preview counts for the first tenth of the progress
+                progress = 0.1 * fraction if phase == 'PREVIEW' else 0.1 + 0.9 * fraction
+                bpy.context.window_manager.progress_update(int(progress * 100))
+                preview_done = self.phase == 'PREVIEW' and phase == 'FULL'
+                self.phase = phase
+                
+                now = time.perf_counter()
+                if preview_done or (phase == 'FULL' and now - self.uploaded > STREAM_UPLOAD_INTERVAL):
+                    self.upload(image)
+                if now - start > STREAM_TICK:
+                    return 0.01
+        except Exception as e:
+            # A raising timer would be unregistered with the stream still open
+            # and painting blocked; keep what was uploaded and stop
+            self.close()
+            log.warning("Loading %s failed: %s", self.image_name, e)
+            return None
+        
+        self.upload(image)
+        self.close()
+        props = bpy.context.scene.hdri_studio
+        if props.paint_layers or props.light_layers:
+            canvas_layers.sync_canvas_layers(bpy.context)
+        return None
+    
+    def upload(self, image):
+        image.pixels.foreach_set(self.pixels.ravel())
+        # A sync during the load cached a canvas built from the partial pixels
+        canvas_layers.forget_image(image)
+        refresh_canvas_texture(image)
+        self.uploaded = time.perf_counter()
+    
+    def close(self):
+        global _stream
+        self.steps.close()
+        self.reader.close()
+        bpy.context.window_manager.progress_end()
+        if _stream is self:
+            _stream = None
+
+
+def _stream_tick():
+    return _stream.tick() if _stream is not None else None
+
+
+def streaming_load_error():
+    """Why the canvas can't be painted right now, None unless an HDRI is streaming in
+
+    The last upload of a streaming load replaces the whole canvas, so
+    strokes and other canvas edits made before it would be lost.
+    """
+    if _stream is not None:
+        return "The HDRI is still loading, paint when it has finished"
+    return None
+
+
+def start_streaming_load(image, reader):
+    """Fill image (already reader-sized) from reader in the background"""
+    global _stream
+    cancel_streaming_load()
+    _stream = _StreamingLoad(image, reader)
+    bpy.app.timers.register(_stream_tick)
+
+
+def cancel_streaming_load():
+    """Stop a running streaming load (the canvas keeps what was already uploaded)"""
+    if bpy.app.timers.is_registered(_stream_tick):
+        bpy.app.timers.unregister(_stream_tick)
+    if _stream is not None:
+        _stream.close()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -25,18 +150,29 @@ class HDRI_OT_load_canvas(Operator, ImportHelper):
         options={'HIDDEN'}
     )
     
+    dome: BoolProperty(
+        name="Dome",
+        description="The file holds only the upper hemisphere, from the horizon to the zenith",
+        default=False
+    )
+    
     def execute(self, context):
         try:
-            loaded_image = bpy.data.images.load(self.filepath)
-            if not loaded_image:
-                self.report({'ERROR'}, "Failed to load image file")
-                return {'CANCELLED'}
+            cancel_streaming_load()
             
-            # Remove existing canvas
-            if "HDRI_Canvas" in bpy.data.images:
-                bpy.data.images.remove(bpy.data.images["HDRI_Canvas"])
+            # HDR / EXR files the engine can read are streamed in, preview first
+            reader = None
+            if os.path.splitext(self.filepath)[1].lower() in READERS:
+                try:
+                    reader = open_image(self.filepath)
+                except (OSError, ValueError):
+                    reader = None  # Blender decodes it instead
             
-            loaded_image.name = "HDRI_Canvas"
+            # Loaded into the existing canvas image, so nodes keep pointing at it
+            if reader is not None:
+                loaded_image = canvas_layers.canvas_image_at(reader.width, reader.height, dome=self.dome)
+            else:
+                loaded_image = canvas_layers.load_canvas_image(self.filepath, self.dome)
             
             # Set float buffer for HDR handling
             if not loaded_image.is_float:
@@ -55,18 +191,28 @@ class HDRI_OT_load_canvas(Operator, ImportHelper):
             props = context.scene.hdri_studio
             props.canvas_active = True
             
+            # Composite existing layers over the new canvas (streams do it when done)
+            if reader is not None:
+                start_streaming_load(loaded_image, reader)
+            elif props.paint_layers or props.light_layers:
+                canvas_layers.sync_canvas_layers(context)
+            
             # Setup Image Editor
             self._setup_image_editor(context, loaded_image)
             
             # Setup paint settings
             self._setup_paint_settings(context, loaded_image)
             
-            # Update sphere and world
-            self._update_sphere_with_image(context, loaded_image)
-            self._update_world_with_image(context, loaded_image)
+            # Re-point the sphere and world image nodes (no graph rebuild)
+            node_graphs.point_graphs_at(context.scene, loaded_image)
+            for area in context.screen.areas:
+                area.tag_redraw()
             
             filename = os.path.basename(self.filepath)
-            self.report({'INFO'}, f"HDRI loaded: {filename}")
+            if reader is not None:
+                self.report({'INFO'}, f"Loading HDRI: {filename}")
+            else:
+                self.report({'INFO'}, f"HDRI loaded: {filename}")
             return {'FINISHED'}
             
         except Exception as e:
@@ -129,53 +275,52 @@ class HDRI_OT_load_canvas(Operator, ImportHelper):
                     brush.strength = 1.0
                     brush.blend = 'MIX'
                     settings.brush = brush
-    
-    def _update_sphere_with_image(self, context, image):
-        """Update preview sphere material with loaded image"""
-        sphere = bpy.data.objects.get("HDRI_Preview_Sphere")
-        if not sphere or not sphere.active_material:
-            return
-        
-        material = sphere.active_material
-        if not material.use_nodes:
-            return
-        
-        def update_textures(node_tree, depth=0):
-            if not node_tree or depth > 5:
-                return
-            for node in node_tree.nodes:
-                if node.type in ['TEX_ENVIRONMENT', 'TEX_IMAGE']:
-                    node.image = image
-                elif hasattr(node, 'node_tree') and node.node_tree:
-                    update_textures(node.node_tree, depth + 1)
-        
-        update_textures(material.node_tree)
-        material.update_tag()
-        
-        for area in context.screen.areas:
-            area.tag_redraw()
-    
-    def _update_world_with_image(self, context, image):
-        """Update world environment texture with loaded image"""
-        world = context.scene.world
-        if not world or not world.use_nodes:
-            return
-        
-        for node in world.node_tree.nodes:
-            if node.type == 'TEX_ENVIRONMENT':
-                node.image = image
-                world.node_tree.update_tag()
-                break
-        
-        for area in context.screen.areas:
-            if area.type == 'VIEW_3D':
-                area.tag_redraw()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SAVE OPERATORS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+def _read_canvas(canvas):
+    width, height = canvas.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    canvas.pixels.foreach_get(pixels)
+    return pixels.reshape((height, width, 4))
+
+
+def write_display_image(display, filepath, file_format):
+    """Write (h, w, 4) display values as an 8-bit PNG/JPEG
+    
+    The encoded pixels go into a temporary byte image, so Blender only
+    writes the file and does no color conversion of its own.
+    """
+    height, width = display.shape[:2]
+    image = bpy.data.images.new("HDRI_Export", width, height, alpha=False, float_buffer=False)
+    try:
+        image.colorspace_settings.name = 'sRGB'
+        image.pixels.foreach_set(display.ravel())
+        image.file_format = file_format
+        image.filepath_raw = filepath
+        image.save()
+    finally:
+        bpy.data.images.remove(image)
+
+
+def save_display_image(canvas, filepath, file_format, exposure=0.0, tonemap='AGX'):
+    """Save the canvas as an 8-bit sRGB PNG/JPEG, tone-mapped in NumPy"""
+    write_display_image(display_srgb(_read_canvas(canvas), exposure, tonemap), filepath, file_format)
+
+
+def save_thumbnail(canvas, filepath, max_size=512, exposure=0.0, tonemap='AGX'):
+    """Save a small tone-mapped JPEG preview of the canvas
+    
+    Starts from the smallest pyramid level that is still large enough
+    instead of box-filtering the full canvas.
+    """
+    _, pixels = canvas_layers.canvas_pyramid(canvas).level_for(max_size)
+    write_display_image(thumbnail(pixels, max_size, exposure, tonemap), filepath, 'JPEG')
+
+
 class HDRI_OT_save_canvas(Operator, ExportHelper):
     """Save HDRI canvas to file"""
     bl_idname = "hdri_studio.save_canvas"
@@ -209,6 +354,36 @@ class HDRI_OT_save_canvas(Operator, ExportHelper):
         default='32'
     )
     
+    exposure: FloatProperty(
+        name="Exposure",
+        description="Exposure in EV stops applied before tone mapping PNG/JPEG output",
+        default=0.0,
+        soft_min=-10.0,
+        soft_max=10.0
+    )
+    
+    tonemap: EnumProperty(
+        name="Tone Mapping",
+        description="Curve that compresses HDR values into the PNG/JPEG range",
+        items=TONEMAP_ITEMS,
+        default='AGX'
+    )
+    
+    write_thumbnail: BoolProperty(
+        name="Thumbnail",
+        description="Also save a small tone-mapped JPEG preview next to the file",
+        default=False
+    )
+    
+    thumbnail_size: IntProperty(
+        name="Thumbnail Size",
+        description="Longer side of the preview in pixels",
+        default=512,
+        min=16,
+        max=4096,
+        subtype='PIXEL'
+    )
+    
     def execute(self, context):
         try:
             if "HDRI_Canvas" not in bpy.data.images:
@@ -226,18 +401,25 @@ class HDRI_OT_save_canvas(Operator, ExportHelper):
                 'JPEG': '.jpg'
             }
             
-            canvas.file_format = self.file_format
-            if hasattr(canvas, 'use_half_precision') and self.file_format == 'OPEN_EXR':
-                canvas.use_half_precision = (self.color_depth == '16')
-            
             ext = format_ext.get(self.file_format, '.exr')
             if not self.filepath.lower().endswith(ext):
                 self.filepath = os.path.splitext(self.filepath)[0] + ext
             
-            # Save
-            canvas.filepath_raw = self.filepath
-            canvas.save()
-            canvas.file_format = original_format
+            if self.file_format in DISPLAY_FORMATS:
+                save_display_image(canvas, self.filepath, self.file_format, self.exposure, self.tonemap)
+            else:
+                canvas.file_format = self.file_format
+                if hasattr(canvas, 'use_half_precision') and self.file_format == 'OPEN_EXR':
+                    canvas.use_half_precision = (self.color_depth == '16')
+                
+                # Save
+                canvas.filepath_raw = self.filepath
+                canvas.save()
+                canvas.file_format = original_format
+            
+            if self.write_thumbnail:
+                thumb_path = os.path.splitext(self.filepath)[0] + "_thumb.jpg"
+                save_thumbnail(canvas, thumb_path, self.thumbnail_size, self.exposure, self.tonemap)
             
             self.report({'INFO'}, f"HDRI saved: {self.filepath}")
             return {'FINISHED'}
@@ -251,6 +433,15 @@ class HDRI_OT_save_canvas(Operator, ExportHelper):
         layout.prop(self, "file_format", text="Format")
         if self.file_format == 'OPEN_EXR':
             layout.prop(self, "color_depth", text="Depth")
+        elif self.file_format in DISPLAY_FORMATS:
+            layout.prop(self, "tonemap", text="Tone Mapping")
+            layout.prop(self, "exposure", text="Exposure")
+        layout.prop(self, "write_thumbnail", text="Save Thumbnail")
+        if self.write_thumbnail:
+            layout.prop(self, "thumbnail_size", text="Size")
+            if self.file_format not in DISPLAY_FORMATS:
+                layout.prop(self, "tonemap", text="Tone Mapping")
+                layout.prop(self, "exposure", text="Exposure")
 
 
 class HDRI_OT_quick_save_canvas(Operator):
@@ -299,11 +490,15 @@ class HDRI_OT_quick_save_canvas(Operator):
                 '.jpg': 'JPEG',
                 '.jpeg': 'JPEG'
             }
-            canvas.file_format = format_map.get(ext, 'OPEN_EXR')
+            file_format = format_map.get(ext, 'OPEN_EXR')
             
             # Save
-            canvas.filepath_raw = filepath
-            canvas.save()
+            if file_format in DISPLAY_FORMATS:
+                save_display_image(canvas, filepath, file_format)
+            else:
+                canvas.file_format = file_format
+                canvas.filepath_raw = filepath
+                canvas.save()
             
             try:
                 canvas.filepath = bpy.path.relpath(filepath)
@@ -331,6 +526,7 @@ def register():
 
 
 def unregister():
+    cancel_streaming_load()
     bpy.utils.unregister_class(HDRI_OT_quick_save_canvas)
     bpy.utils.unregister_class(HDRI_OT_save_canvas)
     bpy.utils.unregister_class(HDRI_OT_load_canvas)
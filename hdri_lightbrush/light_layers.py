@@ -0,0 +1,106 @@
+"""
+Light Layers Module
+Parametric light layers composited over the painted HDRI canvas
+"""
+
+import bpy
+from bpy.types import Operator, UIList
+
+from .engine.light_layers import LightLayer
+from .utils import kelvin_to_rgb
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# LIGHT LAYERS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def layer_to_engine(layer):
+    """Convert an HDRILightLayer to an engine LightLayer"""
+    if layer.use_temperature:
+        color = kelvin_to_rgb(layer.temperature)
+    else:
+        color = tuple(layer.color)
+    return LightLayer(layer.shape, layer.longitude, layer.latitude, layer.angular_size,
+                      layer.intensity, color, layer.softness)
+
+
+def scene_lights(props):
+    """Enabled light layers of the scene as {layer_id: LightLayer}"""
+    return {layer.layer_id: layer_to_engine(layer) for layer in props.light_layers if layer.enabled}
+
+
+def sync_light_layers(context):
+    """Composite changed light layers into the canvas"""
+    from . import canvas_layers
+    canvas_layers.sync_canvas_layers(context)
+
+
+def add_light_layer(context, **settings):
+    """Append a light layer with the given settings and composite it"""
+    props = context.scene.hdri_studio
+    layer = props.light_layers.add()
+    layer.layer_id = max((other.layer_id for other in props.light_layers), default=0) + 1
+    layer.name = f"Light {layer.layer_id}"
+
+    # Keep the layer hidden while filling it in so it is composited once
+    layer.enabled = False
+    for key, value in settings.items():
+        setattr(layer, key, value)
+    props.light_layer_index = len(props.light_layers) - 1
+    layer.enabled = True
+    return layer
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# OPERATORS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class HDRI_OT_light_layer_remove(Operator):
+    """Remove the active light layer"""
+    bl_idname = "hdri_studio.light_layer_remove"
+    bl_label = "Remove Light"
+    bl_description = "Remove the active light layer from the canvas"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        props = context.scene.hdri_studio
+        return 0 <= props.light_layer_index < len(props.light_layers)
+
+    def execute(self, context):
+        props = context.scene.hdri_studio
+        props.light_layers.remove(props.light_layer_index)
+        props.light_layer_index = min(props.light_layer_index, len(props.light_layers) - 1)
+        sync_light_layers(context)
+        return {'FINISHED'}
+
+
+class HDRI_UL_light_layers(UIList):
+    """Light layer list"""
+    bl_idname = "HDRI_UL_light_layers"
+
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row(align=True)
+        row.prop(item, "name", text="", emboss=False, icon='LIGHT_SUN')
+        row.prop(item, "enabled", text="", emboss=False,
+                 icon='HIDE_OFF' if item.enabled else 'HIDE_ON')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REGISTRATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+classes = [
+    HDRI_OT_light_layer_remove,
+    HDRI_UL_light_layers,
+]
+
+
+def register():
+    for cls in classes:
+        bpy.utils.register_class(cls)
+
+
+def unregister():
+    for cls in reversed(classes):
+        bpy.utils.unregister_class(cls)
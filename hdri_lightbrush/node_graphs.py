@@ -0,0 +1,370 @@
+"""
+HDRI LightBrush - Node Graphs
+Preview sphere material and world node graphs, built once and re-pointed
+
+Every node the add-on creates gets a stable name, and nodes are looked up
+by those names. Later operations change an image or a value on the
+existing nodes instead of rebuilding the graph, which would make EEVEE
+recompile its shaders. Graphs are rebuilt only when one of the
+named nodes is missing (older files, nodes deleted by the user).
+
+Dome canvases (engine/projection.py) hold only the upper hemisphere. Both
+graphs then look the canvas up through a shared node group that folds the
+direction: d' = 2 z d - (0, 0, 1) maps latitude l to 2 l - 90 degrees, so
+the equirectangular lookup spreads the horizon-to-zenith range over the
+whole image height. Below the horizon z is mirrored or clamped first, which
+fills the ground procedurally.
+"""
+
+import bpy
+
+from .canvas_layers import is_dome_canvas
+
+
+SPHERE_MATERIAL = "HDRI_Preview_Sphere_Material"
+WORLD_NAME = "HDRI_World"
+DOME_GROUP = "HDRI_Dome_Fold"
+
+# Node names by role
+SPHERE_NODES = {
+    'output': "HDRI_Output",
+    'mix': "HDRI_Backface_Mix",
+    'transparent': "HDRI_Transparent",
+    'emission': "HDRI_Emission",
+    'environment': "HDRI_Environment",
+    'flip': "HDRI_Flip_Normal",
+    'coordinates': "HDRI_Coordinates",
+    'geometry': "HDRI_Geometry",
+    'dome': "HDRI_Dome",
+}
+
+WORLD_NODES = {
+    'output': "HDRI_World_Output",
+    'background': "HDRI_Background",
+    'environment': "HDRI_Environment",
+    'mapping': "HDRI_Mapping",
+    'coordinates': "HDRI_Coordinates",
+    'dome': "HDRI_Dome",
+}
+
+DOME_NODES = {
+    'input': "HDRI_Dome_Input",
+    'output': "HDRI_Dome_Output",
+    'normalize': "HDRI_Dome_Normalize",
+    'separate': "HDRI_Dome_Separate",
+    'ground': "HDRI_Dome_Ground",
+    'combine': "HDRI_Dome_Combine",
+    'double': "HDRI_Dome_Double",
+    'scale': "HDRI_Dome_Scale",
+    'zenith': "HDRI_Dome_Zenith",
+}
+
+# Math operation of the ground node per fill mode: mirror the dome, or
+# clamp to just above the horizon (keeps the longitude) to extend its color
+GROUND_OPERATIONS = {'MIRROR': 'ABSOLUTE', 'HORIZON': 'MAXIMUM'}
+
+# Image node texture painting on the sphere paints into
+PAINT_NODE = "Paint_Canvas"
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# NODE LOOKUP
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def graph_nodes(node_tree, names):
+    """Handles of the named add-on nodes of a graph, None if any is missing
+
+    Nodes are looked up by name on every call: handles kept across calls
+    go stale when the user replaces a node or after undo and file loads.
+    """
+    if node_tree is None:
+        return None
+    nodes = {role: node_tree.nodes.get(name) for role, name in names.items()}
+    if any(node is None for node in nodes.values()):
+        return None
+    return nodes
+
+
+def _new_nodes(node_tree, names, types):
+    """Clear a node tree and add one named node per role"""
+    nodes = node_tree.nodes
+    nodes.clear()
+    created = {}
+    for role, (node_type, location) in types.items():
+        node = nodes.new(type=node_type)
+        node.name = names[role]
+        node.location = location
+        created[role] = node
+    return created
+
+
+def set_node_image(node, image):
+    """Point an image node at image, skipping no-op assignments"""
+    if node.image != image:
+        node.image = image
+        return True
+    return False
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DOME FOLD
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _build_dome_group(group):
+    if not group.interface.items_tree:
+        group.interface.new_socket(name="Vector", in_out='INPUT', socket_type='NodeSocketVector')
+        group.interface.new_socket(name="Vector", in_out='OUTPUT', socket_type='NodeSocketVector')
+    nodes = _new_nodes(group, DOME_NODES, {
+        'input': ('NodeGroupInput', (-800, 0)),
+        'output': ('NodeGroupOutput', (600, 0)),
+        'normalize': ('ShaderNodeVectorMath', (-600, 0)),
+        'separate': ('ShaderNodeSeparateXYZ', (-400, 0)),
+        'ground': ('ShaderNodeMath', (-200, -150)),
+        'combine': ('ShaderNodeCombineXYZ', (0, 0)),
+        'double': ('ShaderNodeMath', (0, -200)),
+        'scale': ('ShaderNodeVectorMath', (200, 0)),
+        'zenith': ('ShaderNodeVectorMath', (400, 0)),
+    })
+    nodes['normalize'].operation = 'NORMALIZE'
+    nodes['ground'].operation = GROUND_OPERATIONS['MIRROR']
+    nodes['ground'].inputs[1].default_value = 1e-4
+    nodes['double'].operation = 'MULTIPLY'
+    nodes['double'].inputs[1].default_value = 2.0
+    nodes['scale'].operation = 'SCALE'
+    nodes['zenith'].operation = 'SUBTRACT'
+    nodes['zenith'].inputs[1].default_value = (0.0, 0.0, 1.0)
+
+    links = group.links
+    links.new(nodes['input'].outputs[0], nodes['normalize'].inputs[0])
+    links.new(nodes['normalize'].outputs['Vector'], nodes['separate'].inputs[0])
+    links.new(nodes['separate'].outputs['X'], nodes['combine'].inputs['X'])
+    links.new(nodes['separate'].outputs['Y'], nodes['combine'].inputs['Y'])
+    links.new(nodes['separate'].outputs['Z'], nodes['ground'].inputs[0])
+    links.new(nodes['ground'].outputs['Value'], nodes['combine'].inputs['Z'])
+    links.new(nodes['ground'].outputs['Value'], nodes['double'].inputs[0])
+    links.new(nodes['combine'].outputs['Vector'], nodes['scale'].inputs[0])
+    links.new(nodes['double'].outputs['Value'], nodes['scale'].inputs[3])
+    links.new(nodes['scale'].outputs['Vector'], nodes['zenith'].inputs[0])
+    links.new(nodes['zenith'].outputs['Vector'], nodes['output'].inputs[0])
+    return graph_nodes(group, DOME_NODES)
+
+
+def dome_group():
+    """Node group folding a lookup direction for a dome canvas, built only if missing"""
+    group = bpy.data.node_groups.get(DOME_GROUP)
+    if group is None:
+        group = bpy.data.node_groups.new(DOME_GROUP, 'ShaderNodeTree')
+    if graph_nodes(group, DOME_NODES) is None:
+        _build_dome_group(group)
+    return group
+
+
+def set_dome_ground(mode):
+    """Fill below the horizon of dome canvases: 'MIRROR' or 'HORIZON'"""
+    group = bpy.data.node_groups.get(DOME_GROUP)
+    nodes = graph_nodes(group, DOME_NODES)
+    if nodes is None:
+        return
+    operation = GROUND_OPERATIONS[mode]
+    if nodes['ground'].operation != operation:
+        nodes['ground'].operation = operation
+
+
+def route_projection(node_tree, nodes, source, image):
+    """Feed the environment lookup from source, through the dome fold for a dome canvas
+
+    Links are only touched when the canvas layout changed.
+
+    Returns:
+        bool: True if the graph was relinked
+    """
+    dome = image is not None and is_dome_canvas(image)
+    fold = nodes['dome']
+    feed = fold if dome else source
+    target = nodes['environment'].inputs['Vector']
+    if target.is_linked and target.links[0].from_node == feed and not (dome and fold.node_tree is None):
+        return False
+
+    links = node_tree.links
+    if dome:
+        fold.node_tree = dome_group()
+        links.new(source.outputs['Vector'], fold.inputs[0])
+    links.new(feed.outputs[0], target)
+    return True
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SPHERE MATERIAL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _build_sphere_graph(node_tree):
+    nodes = _new_nodes(node_tree, SPHERE_NODES, {
+        'output': ('ShaderNodeOutputMaterial', (600, 0)),
+        'mix': ('ShaderNodeMixShader', (400, 0)),
+        'transparent': ('ShaderNodeBsdfTransparent', (200, 150)),
+        'emission': ('ShaderNodeEmission', (200, -50)),
+        'environment': ('ShaderNodeTexEnvironment', (0, -50)),
+        'flip': ('ShaderNodeVectorMath', (-100, -50)),
+        'coordinates': ('ShaderNodeTexCoord', (-300, -50)),
+        'geometry': ('ShaderNodeNewGeometry', (200, 300)),
+        'dome': ('ShaderNodeGroup', (-100, -250)),
+    })
+    nodes['flip'].operation = 'SCALE'
+    nodes['flip'].inputs[3].default_value = -1.0
+    nodes['environment'].projection = 'EQUIRECTANGULAR'
+    nodes['emission'].inputs['Strength'].default_value = 1.0
+
+    # Backfaces (the inside) show the canvas, the outside is transparent
+    links = node_tree.links
+    links.new(nodes['geometry'].outputs['Backfacing'], nodes['mix'].inputs['Fac'])
+    links.new(nodes['transparent'].outputs['BSDF'], nodes['mix'].inputs[1])
+    links.new(nodes['emission'].outputs['Emission'], nodes['mix'].inputs[2])
+    links.new(nodes['mix'].outputs['Shader'], nodes['output'].inputs['Surface'])
+    links.new(nodes['coordinates'].outputs['Normal'], nodes['flip'].inputs[0])
+    links.new(nodes['flip'].outputs['Vector'], nodes['environment'].inputs['Vector'])
+    links.new(nodes['environment'].outputs['Color'], nodes['emission'].inputs['Color'])
+    return graph_nodes(node_tree, SPHERE_NODES)
+
+
+def sphere_material(image=None):
+    """Transparent HDRI material for viewing from inside the sphere
+
+    Reuses the existing material and graph; only a missing or incomplete
+    graph is (re)built.
+    """
+    mat = bpy.data.materials.get(SPHERE_MATERIAL)
+    if mat is None:
+        mat = bpy.data.materials.new(name=SPHERE_MATERIAL)
+        mat.use_nodes = True
+        mat.use_backface_culling = False
+        mat.blend_method = 'HASHED'
+        # Only set shadow_method if it exists (Blender <4.3)
+        if hasattr(mat, "shadow_method"):
+            mat.shadow_method = 'NONE'
+        mat.show_transparent_back = True
+
+    nodes = graph_nodes(mat.node_tree, SPHERE_NODES)
+    if nodes is None:
+        nodes = _build_sphere_graph(mat.node_tree)
+    if image is not None:
+        set_node_image(nodes['environment'], image)
+        route_projection(mat.node_tree, nodes, nodes['flip'], image)
+    return mat
+
+
+def paint_node(mat, image):
+    """Image node texture paint writes through, created on first use"""
+    nodes = mat.node_tree.nodes
+    node = nodes.get(PAINT_NODE)
+    if node is None:
+        node = nodes.new(type='ShaderNodeTexImage')
+        node.name = PAINT_NODE
+        node.location = (300, 400)
+    set_node_image(node, image)
+    return node
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# WORLD
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _build_world_graph(node_tree):
+    nodes = _new_nodes(node_tree, WORLD_NODES, {
+        'output': ('ShaderNodeOutputWorld', (0, 300)),
+        'background': ('ShaderNodeBackground', (-200, 300)),
+        'environment': ('ShaderNodeTexEnvironment', (-400, 300)),
+        'mapping': ('ShaderNodeMapping', (-600, 300)),
+        'coordinates': ('ShaderNodeTexCoord', (-800, 300)),
+        'dome': ('ShaderNodeGroup', (-400, 100)),
+    })
+    links = node_tree.links
+    links.new(nodes['coordinates'].outputs['Generated'], nodes['mapping'].inputs['Vector'])
+    links.new(nodes['mapping'].outputs['Vector'], nodes['environment'].inputs['Vector'])
+    links.new(nodes['environment'].outputs['Color'], nodes['background'].inputs['Color'])
+    links.new(nodes['background'].outputs['Background'], nodes['output'].inputs['Surface'])
+    return graph_nodes(node_tree, WORLD_NODES)
+
+
+def world_graph(scene, image=None):
+    """World nodes showing image as the background, built only if missing
+
+    Returns:
+        dict: Node handles by role (see WORLD_NODES)
+    """
+    world = scene.world
+    if world is None:
+        world = bpy.data.worlds.new(WORLD_NAME)
+        scene.world = world
+    world.use_nodes = True
+
+    nodes = graph_nodes(world.node_tree, WORLD_NODES)
+    if nodes is None:
+        nodes = _build_world_graph(world.node_tree)
+    if image is not None:
+        set_node_image(nodes['environment'], image)
+        route_projection(world.node_tree, nodes, nodes['mapping'], image)
+    return nodes
+
+
+def world_nodes(world):
+    """Node handles of an add-on world graph, None if the world has none"""
+    if world is None or not world.use_nodes:
+        return None
+    return graph_nodes(world.node_tree, WORLD_NODES)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# IMAGE UPDATES
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _environment_node(node_tree, names):
+    """Environment texture of a graph: the named one, else the first by type"""
+    nodes = graph_nodes(node_tree, names)
+    if nodes is not None:
+        return nodes['environment']
+    return next((node for node in node_tree.nodes if node.type == 'TEX_ENVIRONMENT'), None)
+
+
+def point_graphs_at(scene, image):
+    """Show image on the preview sphere and the world without rebuilding either graph
+
+    Graphs not set up by the add-on (older files) get their first
+    environment texture re-pointed; add-on graphs also switch to or from
+    the dome fold when the canvas layout changed.
+    """
+    mat = bpy.data.materials.get(SPHERE_MATERIAL)
+    if mat is not None and mat.use_nodes:
+        changed = False
+        for node in (_environment_node(mat.node_tree, SPHERE_NODES), mat.node_tree.nodes.get(PAINT_NODE)):
+            if node is not None:
+                changed = set_node_image(node, image) or changed
+        nodes = graph_nodes(mat.node_tree, SPHERE_NODES)
+        if nodes is not None:
+            changed = route_projection(mat.node_tree, nodes, nodes['flip'], image) or changed
+        if changed:
+            mat.update_tag()
+
+    world = scene.world
+    if world is not None and world.use_nodes:
+        changed = False
+        environment = _environment_node(world.node_tree, WORLD_NODES)
+        if environment is not None:
+            changed = set_node_image(environment, image)
+        nodes = graph_nodes(world.node_tree, WORLD_NODES)
+        if nodes is not None:
+            changed = route_projection(world.node_tree, nodes, nodes['mapping'], image) or changed
+        if changed:
+            world.node_tree.update_tag()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REGISTRATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def register():
+    """Register node graphs module"""
+    pass
+
+
+def unregister():
+    """Unregister node graphs module"""
+    pass
@@ -3,10 +3,19 @@ Operators Module
 Canvas creation and management operators for HDRI LightBrush
 """
 
+import math
+
 import bpy
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty
 from bpy.types import Operator
+from mathutils import Vector
 import numpy as np
+from .engine.color import retemperature, srgb_to_linear
+from .engine.extraction import THRESHOLD_CONTRAST, find_lobes, remove_lobes
+from .engine.projection import canvas_height
 from .utils import refresh_canvas_texture
+from . import canvas_layers, hdri_save, light_layers
+from .sphere_tools import dome_mode
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -21,15 +30,18 @@ class HDRI_OT_create_canvas(Operator):
     
     def execute(self, context):
         props = context.scene.hdri_studio
+        # A new canvas replaces whatever is still streaming in
+        hdri_save.cancel_streaming_load()
         
-        # Set canvas dimensions - 2K = 2048x1024, 4K = 4096x2048
-        if props.canvas_size == '2K':
-            width, height = 2048, 1024
-        else:
-            width, height = 4096, 2048
+        # Set canvas dimensions - 2K = 2048x1024, 4K = 4096x2048 (half the height in Dome mode)
+        width = 2048 if props.canvas_size == '2K' else 4096
+        dome = dome_mode(context.scene)
+        height = canvas_height(width, dome)
         
         # Create canvas image
-        self.create_canvas_image(context, width, height)
+        self.create_canvas_image(context, width, height, dome)
+        if props.paint_layers or props.light_layers:
+            canvas_layers.sync_canvas_layers(context)
         
         # Setup viewport layout
         self.setup_viewport_layout(context)
@@ -44,25 +56,9 @@ class HDRI_OT_create_canvas(Operator):
         self.report({'INFO'}, f"Canvas created: {width}x{height}")
         return {'FINISHED'}
     
-    def create_canvas_image(self, context, width, height):
-        """Create Blender image for canvas"""
-        image_name = "HDRI_Canvas"
-        
-        # Remove existing image
-        if image_name in bpy.data.images:
-            bpy.data.images.remove(bpy.data.images[image_name])
-        
-        # Create new image
-        canvas_image = bpy.data.images.new(image_name, width, height, alpha=True, float_buffer=True)
-        
-        # Initialize with black background
-        pixels = np.zeros((height, width, 4), dtype=np.float32)
-        pixels[:, :, 3] = 1.0  # Full alpha
-        canvas_image.pixels[:] = pixels.flatten()
-        canvas_image.update()
-        
-        # Force GPU texture refresh for Blender 5.0
-        refresh_canvas_texture(canvas_image)
+    def create_canvas_image(self, context, width, height, dome=False):
+        """Create Blender image for canvas (black, full alpha; an existing canvas is reused)"""
+        canvas_layers.canvas_image_at(width, height, (0.0, 0.0, 0.0, 1.0), dome)
     
     def setup_viewport_layout(self, context):
         """Split viewport and setup Image Editor for canvas display"""
@@ -112,27 +108,27 @@ class HDRI_OT_clear_canvas(Operator):
             self.report({'ERROR'}, "No HDRI canvas found")
             return {'CANCELLED'}
         
-        canvas_image = bpy.data.images["HDRI_Canvas"]
-        width, height = canvas_image.size[0], canvas_image.size[1]
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
         
-        # Clear to black
-        pixels = np.zeros((height * width * 4), dtype=np.float32)
-        pixels[3::4] = 1.0  # Full alpha
-        canvas_image.pixels[:] = pixels
-        canvas_image.update()
+        canvas_image = bpy.data.images["HDRI_Canvas"]
         
-        # Force GPU texture refresh for Blender 5.0
-        refresh_canvas_texture(canvas_image)
+        # Clear to black (full alpha); layers stay (paint layers emptied) and
+        # lights are composited over the cleared canvas
+        canvas_layers.fill_canvas(context, canvas_image, (0.0, 0.0, 0.0, 1.0))
         
         self.report({'INFO'}, "Canvas cleared")
         return {'FINISHED'}
 
 
 class HDRI_OT_add_light(Operator):
-    """Add light shape to canvas"""
+    """Add light layer to canvas"""
     bl_idname = "hdri_studio.add_light"
     bl_label = "Add Light"
-    bl_description = "Add a light shape to the canvas"
+    bl_description = "Add a movable light layer to the canvas"
+    bl_options = {'REGISTER', 'UNDO'}
     
     def execute(self, context):
         if "HDRI_Canvas" not in bpy.data.images:
@@ -141,80 +137,274 @@ class HDRI_OT_add_light(Operator):
         
         props = context.scene.hdri_studio
         canvas_image = bpy.data.images["HDRI_Canvas"]
-        width, height = canvas_image.size[0], canvas_image.size[1]
+        width = canvas_image.size[0]
         
-        # Get current pixels
-        pixels = np.array(canvas_image.pixels[:]).reshape(height, width, 4)
+        settings = {
+            'shape': props.light_shape,
+            # Light size is in canvas pixels, layers use degrees
+            'angular_size': props.light_size / width * 360.0,
+            'intensity': props.light_intensity,
+            'use_temperature': props.use_temperature,
+            'temperature': props.color_temperature,
+        }
+        if not props.use_temperature:
+            # Use brush color from paint settings
+            settings['color'] = tuple(srgb_to_linear(props.paint_color))
+        
+        # Add light at center as a parametric layer
+        layer = light_layers.add_light_layer(context, **settings)
         
-        # Get light color
-        if props.use_temperature:
-            from .utils import kelvin_to_rgb
-            color = kelvin_to_rgb(props.color_temperature)
+        self.report({'INFO'}, f"Added {props.light_shape.lower()} light: {layer.name}")
+        return {'FINISHED'}
+
+
+class HDRI_OT_retemperature(Operator):
+    """Shift the canvas toward a color temperature"""
+    bl_idname = "hdri_studio.retemperature"
+    bl_label = "Retemperature"
+    bl_description = "Give canvas pixels the blackbody color of a temperature, keeping their brightness (active paint layer when layers are used)"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    temperature: IntProperty(
+        name="Temperature",
+        description="Target color temperature in Kelvin",
+        default=6500,
+        min=1000,
+        max=40000
+    )
+    
+    strength: FloatProperty(
+        name="Strength",
+        description="How far pixels move toward the temperature's color",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+    
+    min_luminance: FloatProperty(
+        name="Min Luminance",
+        description="Only change pixels brighter than this (0 changes every pixel)",
+        default=0.0,
+        min=0.0,
+        soft_max=10.0
+    )
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        if "HDRI_Canvas" not in bpy.data.images:
+            self.report({'ERROR'}, "No HDRI canvas found")
+            return {'CANCELLED'}
+        
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+        
+        canvas_image = bpy.data.images["HDRI_Canvas"]
+        props = context.scene.hdri_studio
+        
+        # With layers only the active layer changes; light layers keep their own temperature
+        canvas, key = canvas_layers.paint_target(canvas_image, props)
+        if canvas is not None:
+            layer = canvas.layers[key]
+            changed = 0
+            if layer.bounds is not None:
+                changed = retemperature(layer.pixels, self.temperature, self.strength,
+                                        self.min_luminance, rect=layer.bounds)
+                canvas.layer_changed(key, layer.bounds)
+                canvas_layers.sync_canvas_layers(context)
         else:
-            # Use brush color from paint settings
-            ts = context.tool_settings
-            brush = ts.image_paint.brush if ts.image_paint else None
-            color = brush.color[:3] if brush else (1.0, 1.0, 1.0)
-        
-        # Add light at center
-        center_x, center_y = width // 2, height // 2
-        size = int(props.light_size)
-        intensity = props.light_intensity
-        
-        # Create light based on shape
-        if props.light_shape == 'CIRCLE':
-            self.add_circle_light(pixels, center_x, center_y, size, color, intensity)
-        elif props.light_shape == 'SQUARE':
-            self.add_square_light(pixels, center_x, center_y, size, color, intensity)
-        else:  # RECTANGLE
-            self.add_rectangle_light(pixels, center_x, center_y, size, color, intensity)
-        
-        # Update canvas
-        canvas_image.pixels[:] = pixels.flatten()
-        canvas_image.update()
-        
-        # Force GPU texture refresh for Blender 5.0
-        refresh_canvas_texture(canvas_image)
-        
-        self.report({'INFO'}, f"Added {props.light_shape.lower()} light")
+            width, height = canvas_image.size
+            pixels = np.empty(width * height * 4, dtype=np.float32)
+            canvas_image.pixels.foreach_get(pixels)
+            changed = retemperature(pixels.reshape((height, width, 4)), self.temperature,
+                                    self.strength, self.min_luminance)
+            canvas_image.pixels.foreach_set(pixels)
+            canvas_image.update()
+            canvas_layers.canvas_changed()
+            refresh_canvas_texture(canvas_image)
+        
+        self.report({'INFO'}, f"Retemperatured {changed} pixels to {self.temperature}K")
         return {'FINISHED'}
+
+
+# Collection holding the lights created by HDRI_OT_extract_lights
+KEY_LIGHT_COLLECTION = "HDRI_Key_Lights"
+
+
+def world_direction(longitude, latitude, rotation=0.0):
+    """World-space unit vector toward a canvas direction (degrees)
+    
+    Matches Blender's equirectangular lookup (u = 0.5 - atan2(y, x) / 2pi)
+    and the world mapping's Z rotation in radians.
+    """
+    azimuth = -math.radians(longitude) - rotation
+    elevation = math.radians(latitude)
+    return Vector((math.cos(elevation) * math.cos(azimuth),
+                   math.cos(elevation) * math.sin(azimuth),
+                   math.sin(elevation)))
+
+
+class HDRI_OT_extract_lights(Operator):
+    """Turn the brightest lobes of the canvas into Blender lights"""
+    bl_idname = "hdri_studio.extract_lights"
+    bl_label = "Extract Key Lights"
+    bl_description = "Find suns and key lights in the canvas, create matching Blender lights and optionally remove their energy from the map"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    light_type: EnumProperty(
+        name="Light Type",
+        items=[
+            ('SUN', "Sun", "Infinitely distant sun lights with matching angular size"),
+            ('AREA', "Area", "Disk area lights placed around the scene origin"),
+        ],
+        default='SUN'
+    )
+    
+    max_lights: IntProperty(
+        name="Max Lights",
+        description="Create at most this many lights, strongest first",
+        default=1,
+        min=1,
+        max=8
+    )
+    
+    contrast: FloatProperty(
+        name="Contrast",
+        description="Pixels brighter than this multiple of the average luminance count as light",
+        default=THRESHOLD_CONTRAST,
+        min=1.0,
+        soft_max=100.0
+    )
+    
+    min_fraction: FloatProperty(
+        name="Min Energy",
+        description="Ignore lobes with less than this share of the canvas' total energy",
+        default=0.02,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR'
+    )
+    
+    remove_energy: BoolProperty(
+        name="Remove from Map",
+        description="Clamp the extracted lobes in the canvas so their energy is not counted twice",
+        default=True
+    )
+    
+    distance: FloatProperty(
+        name="Distance",
+        description="Distance of area lights from the scene origin",
+        default=10.0,
+        min=0.01,
+        subtype='DISTANCE'
+    )
+    
+    analysis_size: IntProperty(
+        name="Analysis Size",
+        description="Width of the downsampled canvas that is searched for lobes",
+        default=512,
+        min=64,
+        max=4096
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return "HDRI_Canvas" in bpy.data.images
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+        
+        props = context.scene.hdri_studio
+        canvas_image = bpy.data.images["HDRI_Canvas"]
+        
+        _, pixels = canvas_layers.canvas_pyramid(canvas_image).level_for(self.analysis_size)
+        lobes, labels, threshold = find_lobes(pixels, contrast=self.contrast,
+                                              max_lobes=self.max_lights, min_fraction=self.min_fraction,
+                                              dome=canvas_layers.is_dome_canvas(canvas_image))
+        if not lobes:
+            self.report({'WARNING'}, "No light lobes above the threshold")
+            return {'CANCELLED'}
+        
+        energies = [lobe.energy for lobe in lobes]
+        if self.remove_energy:
+            if props.paint_layers or props.light_layers:
+                self.report({'WARNING'}, "Flatten layers to remove light energy from the canvas")
+            else:
+                energies = self.remove_from_canvas(context, canvas_image, lobes, labels, threshold)
+        
+        self.create_lights(context, lobes, energies)
+        self.report({'INFO'}, f"Extracted {len(lobes)} light(s), "
+                              f"{sum(lobe.fraction for lobe in lobes) * 100:.0f}% of the map energy")
+        return {'FINISHED'}
+    
+    def remove_from_canvas(self, context, canvas_image, lobes, labels, threshold):
+        """Clamp the lobes in the full-resolution canvas, returning the removed energy"""
+        width, height = canvas_image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        canvas_image.pixels.foreach_get(pixels)
+        pixels = pixels.reshape((height, width, 4))
+        energies = remove_lobes(pixels, lobes, labels, threshold,
+                                dome=canvas_layers.is_dome_canvas(canvas_image))
+        
+        if canvas_layers.paint_target(canvas_image, context.scene.hdri_studio)[0] is not None:
+            canvas_layers.set_canvas_base(context, canvas_image, pixels)
+        else:
+            canvas_image.pixels.foreach_set(pixels.ravel())
+            canvas_image.update()
+            canvas_layers.canvas_changed()
+            refresh_canvas_texture(canvas_image)
+        return energies
     
-    def add_circle_light(self, pixels, cx, cy, size, color, intensity):
-        """Add circular light"""
-        height, width = pixels.shape[:2]
-        radius = size // 2
-        
-        for y in range(max(0, cy - radius), min(height, cy + radius)):
-            for x in range(max(0, cx - radius), min(width, cx + radius)):
-                dist = np.sqrt((x - cx)**2 + (y - cy)**2)
-                if dist < radius:
-                    falloff = 1.0 - (dist / radius)
-                    pixels[y, x, 0] = min(1.0, pixels[y, x, 0] + color[0] * intensity * falloff)
-                    pixels[y, x, 1] = min(1.0, pixels[y, x, 1] + color[1] * intensity * falloff)
-                    pixels[y, x, 2] = min(1.0, pixels[y, x, 2] + color[2] * intensity * falloff)
-    
-    def add_square_light(self, pixels, cx, cy, size, color, intensity):
-        """Add square light"""
-        height, width = pixels.shape[:2]
-        half = size // 2
-        
-        for y in range(max(0, cy - half), min(height, cy + half)):
-            for x in range(max(0, cx - half), min(width, cx + half)):
-                pixels[y, x, 0] = min(1.0, pixels[y, x, 0] + color[0] * intensity)
-                pixels[y, x, 1] = min(1.0, pixels[y, x, 1] + color[1] * intensity)
-                pixels[y, x, 2] = min(1.0, pixels[y, x, 2] + color[2] * intensity)
-    
-    def add_rectangle_light(self, pixels, cx, cy, size, color, intensity):
-        """Add rectangular light (2:1 aspect)"""
-        height, width = pixels.shape[:2]
-        half_w = size // 2
-        half_h = size // 4
-        
-        for y in range(max(0, cy - half_h), min(height, cy + half_h)):
-            for x in range(max(0, cx - half_w), min(width, cx + half_w)):
-                pixels[y, x, 0] = min(1.0, pixels[y, x, 0] + color[0] * intensity)
-                pixels[y, x, 1] = min(1.0, pixels[y, x, 1] + color[1] * intensity)
-                pixels[y, x, 2] = min(1.0, pixels[y, x, 2] + color[2] * intensity)
+    def create_lights(self, context, lobes, energies):
+        """Replace previously extracted lights with one light per lobe"""
+        collection = bpy.data.collections.get(KEY_LIGHT_COLLECTION)
+        if collection is None:
+            collection = bpy.data.collections.new(KEY_LIGHT_COLLECTION)
+            context.scene.collection.children.link(collection)
+        for obj in list(collection.objects):
+            light_data = obj.data
+            bpy.data.objects.remove(obj)
+            if light_data is not None and light_data.users == 0:
+                bpy.data.lights.remove(light_data)
+        
+        world_props = getattr(context.scene, 'hdri_studio_world', None)
+        rotation = world_props.background_rotation if world_props else 0.0
+        strength = world_props.background_strength if world_props else 1.0
+        
+        for index, (lobe, energy) in enumerate(zip(lobes, energies)):
+            # Irradiance at the origin; the color carries the ratio between channels
+            irradiance = max(energy) * strength
+            color = tuple(value / max(max(energy), 1e-12) for value in energy)
+            direction = world_direction(lobe.longitude, lobe.latitude, rotation)
+            half_angle = math.radians(lobe.angular_size) / 2.0
+            
+            name = f"HDRI_Key_{index + 1}"
+            light_data = bpy.data.lights.new(name, type=self.light_type)
+            light_data.color = color
+            if self.light_type == 'SUN':
+                light_data.energy = irradiance
+                light_data.angle = 2.0 * half_angle
+            else:
+                # A disk seen under the lobe's angle; power giving the same irradiance
+                light_data.shape = 'DISK'
+                light_data.size = 2.0 * self.distance * math.tan(half_angle)
+                light_data.energy = math.pi * self.distance ** 2 * irradiance
+            
+            obj = bpy.data.objects.new(name, light_data)
+            obj.location = direction * self.distance
+            # Lights shine along their local -Z, i.e. from the lobe toward the origin
+            obj.rotation_euler = direction.to_track_quat('Z', 'Y').to_euler()
+            collection.objects.link(obj)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -225,6 +415,8 @@ classes = [
     HDRI_OT_create_canvas,
     HDRI_OT_clear_canvas,
     HDRI_OT_add_light,
+    HDRI_OT_retemperature,
+    HDRI_OT_extract_lights,
 ]
 
 
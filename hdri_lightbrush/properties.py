@@ -6,11 +6,170 @@ Scene and tool properties for HDRI LightBrush
 import bpy
 from bpy.props import (
     EnumProperty, FloatProperty, IntProperty, 
-    BoolProperty, FloatVectorProperty, StringProperty, PointerProperty
+    BoolProperty, FloatVectorProperty, StringProperty, PointerProperty,
+    CollectionProperty
 )
 from bpy.types import PropertyGroup
 
 
+def update_record_strokes(self, context):
+    """Start or stop stroke recording when toggled during a paint session"""
+    from . import continuous_paint_handler
+    continuous_paint_handler.update_stroke_recording(self)
+
+
+def update_show_profiler(self, context):
+    """Enable the paint stage profiler together with its overlay"""
+    from .engine.profiler import PROFILER
+    PROFILER.enabled = self.show_profiler
+    PROFILER.reset()
+
+
+def update_canvas_layer(self, context):
+    """Recomposite the canvas when a paint or light layer changes"""
+    from . import canvas_layers
+    canvas_layers.sync_canvas_layers(context)
+
+
+class HDRIPaintLayer(PropertyGroup):
+    """Painted canvas layer, pixels are held by canvas_layers.py"""
+    
+    # Stable key of the layer (0 = base), names can be edited
+    layer_id: IntProperty(default=0)
+    
+    visible: BoolProperty(
+        name="Visible",
+        description="Show this layer on the canvas",
+        default=True,
+        update=update_canvas_layer
+    )
+    
+    opacity: FloatProperty(
+        name="Opacity",
+        description="Layer opacity",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR',
+        update=update_canvas_layer
+    )
+    
+    blend_mode: EnumProperty(
+        name="Blend Mode",
+        description="How the layer blends with the layers below",
+        items=[
+            ('MIX', "Normal", "Layer covers the layers below"),
+            ('ADD', "Add", "Adds the layer (brightens)"),
+            ('MULTIPLY', "Multiply", "Multiplies with the layers below (darkens)"),
+            ('SCREEN', "Screen", "Brightens, softer than Add"),
+            ('OVERLAY', "Overlay", "Multiplies darks and screens lights"),
+            ('LIGHTEN', "Lighten", "Keeps the brighter color"),
+            ('DARKEN', "Darken", "Keeps the darker color"),
+        ],
+        default='MIX',
+        update=update_canvas_layer
+    )
+
+
+class HDRILightLayer(PropertyGroup):
+    """Parametric light composited over the painted canvas (see light_layers.py)"""
+    
+    # Stable key of the layer, names can be edited
+    layer_id: IntProperty(default=0)
+    
+    enabled: BoolProperty(
+        name="Enabled",
+        description="Show this light on the canvas",
+        default=True,
+        update=update_canvas_layer
+    )
+    
+    shape: EnumProperty(
+        name="Shape",
+        description="Shape of the light",
+        items=[
+            ('CIRCLE', "Circle", "Circular light"),
+            ('SQUARE', "Square", "Square light"),
+            ('RECTANGLE', "Rectangle", "Rectangular light (2:1)"),
+        ],
+        default='CIRCLE',
+        update=update_canvas_layer
+    )
+    
+    longitude: FloatProperty(
+        name="Longitude",
+        description="Horizontal direction of the light (0 = canvas center)",
+        default=0.0,
+        min=-180.0,
+        max=180.0,
+        update=update_canvas_layer
+    )
+    
+    latitude: FloatProperty(
+        name="Latitude",
+        description="Elevation of the light above the horizon",
+        default=0.0,
+        min=-90.0,
+        max=90.0,
+        update=update_canvas_layer
+    )
+    
+    angular_size: FloatProperty(
+        name="Angular Size",
+        description="Angular width of the light in degrees",
+        default=15.0,
+        min=0.1,
+        max=170.0,
+        update=update_canvas_layer
+    )
+    
+    intensity: FloatProperty(
+        name="Intensity",
+        description="Light intensity (linear, unclamped)",
+        default=1.0,
+        min=0.0,
+        soft_max=100.0,
+        update=update_canvas_layer
+    )
+    
+    use_temperature: BoolProperty(
+        name="Use Temperature",
+        description="Use color temperature instead of RGB",
+        default=False,
+        update=update_canvas_layer
+    )
+    
+    temperature: IntProperty(
+        name="Temperature",
+        description="Color temperature in Kelvin",
+        default=6500,
+        min=1000,
+        max=40000,
+        update=update_canvas_layer
+    )
+    
+    color: FloatVectorProperty(
+        name="Color",
+        description="Light color",
+        subtype='COLOR',
+        size=3,
+        min=0.0,
+        max=1.0,
+        default=(1.0, 1.0, 1.0),
+        update=update_canvas_layer
+    )
+    
+    softness: FloatProperty(
+        name="Softness",
+        description="Fraction of the light used for the soft edge falloff",
+        default=0.5,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR',
+        update=update_canvas_layer
+    )
+
+
 class HDRIStudioProperties(PropertyGroup):
     """Main property group for HDRI LightBrush settings"""
     
@@ -96,6 +255,28 @@ class HDRIStudioProperties(PropertyGroup):
         default='FAST'
     )
     
+    show_profiler: BoolProperty(
+        name="Show Profiler",
+        description="Time each paint stage and show rolling p50/p95 in the viewport",
+        default=False,
+        update=update_show_profiler
+    )
+    
+    # Stroke recording for offline profiling (see engine/recording.py)
+    record_strokes: BoolProperty(
+        name="Record Strokes",
+        description="Record every 3D paint stroke sample to a file for deterministic replay",
+        default=False,
+        update=update_record_strokes
+    )
+    
+    stroke_recording_path: StringProperty(
+        name="Recording File",
+        description="File that receives recorded strokes",
+        subtype='FILE_PATH',
+        default="//hdri_strokes.hlbr"
+    )
+    
     light_intensity: FloatProperty(
         name="Light Intensity",
         description="Intensity of the light source", 
@@ -104,6 +285,23 @@ class HDRIStudioProperties(PropertyGroup):
         max=10.0
     )
     
+    # Painted layers, bottom to top (first entry is the base)
+    paint_layers: CollectionProperty(type=HDRIPaintLayer)
+    
+    paint_layer_index: IntProperty(
+        name="Active Layer",
+        description="Layer that receives paint strokes",
+        default=0
+    )
+    
+    # Parametric light layers composited over the painted canvas
+    light_layers: CollectionProperty(type=HDRILightLayer)
+    
+    light_layer_index: IntProperty(
+        name="Active Light",
+        default=0
+    )
+    
     # ═══════════════════════════════════════════════════════
     # 3D PAINT BRUSH SETTINGS (Blender 5.0 compatibility)
     # ═══════════════════════════════════════════════════════
@@ -144,6 +342,12 @@ class HDRIStudioProperties(PropertyGroup):
         subtype='FACTOR'
     )
     
+    paint_subpixel: BoolProperty(
+        name="Sub-pixel Dabs",
+        description="Place dabs at quarter-pixel precision with anti-aliased edges for smooth small-brush strokes",
+        default=True
+    )
+    
     paint_blend: EnumProperty(
         name="Blend Mode",
         description="How the brush blends with existing colors",
@@ -153,11 +357,71 @@ class HDRIStudioProperties(PropertyGroup):
             ('MULTIPLY', "Multiply", "Multiplies colors (darkens)"),
             ('LIGHTEN', "Lighten", "Only lightens pixels"),
             ('DARKEN', "Darken", "Only darkens pixels"),
+            ('SCREEN', "Screen", "Brightens, softer than Add"),
+            ('OVERLAY', "Overlay", "Multiplies darks and screens lights (adds contrast)"),
             ('ERASE', "Erase", "Erases to black"),
+            ('EXPOSURE', "Exposure", "Pushes or pulls pixels by a number of EV stops, keeping their color"),
+            ('LUMINANCE', "Set Luminance", "Scales pixels toward a target luminance, keeping their color"),
         ],
         default='MIX'
     )
     
+    paint_exposure: FloatProperty(
+        name="Exposure",
+        description="Stops the Exposure brush adds (positive) or removes (negative) at full strength",
+        default=1.0,
+        min=-20.0,
+        max=20.0,
+        soft_min=-8.0,
+        soft_max=8.0
+    )
+    
+    paint_luminance: FloatProperty(
+        name="Target Luminance",
+        description="Linear luminance the Set Luminance brush reaches at full strength (1.0 = diffuse white)",
+        default=1.0,
+        min=0.0,
+        max=1000000.0,
+        soft_max=50000.0,
+        precision=3
+    )
+
+    paint_temperature_mode: EnumProperty(
+        name="Temperature",
+        description="Paint blackbody colors instead of the brush color",
+        items=[
+            ('OFF', "Off", "Paint with the brush color"),
+            ('STROKE', "Along Stroke", "Shift from the start to the end temperature along the stroke, then back"),
+            ('DAB', "Across Dab", "Start temperature at the dab center, end temperature at its rim"),
+        ],
+        default='OFF'
+    )
+
+    paint_temperature_start: IntProperty(
+        name="Start",
+        description="Temperature at the stroke start or dab center, in Kelvin",
+        default=2700,
+        min=1000,
+        max=40000
+    )
+
+    paint_temperature_end: IntProperty(
+        name="End",
+        description="Temperature at the stroke end or dab rim, in Kelvin",
+        default=9000,
+        min=1000,
+        max=40000
+    )
+
+    paint_temperature_length: IntProperty(
+        name="Length",
+        description="Stroke length in pixels from the start to the end temperature",
+        default=1000,
+        min=1,
+        max=100000,
+        subtype='PIXEL'
+    )
+
     # Canvas display properties
     canvas_zoom: FloatProperty(
         name="Zoom",
@@ -181,8 +445,12 @@ class HDRIStudioProperties(PropertyGroup):
 
 def register():
     """Register property classes"""
+    bpy.utils.register_class(HDRIPaintLayer)
+    bpy.utils.register_class(HDRILightLayer)
     bpy.utils.register_class(HDRIStudioProperties)
 
 def unregister():
     """Unregister property classes"""
-    bpy.utils.unregister_class(HDRIStudioProperties)
\ No newline at end of file
+    bpy.utils.unregister_class(HDRIStudioProperties)
+    bpy.utils.unregister_class(HDRILightLayer)
+    bpy.utils.unregister_class(HDRIPaintLayer)
\ No newline at end of file
@@ -5,6 +5,9 @@ Use Blender's built-in texture painting system
 
 import bpy
 from bpy.types import Operator
+from . import canvas_layers, hdri_save
+from .engine.projection import canvas_height
+from .sphere_tools import dome_mode
 
 class HDRI_OT_create_canvas_and_paint(Operator):
     """Create canvas and setup painting in Image Editor with brush active"""
@@ -16,6 +19,8 @@ class HDRI_OT_create_canvas_and_paint(Operator):
         try:
             # Get canvas properties
             props = context.scene.hdri_studio
+            # A new canvas replaces whatever is still streaming in
+            hdri_save.cancel_streaming_load()
             
             # Create HDRI image
             canvas_size = props.canvas_size
@@ -25,18 +30,10 @@ class HDRI_OT_create_canvas_and_paint(Operator):
             }
             size = size_map.get(canvas_size, 2048)
             
-            # Remove existing canvas if any
-            if "HDRI_Canvas" in bpy.data.images:
-                bpy.data.images.remove(bpy.data.images["HDRI_Canvas"])
-            
-            # Create new canvas image
-            canvas_image = bpy.data.images.new(
-                name="HDRI_Canvas",
-                width=size,
-                height=size//2,  # HDRI aspect ratio 2:1
-                alpha=False,
-                float_buffer=True
-            )
+            # Create the canvas image (an existing one is regenerated in place)
+            # HDRI aspect ratio 2:1, 4:1 for a dome
+            dome = dome_mode(context.scene)
+            canvas_image = canvas_layers.canvas_image_at(size, canvas_height(size, dome), dome=dome)
             
             # Set colorspace for HDRI work
             try:
@@ -50,6 +47,10 @@ class HDRI_OT_create_canvas_and_paint(Operator):
             # Mark canvas as active
             props.canvas_active = True
             
+            # Composite existing layers over the new canvas
+            if props.paint_layers or props.light_layers:
+                canvas_layers.sync_canvas_layers(context)
+            
             # Split 3D Viewport and create Image Editor
             viewport_area = None
             for area in context.screen.areas:
@@ -119,70 +120,43 @@ class HDRI_OT_paint_brush_stroke(Operator):
     bl_description = "Paint a single stroke on canvas"
     
     def execute(self, context):
-        try:
-            if "HDRI_Canvas" not in bpy.data.images:
-                return {'CANCELLED'}
-                
-            canvas_image = bpy.data.images["HDRI_Canvas"]
-            props = context.scene.hdri_studio
-            
-            # Get mouse position (this would be called from modal)
-            # For now, paint at center as example
-            width, height = canvas_image.size
-            center_x = width // 2
-            center_y = height // 2
-            
-            # Get color
-            if props.use_temperature:
-                from .utils import kelvin_to_rgb
-                color = kelvin_to_rgb(props.color_temperature)
-            else:
-                color = props.brush_color[:3]
-            
-            # Paint at center
-            self.paint_at_pixel(canvas_image, center_x, center_y, props.brush_radius, color, props.brush_intensity)
-            
-            # Update world
-            from .operators import update_world_hdri
-            update_world_hdri(context)
-            
-            return {'FINISHED'}
-            
-        except Exception as e:
+        from .continuous_paint_handler import scene_brush
+        from .node_graphs import world_graph
+        from .utils import kelvin_to_rgb, refresh_canvas_texture
+        
+        canvas_image = bpy.data.images.get("HDRI_Canvas")
+        if canvas_image is None:
             return {'CANCELLED'}
-    
-    def paint_at_pixel(self, image, x, y, brush_size, color, intensity):
-        """Paint at specific pixel coordinates"""
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+        props = context.scene.hdri_studio
+        
+        # Size, strength and color come from the paint settings (paint_size,
+        # paint_strength, paint_color) like interactive strokes; a color
+        # temperature replaces the color
+        brush = scene_brush(props)
+        if props.use_temperature:
+            brush = brush._replace(color=kelvin_to_rgb(props.color_temperature))
+        
+        # Paint one dab at the canvas center through the paint engine
+        canvas = canvas_layers.paint_canvas(canvas_image, props)
         try:
-            width, height = image.size
-            pixels = list(image.pixels)
-            
-            radius = brush_size // 2
-            
-            for dy in range(-radius, radius + 1):
-                for dx in range(-radius, radius + 1):
-                    px = x + dx
-                    py = y + dy
-                    
-                    if 0 <= px < width and 0 <= py < height:
-                        distance = (dx*dx + dy*dy) ** 0.5
-                        if distance <= radius:
-                            falloff = max(0, 1.0 - (distance / radius)) if radius > 0 else 1.0
-                            # Square the falloff for softer blend (matches 3D painting)
-                            falloff_squared = falloff * falloff
-                            alpha = intensity * falloff_squared
-                            
-                            idx = (py * width + px) * 4
-                            if idx + 3 < len(pixels):
-                                pixels[idx] = (1 - alpha) * pixels[idx] + alpha * color[0]
-                                pixels[idx + 1] = (1 - alpha) * pixels[idx + 1] + alpha * color[1]  
-                                pixels[idx + 2] = (1 - alpha) * pixels[idx + 2] + alpha * color[2]
-            
-            image.pixels[:] = pixels
-            image.update()
-            
-        except Exception as e:
-            pass
+            stroke = canvas.begin_stroke(brush)
+        except ValueError as e:
+            self.report({'WARNING'}, str(e))
+            return {'CANCELLED'}
+        rects = stroke.add_sample((0.5, 0.5))
+        stroke.end()
+        
+        for rect in rects:
+            canvas_layers.canvas_changed(rect, canvas.result)
+        canvas_image.pixels.foreach_set(canvas.result.ravel())
+        refresh_canvas_texture(canvas_image)
+        # Make sure the world shows the painted canvas
+        world_graph(context.scene, canvas_image)
+        return {'FINISHED'}
 
 def register():
     bpy.utils.register_class(HDRI_OT_create_canvas_and_paint)
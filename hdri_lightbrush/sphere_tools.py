@@ -7,7 +7,8 @@ import bpy
 import math
 from bpy.props import FloatProperty, EnumProperty, StringProperty
 from bpy.types import PropertyGroup
-from .geometry.geometry_factory import GEOMETRY_TYPES, create_geometry
+from . import canvas_layers, node_graphs
+from .geometry.geometry_factory import DEFAULT_CANVAS_WIDTH, GEOMETRY_TYPES, create_geometry
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -42,6 +43,8 @@ class SphereProperties(PropertyGroup):
         name="Geometry Type",
         items=[
             ('SPHERE', 'Full Sphere', 'Complete sphere for 360° HDRI'),
+            ('HALF_SPHERE', 'Dome', 'Upper hemisphere only, for ground-projected studio domes '
+             '(new canvases are 4:1 and take half the memory)'),
         ],
         default='SPHERE'
     )
@@ -63,9 +66,21 @@ def create_sphere_handler():
     return handler
 
 
-def load_dome_as_sphere(name="HDRI_Sphere", sphere_type='SPHERE'):
-    """Create sphere using geometry factory"""
-    obj = create_geometry(sphere_type, name, radius=5.0, location=(0, 0, 0))
+def dome_mode(scene):
+    """Whether new canvases store only the upper hemisphere (Dome mode)"""
+    return scene.sphere_props.sphere_type == 'HALF_SPHERE'
+
+
+def load_dome_as_sphere(name="HDRI_Sphere", sphere_type='SPHERE', canvas_image=None):
+    """Create sphere using geometry factory, tessellated for the canvas resolution
+
+    The geometry follows the canvas layout when there is one: a dome canvas
+    gets the dome, a full canvas the full sphere.
+    """
+    if canvas_image is not None and canvas_image.size[1]:
+        sphere_type = 'HALF_SPHERE' if canvas_layers.is_dome_canvas(canvas_image) else 'SPHERE'
+    canvas_width = canvas_image.size[0] if canvas_image and canvas_image.size[0] else DEFAULT_CANVAS_WIDTH
+    obj = create_geometry(sphere_type, name, radius=5.0, location=(0, 0, 0), canvas_width=canvas_width)
     if obj:
         bpy.context.collection.objects.link(obj)
     return obj
@@ -75,59 +90,18 @@ def load_dome_as_sphere(name="HDRI_Sphere", sphere_type='SPHERE'):
 # MATERIAL SETUP
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def create_painting_sphere_material(obj, canvas_image=None):
-    """Create transparent HDRI material for viewing from inside sphere"""
-    mat = bpy.data.materials.new(name=f"{obj.name}_Material")
-    mat.use_nodes = True
-    mat.use_backface_culling = False
-    mat.blend_method = 'HASHED'
-    # Only set shadow_method if it exists (Blender <4.3)
-    if hasattr(mat, "shadow_method"):
-        mat.shadow_method = 'NONE'
-    mat.show_transparent_back = True
-    obj.data.materials.append(mat)
-    
-    nodes = mat.node_tree.nodes
-    nodes.clear()
-    links = mat.node_tree.links
-    
-    # Create nodes
-    output = nodes.new(type='ShaderNodeOutputMaterial')
-    mix_shader = nodes.new(type='ShaderNodeMixShader')
-    transparent = nodes.new(type='ShaderNodeBsdfTransparent')
-    emission = nodes.new(type='ShaderNodeEmission')
-    env_texture = nodes.new(type='ShaderNodeTexEnvironment')
-    tex_coord = nodes.new(type='ShaderNodeTexCoord')
-    geometry = nodes.new(type='ShaderNodeNewGeometry')
-    vec_math = nodes.new(type='ShaderNodeVectorMath')
-    vec_math.operation = 'SCALE'
-    vec_math.inputs[3].default_value = -1.0
-    
-    # Position nodes
-    output.location = (600, 0)
-    mix_shader.location = (400, 0)
-    transparent.location = (200, 150)
-    emission.location = (200, -50)
-    env_texture.location = (0, -50)
-    vec_math.location = (-100, -50)
-    tex_coord.location = (-300, -50)
-    geometry.location = (200, 300)
-    
-    # Connect nodes
-    links.new(geometry.outputs['Backfacing'], mix_shader.inputs['Fac'])
-    links.new(transparent.outputs['BSDF'], mix_shader.inputs[1])
-    links.new(emission.outputs['Emission'], mix_shader.inputs[2])
-    links.new(mix_shader.outputs['Shader'], output.inputs['Surface'])
-    links.new(tex_coord.outputs['Normal'], vec_math.inputs[0])
-    links.new(vec_math.outputs['Vector'], env_texture.inputs['Vector'])
-    links.new(env_texture.outputs['Color'], emission.inputs['Color'])
-    
-    # Configure
-    env_texture.projection = 'EQUIRECTANGULAR'
-    emission.inputs['Strength'].default_value = 1.0
+def setup_sphere_material(obj, canvas_image=None):
+    """Setup transparent HDRI material for sphere
+
+    The material and its node graph are shared and reused; adding the
+    sphere again only re-points the environment texture.
+    """
+    mat = node_graphs.sphere_material(canvas_image)
+    if list(obj.data.materials) != [mat]:
+        obj.data.materials.clear()
+        obj.data.materials.append(mat)
     
     if canvas_image:
-        env_texture.image = canvas_image
         # Force GPU texture refresh for Blender 5.0
         try:
             canvas_image.gl_free()
@@ -135,19 +109,10 @@ def create_painting_sphere_material(obj, canvas_image=None):
         except Exception:
             pass
     
-    return mat
-
-
-def setup_sphere_material(obj, canvas_image=None):
-    """Setup transparent HDRI material for sphere"""
-    obj.data.materials.clear()
-    mat = create_painting_sphere_material(obj, canvas_image)
-    
     # Force material and node tree update for Blender 5.0
-    if mat:
-        mat.update_tag()
-        if mat.use_nodes and mat.node_tree:
-            mat.node_tree.update_tag()
+    mat.update_tag()
+    if mat.use_nodes and mat.node_tree:
+        mat.node_tree.update_tag()
     
     return mat
 
@@ -200,19 +165,7 @@ def setup_sphere_for_painting(obj, canvas_image):
     if canvas_image and obj.data.materials:
         for mat in obj.data.materials:
             if mat.use_nodes:
-                paintable_node = None
-                for node in mat.node_tree.nodes:
-                    if node.type == 'TEX_IMAGE' and node.image == canvas_image:
-                        paintable_node = node
-                        break
-                
-                if not paintable_node:
-                    paintable_node = mat.node_tree.nodes.new(type='ShaderNodeTexImage')
-                    paintable_node.name = "Paint_Canvas"
-                    paintable_node.image = canvas_image
-                    paintable_node.location = (300, 400)
-                
-                mat.node_tree.nodes.active = paintable_node
+                mat.node_tree.nodes.active = node_graphs.paint_node(mat, canvas_image)
                 break
     
     # Enter texture paint mode
@@ -278,7 +231,7 @@ class HDRI_OT_sphere_add(bpy.types.Operator):
         
         # Create sphere
         handler_obj = create_sphere_handler()
-        sphere_obj = load_dome_as_sphere("HDRI_Preview_Sphere", sphere_props.sphere_type)
+        sphere_obj = load_dome_as_sphere("HDRI_Preview_Sphere", sphere_props.sphere_type, canvas_image)
         
         if not sphere_obj:
             self.report({'ERROR'}, "Failed to create sphere")
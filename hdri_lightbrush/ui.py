@@ -5,7 +5,7 @@ UI Module - Main HDRI LightBrush Panels
 
 import bpy
 from bpy.types import Panel
-from . import icons
+from . import canvas_layers, icons
 
 
 class HDRI_PT_main_panel(Panel):
@@ -48,6 +48,8 @@ class HDRI_PT_main_panel(Panel):
             # Canvas size selection
             row = step1_box.row()
             row.prop(props, "canvas_size", text="Size")
+            row = step1_box.row()
+            row.prop(sphere_props, "sphere_type", text="Mode")
             
             # Create new canvas
             row = step1_box.row(align=True)
@@ -68,6 +70,66 @@ class HDRI_PT_main_panel(Panel):
             row = step1_box.row(align=True)
             row.operator("hdri_studio.clear_canvas", text="Clear", icon='BRUSH_DATA')
             row.operator("hdri_studio.load_canvas", text="Load", icon='FILEBROWSER')
+            
+            # ═══════════════════════════════════════════════════════
+            # PAINT LAYERS BOX
+            # ═══════════════════════════════════════════════════════
+            layers_box = step1_box.box()
+            row = layers_box.row()
+            row.label(text="Layers", icon='RENDERLAYERS')
+            row.operator("hdri_studio.layers_flatten", text="Flatten", icon='CHECKMARK')
+            
+            row = layers_box.row()
+            row.template_list("HDRI_UL_paint_layers", "", props, "paint_layers",
+                              props, "paint_layer_index", rows=3)
+            col = row.column(align=True)
+            col.operator("hdri_studio.paint_layer_add", text="", icon='ADD')
+            col.operator("hdri_studio.paint_layer_remove", text="", icon='REMOVE')
+            col.separator()
+            col.operator("hdri_studio.paint_layer_move", text="", icon='TRIA_UP').direction = 'UP'
+            col.operator("hdri_studio.paint_layer_move", text="", icon='TRIA_DOWN').direction = 'DOWN'
+            
+            if 1 <= props.paint_layer_index < len(props.paint_layers):
+                layer = props.paint_layers[props.paint_layer_index]
+                row = layers_box.row(align=True)
+                row.prop(layer, "blend_mode", text="")
+                row.prop(layer, "opacity", slider=True)
+            
+            # ═══════════════════════════════════════════════════════
+            # LIGHT LAYERS BOX
+            # ═══════════════════════════════════════════════════════
+            lights_box = step1_box.box()
+            lights_box.label(text="Light Layers", icon='LIGHT_SUN')
+            
+            row = lights_box.row(align=True)
+            row.prop(props, "light_shape", text="")
+            row.prop(props, "light_size", text="Size")
+            row.operator("hdri_studio.add_light", text="", icon='ADD')
+            
+            row = lights_box.row()
+            row.operator("hdri_studio.extract_lights", text="Extract Key Lights", icon='OUTLINER_OB_LIGHT')
+            
+            row = lights_box.row()
+            row.template_list("HDRI_UL_light_layers", "", props, "light_layers",
+                              props, "light_layer_index", rows=3)
+            col = row.column(align=True)
+            col.operator("hdri_studio.light_layer_remove", text="", icon='REMOVE')
+            
+            if 0 <= props.light_layer_index < len(props.light_layers):
+                layer = props.light_layers[props.light_layer_index]
+                col = lights_box.column(align=True)
+                col.prop(layer, "shape", text="")
+                col.prop(layer, "longitude")
+                col.prop(layer, "latitude")
+                col.prop(layer, "angular_size", text="Size")
+                col.prop(layer, "softness", slider=True)
+                col.prop(layer, "intensity")
+                row = lights_box.row(align=True)
+                row.prop(layer, "use_temperature", text="", icon='LIGHT_SUN')
+                if layer.use_temperature:
+                    row.prop(layer, "temperature", text="Kelvin")
+                else:
+                    row.prop(layer, "color", text="")
         
         # ═══════════════════════════════════════════════════════
         # STEP 2: Preview Sphere
@@ -126,6 +188,32 @@ class HDRI_PT_main_panel(Panel):
             # Blend mode dropdown
             row = brush_box.row()
             row.prop(props, "paint_blend", text="Blend")
+            if canvas_layers.paint_mode_error(props):
+                row = brush_box.row()
+                row.label(text="Paints the base layer only", icon='ERROR')
+            if props.paint_blend == 'EXPOSURE':
+                row = brush_box.row()
+                row.prop(props, "paint_exposure", text="EV")
+            elif props.paint_blend == 'LUMINANCE':
+                row = brush_box.row()
+                row.prop(props, "paint_luminance", text="Luminance")
+
+            # Blackbody temperature brush (replaces the color picker color)
+            row = brush_box.row()
+            row.prop(props, "paint_temperature_mode", text="Temperature")
+            if props.paint_temperature_mode != 'OFF':
+                row = brush_box.row(align=True)
+                row.prop(props, "paint_temperature_start", text="Start K")
+                row.prop(props, "paint_temperature_end", text="End K")
+                if props.paint_temperature_mode == 'STROKE':
+                    row = brush_box.row()
+                    row.prop(props, "paint_temperature_length", text="Length")
+
+            row = brush_box.row()
+            row.prop(props, "paint_subpixel", text="Sub-pixel Dabs")
+
+            row = brush_box.row()
+            row.operator("hdri_studio.retemperature", text="Retemperature Canvas", icon='LIGHT_SUN')
             
             # Scale slider
             step2_box.separator()
@@ -163,8 +251,17 @@ class HDRI_PT_main_panel(Panel):
                 row = step3_box.row()
                 row.prop(world_props, "background_strength", text="Strength")
                 
-                row = step3_box.row()
+                row = step3_box.row(align=True)
                 row.prop(world_props, "background_rotation", text="Rotation", slider=True)
+                row.operator("hdri_studio.bake_rotation", text="", icon='FILE_REFRESH')
+                
+                canvas_image = bpy.data.images.get("HDRI_Canvas")
+                if canvas_image and canvas_layers.is_dome_canvas(canvas_image):
+                    row = step3_box.row()
+                    row.prop(world_props, "dome_ground", text="Ground")
+                
+                row = step3_box.row()
+                row.operator("hdri_studio.reproject_canvas", text="Level Horizon", icon='ORIENTATION_GIMBAL')
         
         # ═══════════════════════════════════════════════════════
         # PERFORMANCE SETTINGS (for 4K-8K textures)
@@ -187,6 +284,20 @@ class HDRI_PT_main_panel(Panel):
             if props.performance_mode or (canvas_image and canvas_image.size[0] >= 4096):
                 row = perf_box.row()
                 row.prop(props, "update_rate", text="Update Rate")
+            
+            # Stage profiler overlay
+            row = perf_box.row(align=True)
+            row.prop(props, "show_profiler", text="Profiler", icon='TIME')
+            if props.show_profiler:
+                row.operator("hdri_studio.profiler_export_csv", text="CSV", icon='EXPORT')
+            
+            # Stroke recording for profiling
+            row = perf_box.row(align=True)
+            row.prop(props, "record_strokes", text="Record Strokes", icon='REC')
+            row.operator("hdri_studio.replay_strokes", text="Replay", icon='PLAY')
+            if props.record_strokes:
+                row = perf_box.row()
+                row.prop(props, "stroke_recording_path", text="")
 
 
 # World Settings Panel removed - controls integrated into main panel Step 3
@@ -3,9 +3,15 @@ World Operators Module
 World background controls for HDRI LightBrush
 """
 
+import math
+
 import bpy
+from bpy.props import BoolProperty, FloatProperty
 from bpy.types import Operator
 
+from . import canvas_layers, hdri_save, node_graphs
+from .engine.transform import rotation_matrix
+
 class HDRI_OT_set_world_background(Operator):
     """Set current HDRI canvas as world background"""
     bl_idname = "hdri_studio.set_world_background"
@@ -21,51 +27,15 @@ class HDRI_OT_set_world_background(Operator):
             
             canvas_image = bpy.data.images["HDRI_Canvas"]
             
-            # Get or create world
-            world = context.scene.world
-            if not world:
-                world = bpy.data.worlds.new("HDRI_World")
-                context.scene.world = world
-                
-            world.use_nodes = True
-            nodes = world.node_tree.nodes
-            links = world.node_tree.links
-            
-            # Clear existing nodes
-            nodes.clear()
-            
-            # Add Environment Texture node
-            env_tex = nodes.new(type='ShaderNodeTexEnvironment')
-            env_tex.location = (-400, 300)
-            env_tex.image = canvas_image
-            
-            # Add Mapping node for rotation control
-            mapping = nodes.new(type='ShaderNodeMapping')
-            mapping.location = (-600, 300)
-            
-            # Add Texture Coordinate node
-            tex_coord = nodes.new(type='ShaderNodeTexCoord')
-            tex_coord.location = (-800, 300)
-            
-            # Add Background node
-            background = nodes.new(type='ShaderNodeBackground')
-            background.location = (-200, 300)
-            
-            # Add World Output node
-            world_output = nodes.new(type='ShaderNodeOutputWorld')
-            world_output.location = (0, 300)
-            
-            # Link nodes
-            links.new(tex_coord.outputs['Generated'], mapping.inputs['Vector'])
-            links.new(mapping.outputs['Vector'], env_tex.inputs['Vector'])
-            links.new(env_tex.outputs['Color'], background.inputs['Color'])
-            links.new(background.outputs['Background'], world_output.inputs['Surface'])
+            # Get or create the world graph; an existing one is only re-pointed
+            nodes = node_graphs.world_graph(context.scene, canvas_image)
             
             # Apply world properties if available
             if hasattr(context.scene, 'hdri_studio_world'):
                 world_props = context.scene.hdri_studio_world
-                background.inputs['Strength'].default_value = world_props.background_strength
-                mapping.inputs['Rotation'].default_value = (0, 0, world_props.background_rotation)
+                nodes['background'].inputs['Strength'].default_value = world_props.background_strength
+                nodes['mapping'].inputs['Rotation'].default_value = (0, 0, world_props.background_rotation)
+                node_graphs.set_dome_ground(world_props.dome_ground)
             
             # Set viewport shading to show world
             self.setup_viewport_shading(context)
@@ -101,17 +71,18 @@ class HDRI_OT_update_world_background(Operator):
                 self.report({'WARNING'}, "No world nodes setup")
                 return {'CANCELLED'}
             
-            nodes = world.node_tree.nodes
-            
-            # Find background and mapping nodes
-            background_node = None
-            mapping_node = None
-            
-            for node in nodes:
-                if node.type == 'BACKGROUND':
-                    background_node = node
-                elif node.type == 'MAPPING':
-                    mapping_node = node
+            # Background and mapping nodes (registry first, any world by type)
+            graph = node_graphs.world_nodes(world)
+            if graph is not None:
+                background_node, mapping_node = graph['background'], graph['mapping']
+            else:
+                background_node = None
+                mapping_node = None
+                for node in world.node_tree.nodes:
+                    if node.type == 'BACKGROUND':
+                        background_node = node
+                    elif node.type == 'MAPPING':
+                        mapping_node = node
             
             if not background_node:
                 self.report({'WARNING'}, "No background node found")
@@ -128,6 +99,9 @@ class HDRI_OT_update_world_background(Operator):
                 if mapping_node:
                     mapping_node.inputs['Rotation'].default_value = (0, 0, world_props.background_rotation)
                 
+                # Ground below a dome canvas' horizon
+                node_graphs.set_dome_ground(world_props.dome_ground)
+                
                 # Update viewport display
                 if world_props.use_world_in_viewport:
                     self.setup_viewport_shading(context, True)
@@ -195,14 +169,115 @@ class HDRI_OT_remove_world_background(Operator):
             self.report({'ERROR'}, f"Failed to remove background: {e}")
             return {'CANCELLED'}
 
+class HDRI_OT_bake_rotation(Operator):
+    """Bake the background rotation into the canvas pixels"""
+    bl_idname = "hdri_studio.bake_rotation"
+    bl_label = "Bake Rotation"
+    bl_description = "Rotate the canvas pixels (and layers) by the background rotation and reset the rotation to zero"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    subpixel: BoolProperty(
+        name="Sub-pixel",
+        description="Interpolate fractional pixel offsets (slightly softens the image) instead of rounding to whole pixels (lossless)",
+        default=False
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        world_props = getattr(context.scene, 'hdri_studio_world', None)
+        return (world_props is not None and world_props.background_rotation != 0.0
+                and "HDRI_Canvas" in bpy.data.images)
+    
+    def execute(self, context):
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+        
+        world_props = context.scene.hdri_studio_world
+        canvas_image = bpy.data.images["HDRI_Canvas"]
+        
+        # World rotation theta shows canvas U - theta / 2pi, so content moves toward +U
+        turns = world_props.background_rotation / (2.0 * math.pi)
+        canvas_layers.rotate_canvas(context, canvas_image, turns, self.subpixel)
+        world_props.background_rotation = 0.0
+        
+        self.report({'INFO'}, f"Baked {turns * 360.0:.1f}° rotation into the canvas")
+        return {'FINISHED'}
+
+class HDRI_OT_reproject_canvas(Operator):
+    """Rotate the canvas to any orientation, e.g. to level a tilted HDRI"""
+    bl_idname = "hdri_studio.reproject_canvas"
+    bl_label = "Level / Reproject Canvas"
+    bl_description = "Resample the canvas, paint layers and lights through an arbitrary rotation"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    pitch: FloatProperty(
+        name="Pitch",
+        description="Tilt the canvas center up toward the zenith",
+        default=0.0,
+        min=-math.pi,
+        max=math.pi,
+        subtype='ANGLE'
+    )
+    
+    roll: FloatProperty(
+        name="Roll",
+        description="Turn the canvas around its center direction",
+        default=0.0,
+        min=-math.pi,
+        max=math.pi,
+        subtype='ANGLE'
+    )
+    
+    yaw: FloatProperty(
+        name="Yaw",
+        description="Turn the canvas around the vertical axis",
+        default=0.0,
+        min=-math.pi,
+        max=math.pi,
+        subtype='ANGLE'
+    )
+    
+    @classmethod
+    def poll(cls, context):
+        return "HDRI_Canvas" in bpy.data.images
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        error = hdri_save.streaming_load_error()
+        if error:
+            self.report({'WARNING'}, error)
+            return {'CANCELLED'}
+        
+        canvas_image = bpy.data.images["HDRI_Canvas"]
+        
+        if self.pitch == 0.0 and self.roll == 0.0:
+            # Pure yaw is an exact pixel roll
+            if self.yaw != 0.0:
+                canvas_layers.rotate_canvas(context, canvas_image, self.yaw / (2.0 * math.pi))
+            return {'FINISHED'}
+        
+        matrix = rotation_matrix(math.degrees(self.yaw), math.degrees(self.pitch), math.degrees(self.roll))
+        canvas_layers.reproject_canvas(context, canvas_image, matrix)
+        
+        self.report({'INFO'}, "Canvas reprojected")
+        return {'FINISHED'}
+
 
 def register():
     bpy.utils.register_class(HDRI_OT_set_world_background)
     bpy.utils.register_class(HDRI_OT_update_world_background) 
     bpy.utils.register_class(HDRI_OT_remove_world_background)
+    bpy.utils.register_class(HDRI_OT_bake_rotation)
+    bpy.utils.register_class(HDRI_OT_reproject_canvas)
 
 
 def unregister():
+    bpy.utils.unregister_class(HDRI_OT_reproject_canvas)
+    bpy.utils.unregister_class(HDRI_OT_bake_rotation)
     bpy.utils.unregister_class(HDRI_OT_remove_world_background)
     bpy.utils.unregister_class(HDRI_OT_update_world_background)
     bpy.utils.unregister_class(HDRI_OT_set_world_background)
\ No newline at end of file
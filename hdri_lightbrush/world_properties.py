@@ -4,7 +4,7 @@ World background settings for HDRI LightBrush
 """
 
 import bpy
-from bpy.props import FloatProperty, BoolProperty
+from bpy.props import FloatProperty, BoolProperty, EnumProperty
 from bpy.types import PropertyGroup
 
 def update_world_background(self, context):
@@ -20,15 +20,17 @@ def update_world_background(self, context):
     sync_sphere_rotation(self.background_rotation)
 
 def sync_sphere_rotation(rotation_value):
-    """Sync sphere rotation with world rotation by rotating the object itself"""
+    """Sync sphere rotation with world rotation by rotating the object itself
+    
+    Setting the rotation tags the depsgraph; it is evaluated on the next
+    redraw (or raycast), so slider drags don't force a view layer update.
+    """
     sphere = bpy.data.objects.get("HDRI_Preview_Sphere")
     if not sphere:
         return
     
-    sphere.rotation_euler[2] = -rotation_value
-    
-    if bpy.context.view_layer:
-        bpy.context.view_layer.update()
+    if sphere.rotation_euler[2] != -rotation_value:
+        sphere.rotation_euler[2] = -rotation_value
 
 class HDRIStudioWorldProperties(PropertyGroup):
     """World background settings for HDRI LightBrush"""
@@ -74,6 +76,18 @@ class HDRIStudioWorldProperties(PropertyGroup):
         update=update_world_background
     )
     
+    # Lower hemisphere of dome canvases (they store only the upper one)
+    dome_ground: EnumProperty(
+        name="Dome Ground",
+        description="How the world fills below the horizon of a dome canvas",
+        items=[
+            ('MIRROR', "Mirror", "Reflect the dome below the horizon"),
+            ('HORIZON', "Horizon", "Extend the horizon color over the ground"),
+        ],
+        default='MIRROR',
+        update=update_world_background
+    )
+    
     # Viewport Display
     use_world_in_viewport: BoolProperty(
         name="Show World in Viewport",
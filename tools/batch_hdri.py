@@ -0,0 +1,171 @@
+"""
+HDRI LightBrush - Batch HDRI Generator
+Headless rendering of studio HDRIs from JSON light-rig specs.
+
+Every rig is rasterized by the bpy-free paint engine (the same light layer
+compositing the add-on uses) and written as Radiance HDR or OpenEXR. Rigs
+are spread over a process pool with one worker per core; each worker
+writes its file itself and the file is reported as soon as it is done.
+
+Rig spec (one object, a list, or {"rigs": [...]} per JSON file):
+
+    {
+        "output": "studio_key_left.exr",
+        "width": 4096, "height": 2048,
+        "background": [0.02, 0.02, 0.02],
+        "lights": [
+            {"shape": "RECTANGLE", "longitude": -45, "latitude": 20,
+             "angular_size": 30, "intensity": 40, "temperature": 5600,
+             "softness": 0.5}
+        ]
+    }
+
+Lights take the add-on's light layer fields (degrees, linear "color" or a
+"temperature" in Kelvin). Relative outputs are resolved against --output-dir.
+
+Usage:
+    python tools/batch_hdri.py rigs/*.json
+    python tools/batch_hdri.py rigs.json --output-dir out --workers 8
+    python tools/batch_hdri.py rigs.json --format hdr --width 2048
+
+Only Python and NumPy are required.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hdri_lightbrush")
+sys.path.insert(0, os.path.normpath(ADDON_DIR))
+
+from engine import LIGHT_SHAPES, LayeredCanvas, LightLayer, kelvin_to_linear  # noqa: E402
+from engine.hdr_io import WRITERS, write_image  # noqa: E402
+
+
+# Defaults for rig and light fields that a spec leaves out
+RIG_DEFAULTS = {
+    'width': 2048,
+    'height': 1024,
+    'background': (0.0, 0.0, 0.0),
+}
+
+LIGHT_DEFAULTS = {
+    'shape': 'CIRCLE',
+    'longitude': 0.0,
+    'latitude': 0.0,
+    'angular_size': 15.0,
+    'intensity': 1.0,
+    'color': (1.0, 1.0, 1.0),
+    'softness': 0.5,
+}
+
+
+# =============================================================================
+# SPECS
+# =============================================================================
+
+def light_from_spec(spec):
+    """Engine LightLayer from one light spec dict."""
+    fields = dict(LIGHT_DEFAULTS, **{key: value for key, value in spec.items() if key in LIGHT_DEFAULTS})
+    if fields['shape'] not in LIGHT_SHAPES:
+        raise ValueError(f"Unknown light shape: {fields['shape']}")
+    if 'temperature' in spec:
+        fields['color'] = tuple(float(value) for value in kelvin_to_linear(spec['temperature']))
+    fields['color'] = tuple(float(value) for value in fields['color'])
+    return LightLayer(**fields)
+
+
+def load_rigs(paths, output_dir, file_format=None, width=None, height=None):
+    """Read rig specs from JSON files, filling defaults and resolving output paths.
+
+    Returns:
+        list: Normalized rig dicts
+    """
+    rigs = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            data = data.get('rigs', [data])
+
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for index, spec in enumerate(data):
+            rig = dict(RIG_DEFAULTS, **spec)
+            if width:
+                rig['width'] = width
+            if height or width:
+                rig['height'] = height or rig['width'] // 2
+            output = rig.get('output') or f"{stem}_{index:03d}.exr"
+            if file_format:
+                output = os.path.splitext(output)[0] + "." + file_format
+            if os.path.splitext(output)[1].lower() not in WRITERS:
+                raise ValueError(f"{path}: unsupported output format for {output}")
+            rig['output'] = os.path.join(output_dir, output)
+            rig['lights'] = [light_from_spec(light) for light in spec.get('lights', [])]
+            rigs.append(rig)
+    return rigs
+
+
+# =============================================================================
+# RENDERING
+# =============================================================================
+
+def render_rig(rig):
+    """Rasterize one rig and write its file (runs in a worker process).
+
+    Returns:
+        tuple: (output path, seconds)
+    """
+    start = time.perf_counter()
+    canvas = LayeredCanvas.filled(rig['width'], rig['height'], tuple(rig['background']) + (1.0,))
+    canvas.set_lights(dict(enumerate(rig['lights'], start=1)))
+    canvas.flatten()
+
+    directory = os.path.dirname(rig['output'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    write_image(rig['output'], canvas.result)
+    return rig['output'], time.perf_counter() - start
+
+
+def render_rigs(rigs, workers=None):
+    """Render rigs on a process pool, yielding (output path, seconds) as each finishes."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(rigs) == 1:
+        for rig in rigs:
+            yield render_rig(rig)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(rigs))) as pool:
+        futures = [pool.submit(render_rig, rig) for rig in rigs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render studio HDRIs from JSON light-rig specs")
+    parser.add_argument("specs", nargs="+", help="JSON rig spec files")
+    parser.add_argument("--output-dir", default=".", help="Directory for relative output paths")
+    parser.add_argument("--format", choices=sorted(ext.lstrip('.') for ext in WRITERS),
+                        help="Override every rig's output format")
+    parser.add_argument("--width", type=int, help="Override every rig's width")
+    parser.add_argument("--height", type=int, help="Override every rig's height (default: width / 2)")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+
+    rigs = load_rigs(args.specs, args.output_dir, args.format, args.width, args.height)
+    if not rigs:
+        print("No rigs found")
+        return 1
+
+    start = time.perf_counter()
+    for done, (path, seconds) in enumerate(render_rigs(rigs, args.workers), start=1):
+        print(f"[{done}/{len(rigs)}] {path} ({seconds:.2f} s)", flush=True)
+    print(f"Rendered {len(rigs)} HDRIs in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
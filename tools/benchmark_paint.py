@@ -0,0 +1,541 @@
+"""
+HDRI LightBrush - Paint Engine Benchmark
+Headless throughput benchmark for the bpy-free paint engine.
+
+Replays synthetic (or recorded) mouse traces through the same dab spacing,
+stamping and upload pattern the 3D paint handler uses, and reports dabs/sec,
+ms per mouse event, peak memory and bytes copied for each canvas size.
+
+Usage:
+    python tools/benchmark_paint.py
+    python tools/benchmark_paint.py --resolutions 2K,4K --traces line,scribble
+    python tools/benchmark_paint.py --trace my_stroke.json --json results.json
+    python tools/benchmark_paint.py --baseline results.json
+
+Only Python and NumPy are required.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hdri_lightbrush")
+sys.path.insert(0, os.path.normpath(ADDON_DIR))
+
+from engine import (  # noqa: E402
+    BLEND_KERNELS, LIGHT_SHAPES, PROFILER, TONEMAP_OPERATORS, Brush, Canvas, LayeredCanvas,
+    LightLayer, MipPyramid, blend_region, display_srgb, kelvin_to_linear, reproject, retemperature,
+    roll_yaw, rotation_matrix, stamp_dab, thumbnail,
+)
+from engine.layers import PAINT_COVERAGE  # noqa: E402
+from engine.light_layers import rasterize_light  # noqa: E402
+from engine.parallel import fill, set_worker_count, worker_count  # noqa: E402
+from engine.transform import clear_grid_cache  # noqa: E402
+
+
+RESOLUTIONS = {
+    '2K': (2048, 1024),
+    '4K': (4096, 2048),
+    '8K': (8192, 4096),
+}
+
+BLEND_MODES = tuple(BLEND_KERNELS)
+
+# Modes the pre-kernel paint_at_uv supported
+LEGACY_BLEND_MODES = ('MIX', 'ADD', 'MULTIPLY', 'LIGHTEN', 'DARKEN', 'ERASE', 'SCREEN', 'OVERLAY')
+
+# Parameters for the HDR modes: +2 EV, and a bright target luminance
+BLEND_VALUES = {'EXPOSURE': 2.0, 'LUMINANCE': 50.0}
+
+
+# =============================================================================
+# TRACES
+# =============================================================================
+
+def synthetic_trace(kind, events=240, seed=0):
+    """Generate a mouse trace as a list of UV samples (one per mouse event)."""
+    t = np.linspace(0.0, 1.0, events)
+    if kind == 'line':
+        u = 0.1 + 0.8 * t
+        v = np.full_like(t, 0.5)
+    elif kind == 'circle':
+        u = 0.5 + 0.15 * np.cos(2 * math.pi * t)
+        v = 0.5 + 0.3 * np.sin(2 * math.pi * t)
+    elif kind == 'zigzag':
+        u = 0.1 + 0.8 * t
+        v = 0.5 + 0.3 * (2 * np.abs((t * 8) % 2 - 1) - 1)
+    elif kind == 'scribble':
+        rng = np.random.default_rng(seed)
+        steps = rng.normal(0.0, 0.006, size=(events, 2))
+        path = np.cumsum(steps, axis=0) + 0.5
+        u = path[:, 0] % 1.0
+        v = np.clip(path[:, 1], 0.05, 0.95)
+    else:
+        raise ValueError(f"Unknown trace kind: {kind}")
+    return [(float(a), float(b)) for a, b in zip(u, v)]
+
+
+SYNTHETIC_TRACES = ('line', 'circle', 'zigzag', 'scribble')
+
+
+def load_trace(path):
+    """Load a recorded trace: a JSON list of [u, v] samples."""
+    with open(path, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    return [(float(s[0]), float(s[1])) for s in samples]
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+
+def new_canvas(width, height):
+    """Black canvas with full alpha, as created by the canvas operators."""
+    pixels = np.zeros((height, width, 4), dtype=np.float32)
+    pixels[:, :, 3] = 1.0
+    return pixels
+
+
+def run_stroke(trace, width, height, brush_size=70, strength=1.0, hardness=0.5,
+               spacing=0.25, blend_mode='MIX', color=(1.0, 0.8, 0.6), subpixel=False, layered=False):
+    """Replay one stroke the way continuous_paint_handler.paint_at_mouse does.
+
+    Per mouse event: feed the sample to an engine Stroke, then copy the
+    whole buffer to the "image" (foreach_set equivalent). With layered=True
+    the stroke paints a layer above the base under two lights,
+    recompositing the event's dabs like the layered canvas path.
+    """
+    image = new_canvas(width, height)
+    brush = Brush(brush_size, strength, hardness, spacing, color, blend_mode, None, subpixel,
+                  BLEND_VALUES.get(blend_mode))
+
+    # Layers exist before the stroke starts
+    canvas = None
+    if layered:
+        canvas = LayeredCanvas(image)
+        canvas.add_layer(1)
+        light = LightLayer('CIRCLE', 0.0, 10.0, 20.0, 2.0, (1.0, 1.0, 1.0), 0.5)
+        canvas.set_lights({1: light, 2: light._replace(longitude=90.0)})
+        canvas.flatten()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    # Stroke start: read pixels (or take the layer) and snapshot the base
+    target = Canvas.from_layered(canvas, 1) if layered else Canvas(image.copy())
+    stroke = target.begin_stroke(brush)
+    bytes_copied = target.pixels.nbytes * 2
+
+    event_times = []
+    for uv in trace:
+        event_start = time.perf_counter()
+        if stroke.add_sample(uv):
+            image[...] = target.result
+            bytes_copied += target.pixels.nbytes
+        event_times.append(time.perf_counter() - event_start)
+    stroke.end()
+    dab_count = stroke.dab_count
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    event_ms = np.array(event_times) * 1000.0
+    return {
+        'dabs': dab_count,
+        'events': len(trace),
+        'seconds': elapsed,
+        'dabs_per_sec': dab_count / elapsed if elapsed > 0 else 0.0,
+        'ms_per_event': float(event_ms.mean()),
+        'ms_per_event_p95': float(np.percentile(event_ms, 95)),
+        'peak_mb': peak / (1024 * 1024),
+        'copied_mb': bytes_copied / (1024 * 1024),
+    }
+
+
+def run_blend_modes(width, height, dabs=200, brush_size=70):
+    """Raw dab throughput for each blend mode (no upload)."""
+    results = {}
+    pixels = new_canvas(width, height)
+    base = pixels.copy()
+    rng = np.random.default_rng(1)
+    centers = [(int(x), int(y)) for x, y in zip(rng.integers(0, width, dabs), rng.integers(0, height, dabs))]
+    for mode in BLEND_MODES:
+        stroke_alpha = np.zeros((height, width), dtype=np.float32)
+        start = time.perf_counter()
+        for center in centers:
+            stamp_dab(pixels, base, stroke_alpha, center, brush_size, (0.5, 0.5, 0.5),
+                      1.0, 0.5, blend_mode=mode, blend_value=BLEND_VALUES.get(mode))
+        elapsed = time.perf_counter() - start
+        results[mode] = dabs / elapsed if elapsed > 0 else 0.0
+    return results
+
+
+def legacy_blend(region, base_region, alpha_3d, brush_rgb, blend_mode):
+    """Pre-kernel blend from paint_at_uv (allocates temporaries), kept as a reference."""
+    if blend_mode == 'ADD':
+        blended = base_region + brush_rgb
+    elif blend_mode == 'MULTIPLY':
+        blended = base_region * brush_rgb
+    elif blend_mode == 'LIGHTEN':
+        blended = np.maximum(base_region, brush_rgb)
+    elif blend_mode == 'DARKEN':
+        blended = np.minimum(base_region, brush_rgb)
+    elif blend_mode == 'ERASE':
+        blended = np.zeros_like(brush_rgb)
+    elif blend_mode == 'SCREEN':
+        blended = 1.0 - (1.0 - base_region) * (1.0 - brush_rgb)
+    elif blend_mode == 'OVERLAY':
+        blended = np.where(base_region < 0.5, 2.0 * base_region * brush_rgb,
+                           1.0 - 2.0 * (1.0 - base_region) * (1.0 - brush_rgb))
+    else:
+        blended = brush_rgb
+    region[:] = base_region * (1.0 - alpha_3d) + blended * alpha_3d
+    np.clip(region, 0.0, None, out=region)
+
+
+def run_blend_kernels(width, height, brush_size=70, repeats=200):
+    """Microseconds per dab-sized blend: in-place kernels versus the legacy path."""
+    results = {}
+    size = 2 * brush_size + 1
+    pixels = new_canvas(width, height)
+    pixels[:, :, :3] = 0.5
+    base = pixels.copy()
+    alpha = np.random.default_rng(2).random((size, size, 1)).astype(np.float32)
+    color = np.array([0.8, 0.6, 0.4], dtype=np.float32)
+    region = pixels[:size, :size, :3]
+    base_region = base[:size, :size, :3]
+    for mode in LEGACY_BLEND_MODES:
+        timings = []
+        for blend in (blend_region, legacy_blend):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                blend(region, base_region, alpha, color, mode)
+            timings.append((time.perf_counter() - start) * 1e6 / repeats)
+        results[mode] = {'kernel_us': timings[0], 'legacy_us': timings[1]}
+    return results
+
+
+def run_lights(width, height, size=500, repeats=5):
+    """Milliseconds per light layer rasterization for each shape, and per layer move."""
+    results = {}
+    pixels = new_canvas(width, height)
+    # Angular size matching a size-pixel light at the equator
+    layer = LightLayer('CIRCLE', 0.0, 10.0, size / width * 360.0, 1.0, (1.0, 1.0, 1.0), 0.5)
+    for shape in LIGHT_SHAPES:
+        light = layer._replace(shape=shape)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            rasterize_light(light, width, height)
+        results[shape] = (time.perf_counter() - start) * 1000.0 / repeats
+    
+    # Moving one of three light layers (re-rasterize + recomposite its tiles)
+    canvas = LayeredCanvas(pixels)
+    lights = {1: layer, 2: layer._replace(longitude=90.0), 3: layer._replace(shape='RECTANGLE', longitude=-90.0)}
+    canvas.set_lights(lights)
+    canvas.flatten()
+    start = time.perf_counter()
+    for i in range(repeats):
+        lights[1] = layer._replace(longitude=float(i + 1))
+        canvas.set_lights(lights)
+        canvas.flatten()
+    results['LAYER_MOVE'] = (time.perf_counter() - start) * 1000.0 / repeats
+    return results
+
+
+def run_color(width, height, repeats=3):
+    """Milliseconds per full-canvas retemperature pass and per-pixel Kelvin lookup."""
+    pixels = new_canvas(width, height)
+    pixels[:, :, :3] = 0.5
+    kelvin = np.linspace(1000.0, 40000.0, width * height, dtype=np.float32).reshape((height, width))
+
+    results = {}
+    start = time.perf_counter()
+    for _ in range(repeats):
+        retemperature(pixels, 3200, strength=0.5)
+    results['RETEMPERATURE'] = (time.perf_counter() - start) * 1000.0 / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        kelvin_to_linear(kelvin)
+    results['KELVIN_LUT'] = (time.perf_counter() - start) * 1000.0 / repeats
+    return results
+
+
+def run_tonemap(width, height, repeats=2):
+    """Milliseconds per full-canvas LDR conversion for each tone curve, and per thumbnail."""
+    pixels = new_canvas(width, height)
+    pixels[:, :, :3] = np.linspace(0.0, 16.0, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    results = {}
+    for operator in TONEMAP_OPERATORS:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            display_srgb(pixels, operator=operator)
+        results[operator] = (time.perf_counter() - start) * 1000.0 / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        thumbnail(pixels, 512)
+    results['THUMBNAIL'] = (time.perf_counter() - start) * 1000.0 / repeats
+    return results
+
+
+def run_transform(width, height):
+    """Milliseconds per full-canvas yaw roll and arbitrary reprojection (cold / cached grid)."""
+    pixels = new_canvas(width, height)
+    out = np.empty_like(pixels)
+    results = {}
+
+    start = time.perf_counter()
+    roll_yaw(pixels, 0.1234, subpixel=True, out=pixels)
+    results['ROLL_YAW'] = (time.perf_counter() - start) * 1000.0
+
+    matrix = rotation_matrix(yaw=5.0, pitch=12.0, roll=-3.0)
+    clear_grid_cache()
+    start = time.perf_counter()
+    reproject(pixels, matrix, out=out)
+    results['REPROJECT'] = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    reproject(pixels, matrix, out=out)
+    results['REPROJECT_CACHED'] = (time.perf_counter() - start) * 1000.0
+    clear_grid_cache()
+    return results
+
+
+def run_parallel(width, height, threads=None):
+    """Milliseconds per canvas-wide operation on one thread and on the shared pool.
+
+    Returns:
+        dict: op -> {'serial_ms', 'parallel_ms'} (pool size in 'threads')
+    """
+    pixels = new_canvas(width, height)
+    canvas = LayeredCanvas(pixels)
+    canvas.add_layer(1, pixels=np.full_like(pixels, 0.25))
+    light = LightLayer('RECTANGLE', 30.0, 20.0, 60.0, 4.0, (1.0, 0.9, 0.8), 0.5)
+    canvas.set_lights({1: light})
+    base = pixels.copy()
+    stroke_alpha = np.zeros((height, width), dtype=np.float32)
+
+    def flatten_all():
+        canvas.mark_dirty(everything=True)
+        canvas.flatten()
+
+    ops = {
+        'FILL': lambda: fill(pixels, (0.0, 0.0, 0.0, 1.0)),
+        'FLATTEN': flatten_all,
+        'LIGHT': lambda: rasterize_light(light, width, height),
+        'DAB_500': lambda: stamp_dab(pixels, base, stroke_alpha, (width // 2, height // 2), 250,
+                                     (1.0, 0.8, 0.6), 1.0, 0.5),
+        'RETEMPERATURE': lambda: retemperature(pixels, 4500, strength=0.5),
+    }
+
+    threads = threads or worker_count()
+    results = {'threads': threads}
+    for name, op in ops.items():
+        timings = {}
+        for label, count in (('serial_ms', 1), ('parallel_ms', threads)):
+            set_worker_count(count)
+            op()  # Warm up the pool and scratch buffers
+            start = time.perf_counter()
+            op()
+            timings[label] = (time.perf_counter() - start) * 1000.0
+        results[name] = timings
+    set_worker_count(None)
+    return results
+
+
+def run_clear(width, height):
+    """Milliseconds to clear a layered canvas (2 paint layers, 1 light) and flatten it.
+
+    DENSE rebuilds the canvas from a filled buffer, LAZY fills it with a
+    constant in place; both end with a flattened result.
+    """
+    light = LightLayer('CIRCLE', 30.0, 20.0, 40.0, 4.0, (1.0, 0.9, 0.8), 0.5)
+
+    def dense():
+        canvas = LayeredCanvas(fill(np.empty((height, width, 4), dtype=np.float32), (0.0, 0.0, 0.0, 1.0)))
+        for key in (1, 2):
+            canvas.add_layer(key, pixels=np.zeros((height, width, 4), dtype=np.float32))
+        canvas.set_lights({1: light})
+        canvas.flatten()
+
+    canvas = LayeredCanvas(new_canvas(width, height))
+    for key in (1, 2):
+        canvas.add_layer(key, pixels=np.full((height, width, 4), 0.25, dtype=np.float32))
+    canvas.set_lights({1: light})
+    canvas.flatten()
+
+    def lazy():
+        canvas.fill((0.0, 0.0, 0.0, 1.0))
+        canvas.flatten()
+
+    results = {}
+    for name, op in (('DENSE', dense), ('LAZY', lazy)):
+        start = time.perf_counter()
+        op()
+        results[name] = (time.perf_counter() - start) * 1000.0
+    return results
+
+
+def run_pyramid(width, height, brush_size=500, strokes=8):
+    """Milliseconds per full pyramid build and per refresh after one brush-sized stroke."""
+    pixels = new_canvas(width, height)
+    start = time.perf_counter()
+    pyramid = MipPyramid(pixels)
+    results = {'BUILD': (time.perf_counter() - start) * 1000.0}
+
+    elapsed = 0.0
+    for i in range(strokes):
+        x = (i * 997) % max(1, width - brush_size)
+        y = (i * 331) % max(1, height - brush_size)
+        pyramid.mark_dirty((x, y, x + brush_size, y + brush_size))
+        start = time.perf_counter()
+        pyramid.refresh()
+        elapsed += time.perf_counter() - start
+    results['STROKE_REFRESH'] = elapsed * 1000.0 / strokes
+    return results
+
+
+# =============================================================================
+# REPORTING
+# =============================================================================
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of regressions where dabs/sec dropped by more than tolerance."""
+    regressions = []
+    for key, current in results['strokes'].items():
+        previous = baseline.get('strokes', {}).get(key)
+        if not previous or previous['dabs_per_sec'] <= 0:
+            continue
+        ratio = current['dabs_per_sec'] / previous['dabs_per_sec']
+        if ratio < 1.0 - tolerance:
+            regressions.append((key, previous['dabs_per_sec'], current['dabs_per_sec'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HDRI LightBrush paint engine benchmark")
+    parser.add_argument("--resolutions", default="2K,4K,8K",
+                        help="Comma separated canvas sizes (2K, 4K, 8K)")
+    parser.add_argument("--traces", default=",".join(SYNTHETIC_TRACES),
+                        help="Comma separated synthetic traces (line, circle, zigzag, scribble)")
+    parser.add_argument("--trace", action="append", default=[],
+                        help="Recorded trace file (JSON list of [u, v]); may be repeated")
+    parser.add_argument("--events", type=int, default=240, help="Mouse events per synthetic trace")
+    parser.add_argument("--brush-size", type=int, default=70, help="Brush radius in pixels")
+    parser.add_argument("--blend", default="MIX", help="Blend mode used for stroke runs")
+    parser.add_argument("--spacing", type=float, default=0.25, help="Dab spacing as a fraction of the diameter")
+    parser.add_argument("--subpixel", action="store_true", help="Use sub-pixel anti-aliased dab placement")
+    parser.add_argument("--layered", action="store_true",
+                        help="Paint a layer of a layered canvas (with light layers) instead of the image")
+    parser.add_argument("--stages", action="store_true",
+                        help="Enable the stage profiler and print per-stage p50/p95")
+    parser.add_argument("--threads", type=int, help="Pool size for the parallel runs (default: one per core)")
+    parser.add_argument("--json", dest="json_path", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare dabs/sec against a previous --json result")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed dabs/sec drop versus baseline (fraction)")
+    args = parser.parse_args(argv)
+    if args.layered and args.blend not in PAINT_COVERAGE:
+        parser.error(f"--layered paints a layer, which takes only the {', '.join(PAINT_COVERAGE)} blend modes")
+
+    traces = {kind: synthetic_trace(kind, args.events) for kind in args.traces.split(",") if kind}
+    for path in args.trace:
+        traces[os.path.basename(path)] = load_trace(path)
+
+    results = {'numpy': np.__version__, 'strokes': {}, 'blend_modes': {}, 'blend_kernels': {}, 'lights': {},
+               'color': {}, 'tonemap': {}, 'transform': {}, 'pyramid': {}, 'parallel': {},
+               'clear': {}}
+    PROFILER.enabled = args.stages
+
+    print(f"{'canvas':<7}{'trace':<16}{'dabs':>7}{'dabs/s':>10}{'ms/event':>10}"
+          f"{'p95 ms':>9}{'peak MB':>10}{'copied MB':>11}")
+    for res_name in args.resolutions.split(","):
+        width, height = RESOLUTIONS[res_name]
+        for trace_name, trace in traces.items():
+            stats = run_stroke(trace, width, height, brush_size=args.brush_size, blend_mode=args.blend,
+                               spacing=args.spacing, subpixel=args.subpixel, layered=args.layered)
+            results['strokes'][f"{res_name}/{trace_name}"] = stats
+            print(f"{res_name:<7}{trace_name:<16}{stats['dabs']:>7}{stats['dabs_per_sec']:>10.0f}"
+                  f"{stats['ms_per_event']:>10.2f}{stats['ms_per_event_p95']:>9.2f}"
+                  f"{stats['peak_mb']:>10.1f}{stats['copied_mb']:>11.0f}")
+        results['blend_modes'][res_name] = run_blend_modes(width, height, brush_size=args.brush_size)
+        results['blend_kernels'][res_name] = run_blend_kernels(width, height, brush_size=args.brush_size)
+        results['lights'][res_name] = run_lights(width, height)
+        results['color'][res_name] = run_color(width, height)
+        results['tonemap'][res_name] = run_tonemap(width, height)
+        results['transform'][res_name] = run_transform(width, height)
+        results['pyramid'][res_name] = run_pyramid(width, height)
+        results['parallel'][res_name] = run_parallel(width, height, args.threads)
+        results['clear'][res_name] = run_clear(width, height)
+
+    print("\nBlend modes (dabs/s, no upload)")
+    for res_name, modes in results['blend_modes'].items():
+        print(f"  {res_name}: " + "  ".join(f"{m}={v:.0f}" for m, v in modes.items()))
+
+    print("\nBlend kernels vs legacy (us per dab)")
+    for res_name, modes in results['blend_kernels'].items():
+        print(f"  {res_name}: " + "  ".join(
+            f"{m}={v['kernel_us']:.0f}/{v['legacy_us']:.0f}" for m, v in modes.items()))
+
+    print("\nLight layers (ms per rasterization / layer move, size 500)")
+    for res_name, shapes in results['lights'].items():
+        print(f"  {res_name}: " + "  ".join(f"{s}={v:.2f}" for s, v in shapes.items()))
+
+    print("\nColor temperature (ms per full canvas)")
+    for res_name, ops in results['color'].items():
+        print(f"  {res_name}: " + "  ".join(f"{op}={v:.1f}" for op, v in ops.items()))
+
+    print("\nTone mapping to 8-bit sRGB (ms per full canvas / 512px thumbnail)")
+    for res_name, ops in results['tonemap'].items():
+        print(f"  {res_name}: " + "  ".join(f"{op}={v:.0f}" for op, v in ops.items()))
+
+    print("\nCanvas rotation (ms per full canvas)")
+    for res_name, ops in results['transform'].items():
+        print(f"  {res_name}: " + "  ".join(f"{op}={v:.0f}" for op, v in ops.items()))
+
+    print("\nMip pyramid (ms per build / refresh after a 500px stroke)")
+    for res_name, ops in results['pyramid'].items():
+        print(f"  {res_name}: " + "  ".join(f"{op}={v:.1f}" for op, v in ops.items()))
+
+    print("\nCanvas-wide operations (ms on 1 thread / on the pool)")
+    for res_name, ops in results['parallel'].items():
+        threads = ops['threads']
+        print(f"  {res_name} ({threads} threads): " + "  ".join(
+            f"{op}={v['serial_ms']:.0f}/{v['parallel_ms']:.0f}" for op, v in ops.items() if op != 'threads'))
+
+    print("\nCanvas clear with layers (ms, dense rebuild / constant tiles)")
+    for res_name, ops in results['clear'].items():
+        print(f"  {res_name}: " + "  ".join(f"{op}={v:.0f}" for op, v in ops.items()))
+
+    if args.stages:
+        print("\nStages (ms)")
+        for stage, count, p50, p95 in PROFILER.summary():
+            print(f"  {stage:<12} n={count:<6} p50={p50:.3f}  p95={p95:.3f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for key, before, after, ratio in regressions:
+                print(f"  {key}: {before:.0f} -> {after:.0f} dabs/s ({ratio:.0%})")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
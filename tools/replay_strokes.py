@@ -0,0 +1,101 @@
+"""
+HDRI LightBrush - Stroke Replay
+Re-run a stroke recording (.hlbr) headlessly for profiling.
+
+Record strokes in Blender (Performance > Record Strokes), then:
+    python tools/replay_strokes.py session.hlbr
+    python tools/replay_strokes.py session.hlbr --realtime
+    python tools/replay_strokes.py session.hlbr --profile --json timings.json
+
+Only Python and NumPy are required.
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+
+import numpy as np
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "hdri_lightbrush")
+sys.path.insert(0, os.path.normpath(ADDON_DIR))
+
+from engine import read_recording, replay_strokes  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay an HDRI LightBrush stroke recording")
+    parser.add_argument("recording", help="Stroke recording file (.hlbr)")
+    parser.add_argument("--realtime", action="store_true",
+                        help="Reproduce the original sample timing instead of running flat out")
+    parser.add_argument("--profile", action="store_true", help="Run under cProfile and print the top entries")
+    parser.add_argument("--slowest", type=int, default=5, help="Number of slowest events to list")
+    parser.add_argument("--output", help="Save the resulting canvas as a .npy file")
+    parser.add_argument("--json", dest="json_path", help="Write per-event timings to this JSON file")
+    args = parser.parse_args(argv)
+
+    strokes = read_recording(args.recording)
+    if not strokes:
+        print("Recording contains no strokes")
+        return 1
+
+    width, height = strokes[0].canvas_size
+    pixels = np.zeros((height, width, 4), dtype=np.float32)
+    pixels[:, :, 3] = 1.0
+
+    event_index = []
+
+    def on_event(stroke_index, dabs, seconds):
+        event_index.append((stroke_index, dabs))
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        stats = replay_strokes(strokes, pixels, realtime=args.realtime, on_event=on_event)
+    except ValueError as e:
+        print(e)
+        return 1
+    finally:
+        if profiler:
+            profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    event_ms = np.array(stats['event_seconds']) * 1000.0
+    print(f"Canvas {width}x{height}, {len(strokes)} strokes, {stats['events']} events, {stats['dabs']} dabs")
+    print(f"Total {elapsed:.3f}s, {stats['dabs'] / elapsed if elapsed > 0 else 0:.0f} dabs/s")
+    if len(event_ms):
+        print(f"ms/event: mean {event_ms.mean():.2f}  p50 {np.percentile(event_ms, 50):.2f}  "
+              f"p95 {np.percentile(event_ms, 95):.2f}  max {event_ms.max():.2f}")
+
+        print(f"\nSlowest {args.slowest} events:")
+        for i in np.argsort(event_ms)[::-1][:args.slowest]:
+            stroke_index, dabs = event_index[i]
+            print(f"  event {i:>6}  stroke {stroke_index:>4}  dabs {dabs:>4}  {event_ms[i]:.2f} ms")
+
+    if profiler:
+        print()
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+    if args.output:
+        np.save(args.output, pixels)
+        print(f"Canvas written to {args.output}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                'recording': os.path.basename(args.recording),
+                'canvas_size': [width, height],
+                'events': [{'stroke': s, 'dabs': d, 'ms': float(ms)}
+                           for (s, d), ms in zip(event_index, event_ms)],
+            }, f, indent=2)
+        print(f"Timings written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())